@@ -0,0 +1,142 @@
+# bench/payloads.py
+"""
+벤치마크 시나리오별 요청 생성기.
+
+각 함수는 요청 번호 i 를 받아 httpx 요청 인자(dict)를 돌려줍니다.
+unique=True 이면 요청마다 내용이 달라 캐시 / 요청 합치기가 적용되지 않는 경로를 측정하고,
+unique=False 이면 모든 요청이 같은 내용이라 캐시가 적용되는 경로를 측정합니다.
+"""
+import datetime
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Callable, Dict, Optional
+
+QUESTION_TYPES = {
+    "multipleChoice": {"enable": True, "numQuestions": 4, "numOptions": 4},
+    "ox": {"enable": True, "numQuestions": 3},
+    "fillInTheBlank": {"enable": True, "numQuestions": 3},
+    "descriptive": {"enable": True, "numQuestions": 2},
+}
+
+NOTE = """
+광합성은 식물이 빛 에너지를 이용해 이산화탄소와 물로부터 포도당을 만드는 과정이다.
+명반응은 틸라코이드 막에서 일어나며 ATP 와 NADPH 를 만든다.
+캘빈 회로는 스트로마에서 일어나며 이산화탄소를 고정해 포도당을 합성한다.
+세포 호흡은 미토콘드리아에서 포도당을 분해해 ATP 를 얻는 과정이다.
+"""
+
+
+def _tag(i: int, unique: bool) -> str:
+    return f" (요청 {i})" if unique else ""
+
+
+def make_problem(i: int, unique: bool) -> dict:
+    return {"method": "POST", "url": "/make-problem",
+            "json": {"content": NOTE + _tag(i, unique), "difficulty": "중", "questionTypes": QUESTION_TYPES}}
+
+
+def grade(i: int, unique: bool) -> dict:
+    items = [
+        {"id": 1, "question": "광합성이 일어나는 세포 소기관은?", "answer": "엽록체", "input": "엽록체입니다" + _tag(i, unique)},
+        {"id": 2, "question": "캘빈 회로가 일어나는 장소는?", "answer": "스트로마", "input": "틸라코이드" + _tag(i, unique)},
+        {"id": 3, "question": "세포 호흡의 목적은?", "answer": "ATP 생성", "input": "에너지(ATP)를 얻기 위해" + _tag(i, unique)},
+    ]
+    return {"method": "POST", "url": "/grade", "json": {"items": items}}
+
+
+def grade_blank(i: int, unique: bool) -> dict:
+    items = [
+        # 로컬 사전 채점으로 끝나는 항목과 LLM 채점이 필요한 항목을 섞음
+        {"id": 1, "question": "광합성은 __ 에서 일어난다.", "answer": ["엽록체"], "input": ["엽록체"]},
+        {"id": 2, "question": "명반응은 __ 막에서 일어난다.", "answer": ["틸라코이드"], "input": ["thylakoid" + _tag(i, unique)]},
+        {"id": 3, "question": "세포 호흡은 __ 에서 일어난다.", "answer": ["미토콘드리아"], "input": [""]},
+    ]
+    return {"method": "POST", "url": "/grade/blank", "json": {"items": items}}
+
+
+def _pdf_bytes(text: str) -> bytes:
+    """글자 한 줄이 들어 있는 최소 PDF (Helvetica, ASCII 텍스트)."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def pdf_to_string(i: int, unique: bool) -> dict:
+    text = "Photosynthesis converts light energy into chemical energy" + (f" request {i}" if unique else "")
+    return {"method": "POST", "url": "/pdf-to-string",
+            "files": {"pdfFile": ("note.pdf", _pdf_bytes(text), "application/pdf")}}
+
+
+_audio_cache: Dict[int, bytes] = {}
+
+
+def _mp3_bytes(seconds: int, frequency: int) -> bytes:
+    key = seconds * 100000 + frequency
+    if key not in _audio_cache:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tone.mp3")
+            subprocess.run(
+                ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "lavfi",
+                 "-i", f"sine=frequency={frequency}:duration={seconds}", "-codec:a", "libmp3lame", path],
+                check=True
+            )
+            with open(path, "rb") as f:
+                _audio_cache[key] = f.read()
+    return _audio_cache[key]
+
+
+def audio_to_string(i: int, unique: bool) -> dict:
+    # 주파수를 바꿔 요청마다 다른 파일을 만듦 (같은 파일이면 전사 요청 합치기 / 캐시 적용)
+    data = _mp3_bytes(5, 200 + (i % 500 if unique else 0))
+    return {"method": "POST", "url": "/audio-to-string",
+            "files": {"audioFile": ("lecture.mp3", data, "audio/mpeg")}}
+
+
+def _today() -> str:
+    return datetime.date.today().isoformat()
+
+
+def stats(i: int, unique: bool) -> dict:
+    period = ("daily", "weekly", "monthly")[i % 3]
+    return {"method": "GET", "url": f"/stats/{period}", "params": {"date": _today()}}
+
+
+def logs(i: int, unique: bool) -> dict:
+    period = ("daily", "weekly", "monthly")[i % 3]
+    return {"method": "GET", "url": f"/logs/{period}", "params": {"date": _today()}}
+
+
+SCENARIOS: Dict[str, Callable[[int, bool], dict]] = {
+    "make-problem": make_problem,
+    "grade": grade,
+    "grade-blank": grade_blank,
+    "pdf-to-string": pdf_to_string,
+    "audio-to-string": audio_to_string,
+    "stats": stats,
+    "logs": logs,
+}
+
+
+def unavailable_reason(name: str) -> Optional[str]:
+    """이 환경에서 실행할 수 없는 시나리오면 이유를 반환합니다."""
+    if name == "audio-to-string" and shutil.which("ffmpeg") is None:
+        return "ffmpeg/ffprobe 가 설치되어 있지 않음"
+    return None
@@ -0,0 +1,281 @@
+# bench/run_bench.py
+"""
+엔드포인트별 HTTP 부하 벤치마크.
+
+FastAPI 앱(uvicorn)을 하위 프로세스로 띄우고 시나리오마다 정해진 동시성으로 요청을 보낸 뒤
+처리량(req/s), 지연 시간 p50/p95/p99, 요청당 업스트림 호출 수, 서버 최대 RSS 를 보고합니다.
+
+- 업스트림: LLM_BACKEND=fake (프로세스 내부 가짜 LLM, 지연 시간은 --fake-latency-ms)
+- DB: 임시 디렉터리의 sqlite (--database-url 로 바꿀 수 있음)
+- 업스트림 호출 수: 시나리오 전후 GET /metrics/json 의 upstream_calls_total 차이
+- 최대 RSS: 서버 프로세스의 /proc/<pid>/status VmHWM (시작 이후 최댓값)
+
+    python bench/run_bench.py --concurrency 16 --requests 200
+    python bench/run_bench.py --save-baseline bench/baseline.json
+    python bench/run_bench.py --baseline bench/baseline.json   # 회귀가 있으면 종료 코드 1
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from payloads import SCENARIOS, unavailable_reason  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 서버 실행에 필요한 값이 없을 때 쓰는 기본값 (가짜 백엔드라 실제 키/요금은 의미 없음)
+SERVER_ENV_DEFAULTS = {
+    "GPT_MODEL": "gpt-4o-mini",
+    "GPT_PROBLEM_MODEL": "gpt-4o-mini",
+    "GPT_REQUEST_COST": "0.00015",
+    "GPT_RESPONSE_COST": "0.0006",
+    "EXCHANGE_RATE": "1300",
+    "OPENAI_API_KEY": "sk-bench",
+}
+
+
+# ─────────────── 서버 ───────────────
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, workdir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    for key, value in SERVER_ENV_DEFAULTS.items():
+        env.setdefault(key, value)
+    env.update({
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MS": str(args.fake_latency_ms),
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "PYTHONUNBUFFERED": "1",
+    })
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (REPO_ROOT, env.get("PYTHONPATH")) if p)
+    log = open(os.path.join(workdir, "server.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"서버가 시작하지 못했습니다 (exit {server.returncode})")
+        try:
+            if (await client.get("/metrics/json")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("서버 시작 대기 시간 초과")
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """서버 프로세스의 최대 RSS(MB). /proc 가 없는 환경이면 None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def upstream_calls(client: httpx.AsyncClient) -> float:
+    counters = (await client.get("/metrics/json")).json().get("counters", {})
+    return sum(v for k, v in counters.items() if k.split("{", 1)[0] == "upstream_calls_total")
+
+
+# ─────────────── 측정 ───────────────
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, args) -> dict:
+    build = SCENARIOS[name]
+    unique = not args.same_payload
+    # 준비(첫 호출 비용, PDF/오디오 생성)는 측정에서 제외
+    for i in range(args.warmup):
+        await client.request(**build(-1 - i, unique))
+    requests = [build(i, unique) for i in range(args.requests)]
+
+    calls_before = await upstream_calls(client)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def one(request: dict) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                status = str(response.status_code) if response.status_code >= 400 else None
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if status:
+                errors[status] = errors.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(request) for request in requests])
+    elapsed = time.perf_counter() - started
+    calls_after = await upstream_calls(client)
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(requests),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(requests) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+        "upstream_calls_per_request": round((calls_after - calls_before) / len(requests), 3),
+    }
+
+
+async def run_all(args, server: subprocess.Popen) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=timeout, limits=limits) as client:
+        await wait_ready(client, server)
+        for name in args.scenarios:
+            reason = unavailable_reason(name)
+            if reason:
+                print(f"[bench] {name}: 건너뜀 ({reason})")
+                continue
+            print(f"[bench] {name}: {args.requests} requests, concurrency {args.concurrency} ...", flush=True)
+            result = await run_scenario(client, name, args)
+            # VmHWM 은 누적 최댓값이므로 시나리오 순서에 따라 앞 시나리오의 영향이 남음
+            result["peak_rss_mb"] = round(peak_rss_mb(server.pid) or 0.0, 1)
+            results[name] = result
+    return results
+
+
+# ─────────────── 보고 / 기준선 비교 ───────────────
+def print_report(results: Dict[str, dict]) -> None:
+    header = f"{'scenario':<16}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'up/req':>8}{'rss MB':>9}  errors"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        errors = ", ".join(f"{k}x{v}" for k, v in r["errors"].items()) or "-"
+        print(f"{name:<16}{r['throughput_rps']:>9.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+              f"{r['upstream_calls_per_request']:>8.2f}{r['peak_rss_mb']:>9.1f}  {errors}")
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """기준선 대비 tolerance 비율 이상 나빠진 항목 목록."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if r["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: 처리량 {base['throughput_rps']} -> {r['throughput_rps']} req/s")
+        for key in ("p95_ms", "p99_ms"):
+            if r[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {base[key]} -> {r[key]}")
+        # 업스트림 호출 수는 결정적이므로 허용 오차 없이 비교 (동시 요청 합치기 때문에 약간 흔들릴 수 있어 0.01 여유)
+        if r["upstream_calls_per_request"] > base["upstream_calls_per_request"] + 0.01:
+            regressions.append(f"{name}: 요청당 업스트림 호출 {base['upstream_calls_per_request']} -> "
+                               f"{r['upstream_calls_per_request']}")
+        if base.get("peak_rss_mb") and r["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: 최대 RSS {base['peak_rss_mb']} -> {r['peak_rss_mb']} MB")
+        if sum(r["errors"].values()) > sum(base["errors"].values()):
+            regressions.append(f"{name}: 오류 {base['errors']} -> {r['errors']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="엔드포인트별 HTTP 부하 벤치마크")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="시나리오별 요청 수")
+    parser.add_argument("--warmup", type=int, default=2, help="측정 전에 보내는 요청 수")
+    parser.add_argument("--same-payload", action="store_true", help="모든 요청에 같은 내용을 보냄 (캐시 적중 경로 측정)")
+    parser.add_argument("--fake-latency-ms", type=int, default=300, help="가짜 LLM 기본 지연 시간")
+    parser.add_argument("--database-url", help="기본값: 임시 디렉터리의 sqlite")
+    parser.add_argument("--port", type=int, default=0, help="0 이면 빈 포트 사용")
+    parser.add_argument("--timeout", type=float, default=120, help="요청 하나의 제한 시간(초)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 기준선 JSON")
+    parser.add_argument("--save-baseline", help="이번 결과를 기준선으로 저장할 경로")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="기준선 대비 허용 비율")
+    args = parser.parse_args(argv)
+    if args.port == 0:
+        args.port = _free_port()
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        server = start_server(args, workdir)
+        try:
+            results = asyncio.run(run_all(args, server))
+        except Exception:
+            with open(os.path.join(workdir, "server.log")) as f:
+                print(f.read()[-4000:], file=sys.stderr)
+            raise
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    print()
+    print_report(results)
+    report = {
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "same_payload": args.same_payload,
+            "fake_latency_ms": args.fake_latency_ms,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"[bench] 결과 저장: {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}).get("concurrency") != args.concurrency:
+            print("[bench] 경고: 기준선과 동시성 설정이 다릅니다")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n[bench] 기준선 대비 회귀 {len(regressions)}건 (허용 {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n[bench] 기준선 대비 회귀 없음 (허용 {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
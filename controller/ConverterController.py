@@ -7,17 +7,32 @@ import tempfile
 from PyPDF2 import PdfReader
 from fastapi import UploadFile, File
 
-from service.content_preprocessor_gpt import pdf_text_processing, audio_text_processing
-from fastapi import APIRouter, HTTPException, Depends, Request
+from service.content_preprocessor_gpt import pdf_text_processing_async, audio_text_processing_async
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from controller.DatabaseController import get_db
 from repository.repository import log_and_save_tokens
-from service.stt_service import transcribe_audio_filelike
+from service import metrics
+from service.audio_job_service import submit_audio_job, get_audio_job_status
+from service.stt_service import transcribe_audio_filelike_async
+from service.usage_meter import usage_scope
 
 router = APIRouter()
 
 
+def _extract_pdf_text(contents: bytes) -> str:
+    # BytesIO로 래핑하여 PdfReader에 전달
+    pdf_reader = PdfReader(io.BytesIO(contents))
+    extracted_text = ""
+    for page in pdf_reader.pages:
+        text = page.extract_text()
+        if text:
+            extracted_text += text
+    return extracted_text
+
+
 @router.post("/pdf-to-string")
 async def convert_pdf_to_text(pdfFile: UploadFile = File(...), db: Session = Depends(get_db), request: Request = None):
     # 첨부된 파일이 PDF인지 확인
@@ -26,17 +41,13 @@ async def convert_pdf_to_text(pdfFile: UploadFile = File(...), db: Session = Dep
     try:
         # 파일 바이트 읽기
         contents = await pdfFile.read()
-        # BytesIO로 래핑하여 PdfReader에 전달
-        pdf_reader = PdfReader(io.BytesIO(contents))
-        extracted_text = ""
-        for page in pdf_reader.pages:
-            text = page.extract_text()
-            if text:
-                extracted_text += text
+        # PDF 파싱은 CPU 작업이므로 이벤트 루프를 막지 않도록 스레드풀에서 실행
+        extracted_text = await run_in_threadpool(_extract_pdf_text, contents)
 
-        result = pdf_text_processing(extracted_text)
+        result = await pdf_text_processing_async(extracted_text)
 
-        log, usage = log_and_save_tokens(
+        log, usage = await run_in_threadpool(
+            log_and_save_tokens,
             db=db,
             api_url=str(request.url),
             method=request.method,
@@ -44,6 +55,7 @@ async def convert_pdf_to_text(pdfFile: UploadFile = File(...), db: Session = Dep
             request_tokens=result["request_tokens"],
             response_tokens=result["response_tokens"]
         )
+        print(f"[RequestLog {log.id}] pdf-to-string cache_hit={result.get('cache_hit', False)} coalesced={result.get('coalesced', False)}", flush=True)
 
         return {"text": result["result"]}
     except Exception as e:
@@ -73,21 +85,34 @@ def _is_mp3(upload: UploadFile) -> bool:
         path = tmp.name
 
     try:
-        codec = subprocess.check_output(
-            [
-                "ffprobe", "-v", "error",
-                "-select_streams", "a:0",
-                "-show_entries", "stream=codec_name",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                path,
-            ]
-        ).decode().strip()
+        with metrics.timer("ffmpeg_seconds", stage="ffprobe_codec"):
+            codec = subprocess.check_output(
+                [
+                    "ffprobe", "-v", "error",
+                    "-select_streams", "a:0",
+                    "-show_entries", "stream=codec_name",
+                    "-of", "default=noprint_wrappers=1:nokey=1",
+                    path,
+                ]
+            ).decode().strip()
         return codec == "mp3"
     finally:
         upload.file.seek(0)  # 이후 read() 위해 포인터 원위치
         os.remove(path)
 
 
+async def _read_mp3_upload(audioFile: UploadFile) -> bytes:
+    if not await run_in_threadpool(_is_mp3, audioFile):
+        raise HTTPException(
+            status_code=415,
+            detail="지원되지 않는 오디오 형식입니다. MP3 파일만 업로드해 주세요.",
+        )
+    # 여기는 content-length 검사 통과된 요청만 들어옵니다.
+    if not audioFile.content_type.startswith("audio/"):
+        raise HTTPException(400, "오디오 파일만 허용됩니다.")
+    return await audioFile.read()
+
+
 # 2) 라우트에 dependencies 인자로 추가
 @router.post(
     "/audio-to-string",
@@ -99,25 +124,50 @@ async def convert_audio_to_text(
         request: Request = None
 ):
     print("Audio file received.", flush=True)
-    if not _is_mp3(audioFile):
-        raise HTTPException(
-            status_code=415,
-            detail="지원되지 않는 오디오 형식입니다. MP3 파일만 업로드해 주세요.",
-        )
-    # 여기는 content-length 검사 통과된 요청만 들어옵니다.
-    if not audioFile.content_type.startswith("audio/"):
-        raise HTTPException(400, "오디오 파일만 허용됩니다.")
-    audio_bytes = await audioFile.read()
-    transcript = transcribe_audio_filelike(audio_bytes)
-    # 전사 결과를 정제하는 함수 호출
-    result = audio_text_processing(transcript)
-    log, usage = log_and_save_tokens(
+    audio_bytes = await _read_mp3_upload(audioFile)
+    # Whisper 전사 + 정제 호출의 사용량을 함께 집계
+    with usage_scope() as meter:
+        transcript = await transcribe_audio_filelike_async(audio_bytes)
+        # 전사 결과를 정제하는 함수 호출
+        result = await audio_text_processing_async(transcript)
+    log, usage = await run_in_threadpool(
+        log_and_save_tokens,
         db=db,
         api_url=str(request.url),
         method=request.method,
         params={"audioFile": transcript},
-        request_tokens=result["request_tokens"],
-        response_tokens=result["response_tokens"]
+        request_tokens=meter.request_tokens,
+        response_tokens=meter.response_tokens
     )
+    print(f"[RequestLog {log.id}] audio-to-string cache_hit={result.get('cache_hit', False)} coalesced={result.get('coalesced', False)}", flush=True)
 
     return {"text": result["result"]}
+
+
+@router.post(
+    "/audio-to-string/jobs",
+    dependencies=[Depends(max_size_200mb)]
+)
+async def create_audio_job(
+        audioFile: UploadFile = File(...),
+        request: Request = None
+):
+    """
+    /audio-to-string 의 백그라운드 작업 버전. 업로드를 저장하고 바로 작업 ID 를 반환합니다.
+    결과는 GET /audio-to-string/jobs/{job_id} 로 조회합니다.
+    """
+    print("Audio file received (job).", flush=True)
+    audio_bytes = await _read_mp3_upload(audioFile)
+    job = await submit_audio_job(audio_bytes, audioFile.filename, str(request.url), request.method)
+    return job
+
+
+@router.get("/audio-to-string/jobs/{job_id}")
+async def get_audio_job(job_id: str, wait: float = Query(0, ge=0, le=60, description="작업이 끝날 때까지 기다릴 최대 초 (롱 폴링)")):
+    """
+    작업 상태 조회. status: queued / running / done(text 포함) / failed(error 포함)
+    """
+    job = await get_audio_job_status(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job
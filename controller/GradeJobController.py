@@ -0,0 +1,77 @@
+# GradeJobController.py
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from repository.database import SessionLocal
+from repository.repository import log_and_save_tokens
+from service.grade_job_service import GradeJob, JOB_KINDS, get_job, parse_jsonl, start_job
+
+router = APIRouter()
+
+
+def _log_job_usage(api_url: str, method: str, job: GradeJob) -> None:
+    # 작업은 요청이 끝난 뒤에 완료되므로 별도 세션으로 작업 전체 사용량을 한 번만 기록
+    db = SessionLocal()
+    try:
+        log, usage = log_and_save_tokens(
+            db=db,
+            api_url=api_url,
+            method=method,
+            params={"job_id": job.id, "kind": job.kind, "items": len(job.items), "status": job.status},
+            request_tokens=job.request_tokens,
+            response_tokens=job.response_tokens
+        )
+        print(f"[RequestLog {log.id}] grade job {job.id} {job.status} "
+              f"({len(job.results)}/{len(job.items)}, failed={job.failed})", flush=True)
+    finally:
+        db.close()
+
+
+@router.post("/grade/jobs")
+async def create_grade_job(
+        file: UploadFile = File(...),
+        kind: str = Query("descriptive", description="descriptive(GradeItem) 또는 blank(BlankItem)"),
+        request: Request = None
+):
+    """
+    GradeItem / BlankItem 레코드가 한 줄에 하나씩 들어 있는 JSONL 파일을 받아 채점 작업을 시작합니다.
+    반환: {"job_id": ..., "total": 항목 수, "batches": 채점 묶음 수}
+    """
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind 는 {', '.join(JOB_KINDS)} 중 하나여야 합니다.")
+    raw = await file.read()
+    try:
+        items = await run_in_threadpool(parse_jsonl, raw, kind)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    api_url = str(request.url)
+    method = request.method
+
+    async def on_finish(job: GradeJob) -> None:
+        await run_in_threadpool(_log_job_usage, api_url, method, job)
+
+    job = start_job(kind, items, on_finish)
+    return {"job_id": job.id, "total": len(items), "batches": len(job.batches)}
+
+
+@router.get("/grade/jobs/{job_id}")
+async def get_grade_job(job_id: str):
+    """작업 진행률 (완료/실패 항목 수, 토큰 사용량, 상태)."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job.snapshot()
+
+
+@router.get("/grade/jobs/{job_id}/results")
+async def stream_grade_job_results(job_id: str):
+    """
+    채점 결과를 JSONL 로 스트리밍합니다. 작업이 진행 중이면 결과가 나오는 대로 이어서 보냅니다.
+    각 줄: {"index": 업로드 레코드 순서(0부터), "id": 문제 ID, "correct": true/false} 또는 {"index", "id", "error"}
+    """
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return StreamingResponse(job.stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,28 @@
+# MetricsController.py
+from fastapi import APIRouter
+from starlette.responses import Response
+
+from service import metrics
+from service.rate_limiter import chat_governor, whisper_governor
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    Prometheus 수집용 지표 (라우트별 응답 시간, 업스트림 지연 시간 / 토큰, ffmpeg 단계별 시간, DB 쓰기 시간 등).
+    """
+    body, content_type = metrics.exposition()
+    return Response(content=body, media_type=content_type)
+
+
+@router.get("/metrics/json")
+def get_metrics_json():
+    """
+    같은 지표의 JSON 요약 (히스토그램은 버킷으로 근사한 p50/p95/p99)과 속도 제한 버킷 상태.
+    """
+    return {
+        **metrics.snapshot(),
+        "rate_limiters": [chat_governor.stats(), whisper_governor.stats()],
+    }
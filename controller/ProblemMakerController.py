@@ -1,11 +1,18 @@
 # controllers.py
+import json
+
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from controller.DatabaseController import get_db
 from dto.CommonDTO import BlankRequestDTO, PromptRequest, MakeProblemRequest, GradeRequestDTO
+from repository.database import SessionLocal
 from repository.repository import log_and_save_tokens
-from service.gpt_service import grade_blank_items, ask_gpt, make_problem, grade_items
+from service.gpt_service import grade_blank_items_async, ask_gpt, make_problem, grade_items_async
+from service.problem_stream_service import make_problem_stream
+from service.rate_limiter import priority_lane
 
 router = APIRouter()
 
@@ -19,7 +26,7 @@ def ask_endpoint(req: PromptRequest):
 @router.post("/make-problem")
 def make_problems(req: MakeProblemRequest, db: Session = Depends(get_db), request: Request = None):
     try:
-        result = make_problem(req.content, req.difficulty, req.questionTypes)
+        result = make_problem(req.content, req.difficulty, req.questionTypes, parallel=req.parallel)
 
         # 리포지토리 함수 한 번으로 로깅 + 토큰 저장 + 매핑 처리
         log, usage = log_and_save_tokens(
@@ -30,6 +37,7 @@ def make_problems(req: MakeProblemRequest, db: Session = Depends(get_db), reques
             request_tokens=result["request_tokens"],
             response_tokens=result["response_tokens"]
         )
+        print(f"[RequestLog {log.id}] make-problem cache_hit={result.get('cache_hit', False)} coalesced={result.get('coalesced', False)}", flush=True)
 
         return {"result": result["result"]}
     except Exception as e:
@@ -37,6 +45,56 @@ def make_problems(req: MakeProblemRequest, db: Session = Depends(get_db), reques
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _format_sse(event: dict) -> str:
+    data = json.dumps(event["data"], ensure_ascii=False)
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+
+def _log_stream_usage(api_url: str, method: str, params: dict, data: dict) -> None:
+    # 스트리밍 응답은 요청 스코프의 세션이 먼저 닫히므로 별도 세션으로 기록
+    db = SessionLocal()
+    try:
+        log, usage = log_and_save_tokens(
+            db=db,
+            api_url=api_url,
+            method=method,
+            params=params,
+            request_tokens=data.get("request_tokens", 0),
+            response_tokens=data.get("response_tokens", 0)
+        )
+        print(f"[RequestLog {log.id}] make-problem/stream cache_hit={data.get('cache_hit', False)}"
+              f" aborted={data.get('aborted', False)}", flush=True)
+    finally:
+        db.close()
+
+
+@router.post("/make-problem/stream")
+async def make_problems_stream(req: MakeProblemRequest, request: Request = None):
+    """
+    /make-problem 의 Server-Sent Events 버전.
+    문제가 하나 완성될 때마다 "question" 이벤트를 보내고, 마지막에 "done"(또는 "error") 이벤트를 보냅니다.
+    """
+    api_url = str(request.url)
+    method = request.method
+    params = req.dict()
+
+    async def on_abort(data: dict) -> None:
+        # 클라이언트가 중간에 끊은 경우에도 이미 과금된 사용량을 기록
+        await run_in_threadpool(_log_stream_usage, api_url, method, params, {**data, "aborted": True})
+
+    async def event_source():
+        async for event in make_problem_stream(req.content, req.difficulty, req.questionTypes, on_abort=on_abort):
+            if event["event"] in ("done", "error"):
+                await run_in_threadpool(_log_stream_usage, api_url, method, params, event["data"])
+            yield _format_sse(event)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/grade")
 async def grade_endpoint(req: GradeRequestDTO, db: Session = Depends(get_db), request: Request = None):
     """
@@ -44,10 +102,13 @@ async def grade_endpoint(req: GradeRequestDTO, db: Session = Depends(get_db), re
     요청으로부터 items를 받아 GPT API를 통해 채점 후 점수와 문제 ID를 반환.
     """
     try:
-        result = grade_items(req.items)
+        # 대화형 채점은 전처리/대량 작업보다 먼저 업스트림 호출
+        with priority_lane("interactive"):
+            result = await grade_items_async(req.items)
 
-        # 리포지토리 함수 한 번으로 로깅 + 토큰 저장 + 매핑 처리
-        log, usage = log_and_save_tokens(
+        # 리포지토리 함수 한 번으로 로깅 + 토큰 저장 + 매핑 처리 (DB I/O 는 스레드풀에서)
+        log, usage = await run_in_threadpool(
+            log_and_save_tokens,
             db=db,
             api_url=str(request.url),
             method=request.method,
@@ -76,10 +137,13 @@ async def grade_blank_endpoint(req: BlankRequestDTO, db: Session = Depends(get_d
     }
     """
     try:
-        result = grade_blank_items(req.items)
+        # 대화형 채점은 전처리/대량 작업보다 먼저 업스트림 호출
+        with priority_lane("interactive"):
+            result = await grade_blank_items_async(req.items)
 
-        # 리포지토리 함수 한 번으로 로깅 + 토큰 저장 + 매핑 처리
-        log, usage = log_and_save_tokens(
+        # 리포지토리 함수 한 번으로 로깅 + 토큰 저장 + 매핑 처리 (DB I/O 는 스레드풀에서)
+        log, usage = await run_in_threadpool(
+            log_and_save_tokens,
             db=db,
             api_url=str(request.url),
             method=request.method,
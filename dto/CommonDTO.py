@@ -40,6 +40,7 @@ class MakeProblemRequest(BaseModel):
     content: str
     difficulty: str
     questionTypes: QuestionTypes
+    parallel: bool = False  # 문제 유형별로 생성 요청을 나눠 동시에 보낼지 여부
 
 
 class GradeItem(BaseModel):
@@ -96,7 +96,7 @@ Output must be in Korean.
 이 내용을 바탕으로 문제(객관식, OX, 빈칸 채우기, 서술형)를 만들기 좋게 요약해 주세요.
 
 요약 조건:
-- 전체 분량: 8000 토큰 내외
+- 전체 분량: {target_tokens} 토큰 내외
 - 핵심 개념, 정의, 용어 위주로 정리
 - 반복 문장, 불필요한 서술 제거
 - 구조적으로 정돈된 형태 추천 (예: 용어: 설명)
@@ -211,6 +211,25 @@ Output must be in Korean.
     {{"id": 문제ID, "score": 정수값}},
     ...
 ]
+"""
+
+    # 여러 평가 기준(역할)을 한 번의 호출로 채점하는 템플릿 (rubrics: '- "키" (역할 이름): 역할 설명' 목록)
+    multi_rubric_system_template = """
+학생이 입력한 답안을 정답과 비교해야 합니다.
+아래의 평가 기준 각각에 대해 서로 독립적으로 판단하고, 기준마다 확신 정도를 0~100 사이의 정수값으로 반환하십시오.
+한 기준의 판단이 다른 기준의 점수에 영향을 주어서는 안 됩니다.
+
+평가 기준:
+{rubrics}
+
+출력은 반드시 아래 JSON 형식의 텍스트로 작성되어야 하며, 코드 블럭이나 추가 설명은 포함되지 않아야 합니다.
+각 문제마다 모든 평가 기준의 키를 포함하십시오.
+출력 형식 예시는 다음과 같습니다:
+[
+    {{"id": 문제ID, {rubric_example}}},
+    {{"id": 문제ID, {rubric_example}}},
+    ...
+]
 """
 
     grade_user_template = """
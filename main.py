@@ -8,9 +8,16 @@ from repository.models import Base
 from controller.DatabaseController import router as db_router
 from controller.ProblemMakerController import router as maker_router
 from controller.ConverterController import router as converter_router
+from controller.GradeJobController import router as grade_job_router
+from controller.MetricsController import router as metrics_router
+from service.audio_job_service import start_audio_job_workers, stop_audio_job_workers
+from service.llm_gateway import close_client, warm_up_client
+from service.request_metrics import RequestMetricsMiddleware
 
 load_dotenv()
 app = FastAPI()
+# 라우트별 응답 시간 지표 (GET /metrics)
+app.add_middleware(RequestMetricsMiddleware)
 
 # DB 테이블 생성
 Base.metadata.create_all(bind=engine)
@@ -18,6 +25,22 @@ Base.metadata.create_all(bind=engine)
 app.include_router(db_router)
 app.include_router(maker_router)
 app.include_router(converter_router)
+app.include_router(grade_job_router)
+app.include_router(metrics_router)
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    # 재시작 전에 끝나지 않은 오디오 작업을 다시 큐에 넣고 워커 시작
+    await start_audio_job_workers()
+    # 첫 요청이 연결 수립 시간을 기다리지 않도록 OpenAI 연결을 미리 열어 둠
+    await warm_up_client()
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await stop_audio_job_workers()
+    await close_client()
 
 example_body = {
     "content": "시험 정리본",  # 사용자가 작성한 정리본
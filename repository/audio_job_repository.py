@@ -0,0 +1,146 @@
+# repository/audio_job_repository.py
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from repository.models import AudioJob
+
+
+def create_audio_job(db: Session, job_id: str, api_url: str, method: str,
+                     file_name: str, file_path: str, file_size: int) -> AudioJob:
+    job = AudioJob(
+        id=job_id,
+        status="queued",
+        api_url=api_url,
+        method=method,
+        file_name=file_name,
+        file_path=file_path,
+        file_size=file_size
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_audio_job(db: Session, job_id: str) -> Optional[AudioJob]:
+    return db.query(AudioJob).filter(AudioJob.id == job_id).first()
+
+
+def claim_audio_job(db: Session, job_id: str, owner: str, lease_seconds: float) -> Optional[AudioJob]:
+    """
+    queued 상태인 작업만 running 으로 바꾸고 owner 에게 lease_seconds 동안의 임대를 줍니다.
+    (이미 다른 워커가 처리 중이거나 완료면 None)
+    """
+    now = datetime.utcnow()
+    updated = db.query(AudioJob).filter(AudioJob.id == job_id, AudioJob.status == "queued").update(
+        {
+            AudioJob.status: "running",
+            AudioJob.started_at: now,
+            AudioJob.attempts: AudioJob.attempts + 1,
+            AudioJob.lease_owner: owner,
+            AudioJob.lease_expires_at: now + timedelta(seconds=lease_seconds)
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    if not updated:
+        return None
+    return get_audio_job(db, job_id)
+
+
+def renew_audio_job_lease(db: Session, job_id: str, owner: str, lease_seconds: float) -> bool:
+    """임대를 연장합니다. 이미 임대를 잃었으면(다른 워커가 회수) False."""
+    updated = db.query(AudioJob).filter(
+        AudioJob.id == job_id, AudioJob.status == "running", AudioJob.lease_owner == owner
+    ).update(
+        {AudioJob.lease_expires_at: datetime.utcnow() + timedelta(seconds=lease_seconds)},
+        synchronize_session=False
+    )
+    db.commit()
+    return bool(updated)
+
+
+def complete_audio_job(db: Session, job_id: str, owner: str, result_text: str,
+                       request_log_id: Optional[int]) -> bool:
+    """임대를 가진 워커만 완료 처리합니다. 반환: 반영 여부"""
+    updated = db.query(AudioJob).filter(
+        AudioJob.id == job_id, AudioJob.status == "running", AudioJob.lease_owner == owner
+    ).update(
+        {
+            AudioJob.status: "done",
+            AudioJob.result_text: result_text,
+            AudioJob.request_log_id: request_log_id,
+            AudioJob.finished_at: datetime.utcnow(),
+            AudioJob.file_path: None,
+            AudioJob.lease_owner: None,
+            AudioJob.lease_expires_at: None
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    return bool(updated)
+
+
+def fail_audio_job(db: Session, job_id: str, owner: str, error: str) -> bool:
+    """임대를 가진 워커만 실패 처리합니다. 반환: 반영 여부"""
+    updated = db.query(AudioJob).filter(
+        AudioJob.id == job_id, AudioJob.status == "running", AudioJob.lease_owner == owner
+    ).update(
+        {
+            AudioJob.status: "failed",
+            AudioJob.error: error,
+            AudioJob.finished_at: datetime.utcnow(),
+            AudioJob.file_path: None,
+            AudioJob.lease_owner: None,
+            AudioJob.lease_expires_at: None
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    return bool(updated)
+
+
+def release_audio_job_leases(db: Session, owner: str) -> int:
+    """정상 종료 시 호출. owner 가 실행 중이던 작업을 바로 다시 queued 로 돌립니다. 반환: 작업 수"""
+    updated = db.query(AudioJob).filter(AudioJob.status == "running", AudioJob.lease_owner == owner).update(
+        {AudioJob.status: "queued", AudioJob.lease_owner: None, AudioJob.lease_expires_at: None},
+        synchronize_session=False
+    )
+    db.commit()
+    return updated
+
+
+def requeue_expired_audio_jobs(db: Session, max_attempts: int,
+                               queued_before: datetime) -> Tuple[List[str], List[str]]:
+    """
+    임대가 만료된(워커가 죽었거나 멈춘) running 작업을 회수합니다.
+    시도 횟수가 남아 있으면 다시 queued 로, 넘었으면 failed 로 바꿉니다.
+    살아 있는 워커가 연장 중인 작업은 건드리지 않습니다.
+    반환: (queued_before 이전에 만들어져 아직 queued 인 작업 ID 목록(생성 순서), 지워도 되는 업로드 파일 경로 목록)
+    """
+    now = datetime.utcnow()
+    orphan_paths = []
+    expired = db.query(AudioJob).filter(
+        AudioJob.status == "running",
+        or_(AudioJob.lease_expires_at.is_(None), AudioJob.lease_expires_at < now)
+    ).all()
+    for job in expired:
+        job.lease_owner = None
+        job.lease_expires_at = None
+        if job.attempts < max_attempts and job.file_path:
+            job.status = "queued"
+        else:
+            job.status = "failed"
+            job.error = "작업을 처리하던 워커가 중단되었습니다."
+            job.finished_at = now
+            if job.file_path:
+                orphan_paths.append(job.file_path)
+                job.file_path = None
+    db.commit()
+    queued = db.query(AudioJob).filter(
+        AudioJob.status == "queued", AudioJob.created_at <= queued_before
+    ).order_by(AudioJob.created_at).all()
+    return [job.id for job in queued], orphan_paths
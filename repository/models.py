@@ -32,4 +32,29 @@ class RequestLog(Base):
 
     # 토큰 사용량과 1:1 매핑한다고 가정 (한번의 요청마다 토큰 사용량이 기록된다고 보면 됨)
     token_usage_id = Column(Integer, ForeignKey("token_usage.id"), nullable=True)
-    token_usage = relationship("TokenUsage", back_populates="request_log")
\ No newline at end of file
+    token_usage = relationship("TokenUsage", back_populates="request_log")
+
+class AudioJob(Base):
+    __tablename__ = "audio_job"
+
+    id = Column(String(32), primary_key=True)                     # 작업 ID (uuid hex)
+    status = Column(String(16), nullable=False, index=True)       # queued, running, done, failed
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)         # 실행 시도 횟수 (재시작 후 재실행 포함)
+    lease_owner = Column(String(64), nullable=True)               # 실행 중인 워커 (호스트:PID:난수)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)  # 워커가 주기적으로 연장, 지나면 다른 워커가 회수
+
+    api_url = Column(String(200), nullable=False)                 # 작업을 만든 요청 (완료 시 RequestLog 기록용)
+    method = Column(String(10), nullable=False)
+    file_name = Column(String(255), nullable=True)
+    file_path = Column(String(500), nullable=True)                # 스풀 디렉터리에 저장한 업로드 파일 (완료 후 삭제)
+    file_size = Column(Integer, nullable=True)
+
+    # 긴 강의 전사 결과도 담을 수 있도록 MySQL 에서는 LONGTEXT 로 생성
+    result_text = Column(Text(length=4294967295), nullable=True)
+    error = Column(Text, nullable=True)
+
+    request_log_id = Column(Integer, ForeignKey("request_log.id"), nullable=True)
+    request_log = relationship("RequestLog")
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
 from repository.models import TokenUsage, RequestLog
+from service import metrics
 
 
 def add_token_usage(db: Session, request_tokens: int, response_tokens: int):
@@ -95,13 +96,14 @@ def log_and_save_tokens(
     RequestLog 생성 → TokenUsage 생성 → 두 테이블 매핑 과정을
     한 번에 처리하는 헬퍼 함수.
     """
-    # 1) RequestLog 생성
-    log = create_request_log(db, api_url, method, params)
+    with metrics.timer("db_write_seconds", op="log_and_save_tokens"):
+        # 1) RequestLog 생성
+        log = create_request_log(db, api_url, method, params)
 
-    # 2) TokenUsage 저장
-    usage = add_token_usage(db, request_tokens, response_tokens)
+        # 2) TokenUsage 저장
+        usage = add_token_usage(db, request_tokens, response_tokens)
 
-    # 3) 두 개 연결
-    link_token_usage(db, log.id, usage.id)
+        # 3) 두 개 연결
+        link_token_usage(db, log.id, usage.id)
 
     return log, usage
@@ -0,0 +1,297 @@
+# service/audio_job_service.py
+"""
+오디오 전사 백그라운드 작업.
+
+업로드 파일은 스풀 디렉터리(AUDIO_JOB_SPOOL_DIR)에 저장하고 작업 상태는 DB(audio_job 테이블)에 기록합니다.
+워커 풀(AUDIO_JOB_WORKERS)이 transcribe_audio_filelike + audio_text_processing 을 실행하고,
+완료되면 토큰 사용량을 RequestLog 에 남긴 뒤 결과 텍스트를 작업에 저장합니다.
+
+uvicorn 워커/레플리카가 여러 개여도 되도록 실행 중인 작업은 임대(lease)로 관리합니다.
+- 작업을 가져간 워커는 AUDIO_JOB_LEASE_SECONDS 동안 유효한 임대를 받고, 처리 중 주기적으로 연장합니다.
+- 각 프로세스는 주기적으로(그리고 시작할 때) 임대가 만료된 작업만 회수해 다시 큐에 넣습니다.
+  (시도 횟수 AUDIO_JOB_MAX_ATTEMPTS 까지) 살아 있는 다른 워커가 처리 중인 작업은 건드리지 않습니다.
+- 임대를 잃은 워커는 처리를 중단하고, 완료/실패 기록도 임대를 가진 워커만 할 수 있습니다.
+- 정상 종료 시에는 처리 중이던 작업의 임대를 반납해 바로 다시 실행되게 합니다.
+업로드 파일은 모든 워커가 읽을 수 있는 위치(공유 볼륨)에 AUDIO_JOB_SPOOL_DIR 로 두어야 합니다.
+"""
+import asyncio
+import os
+import socket
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from repository.audio_job_repository import (
+    create_audio_job, get_audio_job, claim_audio_job, renew_audio_job_lease, complete_audio_job,
+    fail_audio_job, release_audio_job_leases, requeue_expired_audio_jobs
+)
+from repository.database import SessionLocal
+from repository.repository import log_and_save_tokens
+from service.content_preprocessor_gpt import audio_text_processing_async
+from service.stt_service import transcribe_audio_filelike_async
+from service.usage_meter import usage_scope
+
+load_dotenv()
+
+AUDIO_JOB_WORKERS = int(os.getenv("AUDIO_JOB_WORKERS", "2"))
+AUDIO_JOB_MAX_ATTEMPTS = int(os.getenv("AUDIO_JOB_MAX_ATTEMPTS", "2"))
+AUDIO_JOB_SPOOL_DIR = os.getenv("AUDIO_JOB_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "audio_jobs")
+# 임대 유효 시간 (처리 중에는 1/3 주기로 연장, 만료된 작업은 같은 주기로 회수)
+AUDIO_JOB_LEASE_SECONDS = float(os.getenv("AUDIO_JOB_LEASE_SECONDS", "60"))
+# 롱 폴링 중 DB 를 다시 확인하는 주기
+AUDIO_JOB_POLL_SECONDS = float(os.getenv("AUDIO_JOB_POLL_SECONDS", "1"))
+
+# 이 프로세스를 구분하는 임대 소유자 ID
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+# 이 프로세스 큐에 들어 있는 작업 (회수 주기마다 같은 작업을 중복으로 넣지 않도록)
+_enqueued: Set[str] = set()
+# 같은 프로세스에서 끝난 작업은 롱 폴링을 바로 깨움 (다른 워커가 끝낸 작업은 DB 폴링으로 확인)
+# 작업 ID -> 기다리는 요청마다 하나씩 등록한 이벤트 (요청이 끝나면 직접 제거)
+_finished_events: Dict[str, Set[asyncio.Event]] = {}
+
+
+def _with_session(fn, *args, **kwargs):
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+async def _run_db(fn, *args, **kwargs):
+    # DB I/O 는 이벤트 루프를 막지 않도록 스레드에서 실행
+    return await asyncio.to_thread(_with_session, fn, *args, **kwargs)
+
+
+def _job_to_dict(job) -> dict:
+    data = {
+        "job_id": job.id,
+        "status": job.status,
+        "file_name": job.file_name,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == "done":
+        data["text"] = job.result_text
+    if job.status == "failed":
+        data["error"] = job.error
+    return data
+
+
+def _get_job_dict(db, job_id: str) -> Optional[dict]:
+    job = get_audio_job(db, job_id)
+    return _job_to_dict(job) if job is not None else None
+
+
+def _create_job_dict(db, *args) -> dict:
+    return _job_to_dict(create_audio_job(db, *args))
+
+
+def _log_usage(db, api_url: str, method: str, params: dict, request_tokens: int, response_tokens: int) -> int:
+    log, usage = log_and_save_tokens(
+        db=db,
+        api_url=api_url,
+        method=method,
+        params=params,
+        request_tokens=request_tokens,
+        response_tokens=response_tokens
+    )
+    return log.id
+
+
+def _write_file(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _remove_file(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _notify_finished(job_id: str) -> None:
+    for event in _finished_events.pop(job_id, ()):
+        event.set()
+
+
+def _enqueue(job_id: str) -> None:
+    if job_id not in _enqueued:
+        _enqueued.add(job_id)
+        _queue.put_nowait(job_id)
+
+
+async def _execute(job) -> None:
+    job_id = job.id
+    try:
+        audio_bytes = await asyncio.to_thread(_read_file, job.file_path)
+        # Whisper 전사 + 정제 호출의 사용량을 함께 집계
+        with usage_scope() as meter:
+            transcript = await transcribe_audio_filelike_async(audio_bytes)
+            result = await audio_text_processing_async(transcript)
+        log_id = await _run_db(
+            _log_usage, job.api_url, job.method, {"audioJob": job_id, "audioFile": transcript},
+            meter.request_tokens, meter.response_tokens
+        )
+        saved = await _run_db(complete_audio_job, job_id, WORKER_ID, result["result"], log_id)
+        print(f"[RequestLog {log_id}] audio job {job_id} done saved={saved} cache_hit={result.get('cache_hit', False)} coalesced={result.get('coalesced', False)}", flush=True)
+    except Exception as e:
+        print(f"[AudioJob {job_id}] failed: {e}", flush=True)
+        saved = await _run_db(fail_audio_job, job_id, WORKER_ID, str(e))
+    # 임대를 잃어 다른 워커가 다시 실행 중이면 파일을 남겨 둠
+    # (취소(서버 종료 / 임대 상실)된 경우에도 여기까지 오지 않으므로 파일이 남음)
+    if saved:
+        await asyncio.to_thread(_remove_file, job.file_path)
+    _notify_finished(job_id)
+
+
+async def _keep_lease(job_id: str, work: asyncio.Task) -> bool:
+    """처리 중 임대를 주기적으로 연장합니다. 임대를 잃으면 처리를 취소하고 True 를 반환합니다."""
+    while True:
+        await asyncio.sleep(AUDIO_JOB_LEASE_SECONDS / 3)
+        try:
+            renewed = await _run_db(renew_audio_job_lease, job_id, WORKER_ID, AUDIO_JOB_LEASE_SECONDS)
+        except Exception as e:
+            # DB 일시 오류면 다음 주기에 다시 시도 (그 사이 만료되면 다른 워커가 회수)
+            print(f"[AudioJob {job_id}] lease renewal error: {e}", flush=True)
+            continue
+        if not renewed:
+            print(f"[AudioJob {job_id}] lease lost, cancelling", flush=True)
+            work.cancel()
+            return True
+
+
+async def _process(job_id: str) -> None:
+    job = await _run_db(claim_audio_job, job_id, WORKER_ID, AUDIO_JOB_LEASE_SECONDS)
+    if job is None:
+        return
+    print(f"[AudioJob {job_id}] start (attempt {job.attempts}, worker {WORKER_ID})", flush=True)
+    work = asyncio.ensure_future(_execute(job))
+    lease = asyncio.ensure_future(_keep_lease(job_id, work))
+    try:
+        await work
+    except asyncio.CancelledError:
+        if not (lease.done() and not lease.cancelled() and lease.result()):
+            # 서버 종료로 워커가 취소됨: 처리도 중단
+            work.cancel()
+            raise
+    finally:
+        lease.cancel()
+
+
+async def _worker() -> None:
+    while True:
+        job_id = await _queue.get()
+        _enqueued.discard(job_id)
+        try:
+            await _process(job_id)
+        except Exception as e:
+            print(f"[AudioJob {job_id}] worker error: {e}", flush=True)
+        finally:
+            _queue.task_done()
+
+
+async def _recover(queued_before: datetime) -> None:
+    """임대가 만료된 작업을 회수하고, queued_before 이전부터 기다리는 작업을 이 프로세스 큐에 넣습니다."""
+    queued_ids, orphan_paths = await _run_db(requeue_expired_audio_jobs, AUDIO_JOB_MAX_ATTEMPTS, queued_before)
+    for path in orphan_paths:
+        await asyncio.to_thread(_remove_file, path)
+    new_ids = [job_id for job_id in queued_ids if job_id not in _enqueued]
+    for job_id in new_ids:
+        _enqueue(job_id)
+    if new_ids:
+        print(f"[AudioJob] enqueued {len(new_ids)} recovered/waiting job(s)", flush=True)
+
+
+async def _reaper() -> None:
+    while True:
+        await asyncio.sleep(AUDIO_JOB_LEASE_SECONDS)
+        try:
+            # 다른 워커 큐에서 막 기다리기 시작한 작업은 그 워커에 맡김 (가져가기는 claim 으로 한 번만 성공)
+            await _recover(datetime.utcnow() - timedelta(seconds=AUDIO_JOB_LEASE_SECONDS))
+        except Exception as e:
+            print(f"[AudioJob] lease sweep error: {e}", flush=True)
+
+
+async def start_audio_job_workers() -> None:
+    """앱 시작 시 호출: 임대가 만료된 작업과 기다리는 작업을 큐에 넣고 워커와 회수 태스크를 띄웁니다."""
+    global _queue
+    _queue = asyncio.Queue()
+    _enqueued.clear()
+    await _recover(datetime.utcnow())
+    for _ in range(max(1, AUDIO_JOB_WORKERS)):
+        _workers.append(asyncio.ensure_future(_worker()))
+    _workers.append(asyncio.ensure_future(_reaper()))
+
+
+async def stop_audio_job_workers() -> None:
+    """앱 종료 시 호출: 처리 중이던 작업을 중단하고 임대를 반납해 다른 워커(또는 재시작 후)가 바로 다시 실행하게 합니다."""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    released = await _run_db(release_audio_job_leases, WORKER_ID)
+    if released:
+        print(f"[AudioJob] released {released} running job(s)", flush=True)
+
+
+async def submit_audio_job(audio_bytes: bytes, file_name: str, api_url: str, method: str) -> dict:
+    """업로드 파일을 스풀에 저장하고 작업을 큐에 넣은 뒤 바로 작업 정보를 반환합니다."""
+    if _queue is None:
+        raise RuntimeError("오디오 작업 워커가 시작되지 않았습니다.")
+    job_id = uuid.uuid4().hex
+    path = os.path.join(AUDIO_JOB_SPOOL_DIR, f"{job_id}.mp3")
+    await asyncio.to_thread(_write_file, path, audio_bytes)
+    try:
+        job = await _run_db(_create_job_dict, job_id, api_url, method, file_name, path, len(audio_bytes))
+    except Exception:
+        await asyncio.to_thread(_remove_file, path)
+        raise
+    _enqueue(job_id)
+    return job
+
+
+async def get_audio_job_status(job_id: str, wait: float = 0) -> Optional[dict]:
+    """
+    작업 상태를 반환합니다. wait 초를 주면 작업이 끝날 때까지 최대 wait 초 기다립니다. (롱 폴링)
+    다른 워커가 처리하는 작업도 알 수 있도록 AUDIO_JOB_POLL_SECONDS 마다 DB 를 다시 확인합니다.
+    없는 작업이면 None.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    job = await _run_db(_get_job_dict, job_id)
+    if job is None or wait <= 0 or job["status"] in ("done", "failed"):
+        return job
+    event = asyncio.Event()
+    _finished_events.setdefault(job_id, set()).add(event)
+    try:
+        while job is not None and job["status"] not in ("done", "failed"):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, AUDIO_JOB_POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            job = await _run_db(_get_job_dict, job_id)
+    finally:
+        # 다른 워커가 끝낸 작업이나 시간 초과로 끝난 대기도 등록을 지워 쌓이지 않게 함
+        waiters = _finished_events.get(job_id)
+        if waiters is not None:
+            waiters.discard(event)
+            if not waiters:
+                del _finished_events[job_id]
+    return job
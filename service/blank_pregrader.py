@@ -0,0 +1,91 @@
+# service/blank_pregrader.py
+"""
+빈칸 채우기 답안의 로컬 사전 채점.
+
+정답과 학생 답안을 정규화해서 결과가 분명한 항목은 LLM 호출 없이 바로 판정합니다.
+- 모든 빈칸이 정규화 후 정답과 같으면 정답
+- 답안을 하나도 쓰지 않았으면(모든 빈칸이 비어 있음) 오답
+- 그 밖의 항목(동의어, 다른 언어 표현, 오타, 일부만 쓴 답안, 빈칸 수가 다른 답안 등)은 LLM 채점으로 넘깁니다.
+
+정규화: NFKC(전각 문자 → 반각, 한글 호환 자모 → 자모) + NFC, 대소문자, 공백,
+앞뒤 문장부호/따옴표. 단어 안쪽의 기호("C#", "C++")는 의미가 달라질 수 있어 그대로 둡니다.
+
+학생 답안 끝의 조사("시험은" → "시험")는 떼고 남은 부분이 2글자 이상이고 정답이 그 글자로 끝나지 않을 때만
+로컬에서 정답으로 봅니다. 한 글자 조사(이, 가, 의, 도, 로 …)는 단어의 일부일 수 있어서
+("속도" 는 "속" + "도" 가 아님) 그 밖의 경우는 LLM 에 맡깁니다.
+"""
+import unicodedata
+from typing import List, Optional, Tuple
+
+from dto.CommonDTO import BlankItem, BlankResult
+
+# 긴 조사부터 검사 ("에서" 를 "서" 보다 먼저)
+_PARTICLES = sorted(
+    ["은", "는", "이", "가", "을", "를", "의", "에", "에서", "에게", "으로", "로", "와", "과", "도", "만",
+     "이다", "입니다", "이며", "이고", "라고", "이라고"],
+    key=len, reverse=True
+)
+
+
+# 답안 앞뒤에서 떼어낼 문장부호/괄호/따옴표 (NFKC 이후 기준, '#', '+', '%' 처럼 의미 있는 기호는 제외)
+_EDGE_PUNCT = set(".,!?;:'\"`()[]{}<>·。、“”‘’「」『』《》〈〉")
+
+
+def _is_edge_punct(ch: str) -> bool:
+    return ch in _EDGE_PUNCT
+
+
+def normalize_answer(text: str) -> str:
+    text = unicodedata.normalize("NFKC", str(text or ""))
+    text = unicodedata.normalize("NFC", text).casefold()
+    text = "".join(text.split())
+    start, end = 0, len(text)
+    while start < end and _is_edge_punct(text[start]):
+        start += 1
+    while end > start and _is_edge_punct(text[end - 1]):
+        end -= 1
+    return text[start:end]
+
+
+def blank_matches(answer: str, student_input: str) -> Optional[bool]:
+    """
+    True: 정규화 후 같음 (또는 안전하게 조사를 뗀 뒤 같음)
+    None: 조사를 떼면 같지만 단어의 일부일 수 있어 판단 보류
+    False: 일치하지 않음
+    """
+    expected = normalize_answer(answer)
+    given = normalize_answer(student_input)
+    if not expected or not given:
+        return False
+    if given == expected:
+        return True
+    for particle in _PARTICLES:
+        if given.endswith(particle) and given[:-len(particle)] == expected:
+            if len(expected) >= 2 and not expected.endswith(particle[-1]):
+                return True
+            return None
+    return False
+
+
+def pregrade_blank_item(item: BlankItem) -> Optional[bool]:
+    """분명한 항목이면 True/False, LLM 판단이 필요하면 None."""
+    inputs = list(item.input or [])
+    if not any(normalize_answer(value) for value in inputs):
+        return False
+    if len(inputs) == len(item.answer) and all(
+            blank_matches(answer, value) is True for answer, value in zip(item.answer, inputs)):
+        return True
+    return None
+
+
+def pregrade_blank_items(items: List[BlankItem]) -> Tuple[List[BlankResult], List[BlankItem]]:
+    """반환: (로컬에서 판정한 결과, LLM 으로 보낼 항목)"""
+    decided: List[BlankResult] = []
+    pending: List[BlankItem] = []
+    for item in items:
+        verdict = pregrade_blank_item(item)
+        if verdict is None:
+            pending.append(item)
+        else:
+            decided.append(BlankResult(id=item.id, correct=verdict))
+    return decided, pending
@@ -1,12 +1,16 @@
 # content_preprocessor_gpt.py
 import os
-import tiktoken
 
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from service import metrics
+from service.llm_gateway import chat_text, run_sync
+from service.rate_limiter import priority_lane
+from service.response_cache import cache_from_env, make_cache_key, normalize_text
+from service.single_flight import SingleFlight, run_coalesced
+from service.usage_meter import usage_scope
 
 load_dotenv()  # .env 파일 불러오기
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 gpt_model = os.getenv("GPT_MODEL")
 gpt_problem_model = os.getenv("GPT_PROBLEM_MODEL")
 
@@ -14,7 +18,12 @@ gpt_request_cost = float(os.getenv("GPT_REQUEST_COST"))
 gpt_response_cost = float(os.getenv("GPT_RESPONSE_COST"))
 exchange_rate = float(os.getenv("EXCHANGE_RATE"))
 
-tokenizer = tiktoken.encoding_for_model(gpt_model)
+# 같은 추출 텍스트에 대한 정제 결과를 재사용하기 위한 캐시
+pdf_cache = cache_from_env("pdf_text_processing")
+audio_cache = cache_from_env("audio_text_processing")
+# 같은 텍스트로 동시에 들어온 정제 요청은 진행 중인 호출 하나를 공유
+pdf_flight = SingleFlight("pdf_text_processing")
+audio_flight = SingleFlight("audio_text_processing")
 
 pdf_text_processing_system_template = """
 당신은 전문 텍스트 정제 및 편집 어시스턴트입니다.
@@ -33,38 +42,54 @@ pdf_text_processing_user_template = """
 """
 
 
-def pdf_text_processing(text: str) -> dict:
+async def pdf_text_processing_async(text: str) -> dict:
     """
     PDF에서 추출한 텍스트를 전처리하는 함수입니다.
     - 불필요한 공백 제거
     - 줄바꿈 문자 제거
     """
-    request_token_sum = 0
-    response_token_sum = 0
-
-    request_token_sum += len(tokenizer.encode(text))
-
-    response = client.chat.completions.create(
-        model=gpt_model,
-        messages=[
-            {
-                "role": "system",
-                "content": pdf_text_processing_system_template
-            },
-            {
-                "role": "user",
-                "content": pdf_text_processing_user_template.format(text=text)
-            }
-        ]
-    )
-    response = response.choices[0].message.content.strip()
-    response_token_sum += len(tokenizer.encode(response))
-
-    return {
-        "result": response,
-        "request_tokens": request_token_sum,
-        "response_tokens": response_token_sum,
-    }
+    cache_key = make_cache_key("pdf_text_processing", gpt_model, normalize_text(text))
+    cached = await pdf_cache.aget(cache_key)
+    pdf_cache.report(cached is not None)
+    if cached is not None:
+        return {
+            "result": cached,
+            "request_tokens": 0,
+            "response_tokens": 0,
+            "cache_hit": True,
+        }
+
+    async def process() -> dict:
+        # 토큰 사용량은 업스트림 응답의 usage 로 집계 (전처리는 bulk 레인)
+        with usage_scope() as meter, priority_lane("bulk"):
+            response = await chat_text(
+                model=gpt_model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": pdf_text_processing_system_template
+                    },
+                    {
+                        "role": "user",
+                        "content": pdf_text_processing_user_template.format(text=text)
+                    }
+                ]
+            )
+
+        await pdf_cache.aset(cache_key, response)
+
+        return {
+            "result": response,
+            "request_tokens": meter.request_tokens,
+            "response_tokens": meter.response_tokens,
+            "cache_hit": False,
+        }
+
+    return await run_coalesced(pdf_flight, cache_key, process)
+
+
+def pdf_text_processing(text: str) -> dict:
+    return run_sync(pdf_text_processing_async, text)
 
 
 
@@ -87,7 +112,7 @@ audio_text_processing_user_template = """
 {text}
 """
 
-def audio_text_processing(text: str) -> dict:
+async def audio_text_processing_async(text: str) -> dict:
     """
     Whisper API 전사 텍스트를 정제하고 요약하여 반환합니다.
 
@@ -95,26 +120,43 @@ def audio_text_processing(text: str) -> dict:
     :return: {
         "result": 정제 및 요약된 텍스트,
         "request_tokens": 요청에 사용된 토큰 수,
-        "response_tokens": 응답에 사용된 토큰 수
+        "response_tokens": 응답에 사용된 토큰 수,
+        "cache_hit": 캐시 적중 여부
     }
     """
-    # 토큰 사용량 계산
-    request_tokens = len(tokenizer.encode(text))
-
-    # GPT 호출
-    response = client.chat.completions.create(
-        model=gpt_model,
-        messages=[
-            {"role": "system", "content": audio_text_processing_system_template},
-            {"role": "user", "content": audio_text_processing_user_template.format(text=text)}
-        ]
-    )
-    # 응답 텍스트 추출 및 토큰 계산
-    result_text = response.choices[0].message.content.strip()
-    response_tokens = len(tokenizer.encode(result_text))
-
-    return {
-        "result": result_text,
-        "request_tokens": request_tokens,
-        "response_tokens": response_tokens,
-    }
\ No newline at end of file
+    cache_key = make_cache_key("audio_text_processing", gpt_model, normalize_text(text))
+    cached = await audio_cache.aget(cache_key)
+    audio_cache.report(cached is not None)
+    if cached is not None:
+        return {
+            "result": cached,
+            "request_tokens": 0,
+            "response_tokens": 0,
+            "cache_hit": True,
+        }
+
+    async def process() -> dict:
+        # GPT 호출 (토큰 사용량은 응답의 usage 로 집계, 전처리는 bulk 레인)
+        with usage_scope() as meter, priority_lane("bulk"), metrics.timer("audio_stage_seconds", stage="refine"):
+            result_text = await chat_text(
+                model=gpt_model,
+                messages=[
+                    {"role": "system", "content": audio_text_processing_system_template},
+                    {"role": "user", "content": audio_text_processing_user_template.format(text=text)}
+                ]
+            )
+
+        await audio_cache.aset(cache_key, result_text)
+
+        return {
+            "result": result_text,
+            "request_tokens": meter.request_tokens,
+            "response_tokens": meter.response_tokens,
+            "cache_hit": False,
+        }
+
+    return await run_coalesced(audio_flight, cache_key, process)
+
+
+def audio_text_processing(text: str) -> dict:
+    return run_sync(audio_text_processing_async, text)
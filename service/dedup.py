@@ -0,0 +1,138 @@
+# service/dedup.py
+"""
+생성된 문제의 유사 중복 검출 (LLM 호출 없이 로컬에서 처리).
+
+문제 본문을 정규화(NFC, 소문자, 공백/문장부호 제거)한 뒤 글자 n-gram(shingle) 집합으로 만들고,
+MinHash 서명 + LSH 밴드로 후보를 빠르게 찾은 다음 실제 자카드 유사도로 확인합니다.
+한국어는 띄어쓰기/조사 차이가 많아 단어 단위보다 글자 n-gram 이 바꿔 쓴 문장을 더 잘 잡습니다.
+
+시험 문제는 "다음 중 TCP(UDP) 의 특징으로 옳지 않은 것은?" 처럼 틀이 같은 경우가 많아서 본문 유사도만으로는
+서로 다른 문제를 합쳐 버립니다. 그래서 정답과 선지(answer_key)가 같을 때만 중복으로 보고,
+본문 임계값도 높게(기본 0.85) 둡니다.
+"""
+import json
+import os
+import random
+import re
+import unicodedata
+import zlib
+from typing import Dict, List, Set, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 정답/선지가 같고 본문 유사도가 이 값 이상이면 같은 문제로 봄 (글자 n-gram 자카드 유사도)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", "0.85"))
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+# 밴드당 2행: 임계값 근처 쌍은 거의 항상 후보가 되고, 최종 판정은 실제 자카드 유사도로 함
+BANDS = 32
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# 프로세스와 무관하게 같은 결과가 나오도록 고정 시드로 해시 순열 생성
+_rng = random.Random(20250101)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+_STRIP_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_question(text: str) -> str:
+    text = unicodedata.normalize("NFC", str(text or "")).lower()
+    return _STRIP_RE.sub("", text)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    compact = normalize_question(text)
+    if not compact:
+        return set()
+    if len(compact) <= size:
+        return {zlib.crc32(compact.encode("utf-8"))}
+    return {zlib.crc32(compact[i:i + size].encode("utf-8")) for i in range(len(compact) - size + 1)}
+
+
+def _normalize_value(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return json.dumps([_normalize_value(v) for v in value], ensure_ascii=False)
+    return normalize_question(value)
+
+
+def answer_key(item: dict) -> str:
+    """정답과 선지(순서 무관)를 정규화한 문자열. 이 값이 다른 두 문제는 중복으로 보지 않습니다."""
+    key = _normalize_value(item.get("answer"))
+    options = item.get("options")
+    if isinstance(options, list):
+        key += "\x1f" + json.dumps(sorted(_normalize_value(o) for o in options), ensure_ascii=False)
+    return key
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(shingle_set: Set[int]) -> Tuple[int, ...]:
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in shingle_set)
+        for a, b in _PERMUTATIONS
+    )
+
+
+class NearDuplicateIndex:
+    """add() 로 문제를 하나씩 넣으며 이미 들어간 문제와 유사한지 확인합니다."""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._rows = NUM_PERM // BANDS
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(BANDS)]
+        self._sets: List[Set[int]] = []
+        self._answers: List[str] = []
+
+    def _candidates(self, signature: Tuple[int, ...]) -> Set[int]:
+        found: Set[int] = set()
+        for band, bucket in enumerate(self._buckets):
+            found.update(bucket.get(signature[band * self._rows:(band + 1) * self._rows], ()))
+        return found
+
+    def add(self, text: str, answer: str = "") -> bool:
+        """
+        새 문제면 색인에 넣고 True, 정답(answer)이 같은 기존 문제와 본문이 유사하면 넣지 않고 False 를 반환합니다.
+        """
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return True
+        signature = minhash(shingle_set)
+        for idx in self._candidates(signature):
+            if self._answers[idx] == answer and jaccard(shingle_set, self._sets[idx]) >= self.threshold:
+                return False
+        idx = len(self._sets)
+        self._sets.append(shingle_set)
+        self._answers.append(answer)
+        for band, bucket in enumerate(self._buckets):
+            bucket.setdefault(signature[band * self._rows:(band + 1) * self._rows], []).append(idx)
+        return True
+
+    def add_problem(self, item: dict) -> bool:
+        """문제 객체(question / answer / options)를 넣습니다. 반환값은 add 와 같습니다."""
+        return self.add(item.get("question", ""), answer_key(item))
+
+
+def dedupe_problems(data: dict, threshold: float = DEDUP_THRESHOLD) -> Tuple[dict, Dict[str, int]]:
+    """
+    유형별로 먼저 나온 문제를 남기고 유사 중복 문제를 제거합니다.
+    반환: (중복 제거된 dict, 유형별 제거된 개수)
+    """
+    deduped = {}
+    dropped: Dict[str, int] = {}
+    for q_type, items in data.items():
+        if not isinstance(items, list):
+            deduped[q_type] = items
+            continue
+        index = NearDuplicateIndex(threshold)
+        kept = [item for item in items if not isinstance(item, dict) or index.add_problem(item)]
+        deduped[q_type] = kept
+        if len(kept) < len(items):
+            dropped[q_type] = len(items) - len(kept)
+    return deduped, dropped
@@ -0,0 +1,224 @@
+# service/fake_llm.py
+"""
+OpenAI 를 부르지 않는 프로세스 내부 가짜 백엔드 (LLM_BACKEND=fake).
+
+부하 테스트 / 벤치마크용입니다. 프롬프트를 보고 서비스가 기대하는 형식의 응답을 만듭니다.
+- 문제 생성 / 후속 생성: 요청된 유형별 개수만큼의 문제 JSON (문제끼리 중복 검출에 걸리지 않도록 서로 다른 문장)
+- 서술형 / 빈칸 채점: 문제 ID 별 {"id", "score"} (다중 기준이면 기준 키별 점수). 점수는 정답과 학생 답안의 유사도
+- 그 밖의 요청(요약, 전처리, ask): 입력 일부를 돌려주는 텍스트
+- 전사: 파일 크기에 비례하는 길이의 텍스트
+
+같은 입력이면 같은 응답을 돌려줍니다. (FAKE_LLM_SEED 로 시드 변경)
+지연 시간 = (FAKE_LLM_LATENCY_MS + 응답 토큰 수 × FAKE_LLM_MS_PER_TOKEN) × exp(N(0, FAKE_LLM_LATENCY_JITTER)),
+문장 길이는 FAKE_LLM_TEXT_SCALE 배로 조절해 응답 토큰 분포를 바꿀 수 있습니다.
+max_tokens 를 넘는 응답은 잘라서 finish_reason="length" 로 돌려줍니다.
+"""
+import asyncio
+import difflib
+import json
+import math
+import os
+import random
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from dotenv import load_dotenv
+from openai.types.audio import Transcription
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from service.llm_backend import LLMBackend, file_sha256
+from service.response_cache import make_cache_key
+from service.token_counter import get_token_counter
+from service.usage_meter import count_message_tokens
+
+load_dotenv()
+
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED", "0")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+FAKE_LLM_MS_PER_TOKEN = float(os.getenv("FAKE_LLM_MS_PER_TOKEN", "0"))
+FAKE_LLM_LATENCY_JITTER = float(os.getenv("FAKE_LLM_LATENCY_JITTER", "0.2"))
+FAKE_LLM_TEXT_SCALE = float(os.getenv("FAKE_LLM_TEXT_SCALE", "1.0"))
+FAKE_WHISPER_LATENCY_MS = float(os.getenv("FAKE_WHISPER_LATENCY_MS", "500"))
+# 전사 텍스트 한 문장에 해당하는 오디오 바이트 수
+FAKE_WHISPER_BYTES_PER_SENTENCE = int(os.getenv("FAKE_WHISPER_BYTES_PER_SENTENCE", "16000"))
+STREAM_CHUNK_CHARS = 16
+
+_WORDS = [
+    "광합성", "엽록체", "세포막", "미토콘드리아", "효소", "단백질", "유전자", "염색체", "삼투", "확산",
+    "항상성", "호르몬", "뉴런", "시냅스", "생태계", "먹이사슬", "분해자", "질소순환", "탄소순환", "기후",
+    "지각", "맨틀", "판구조", "화산", "지진", "풍화", "침식", "퇴적암", "변성암", "화성암",
+    "원자", "분자", "이온", "전자", "양성자", "중성자", "주기율표", "공유결합", "산화", "환원",
+    "속력", "가속도", "관성", "운동량", "에너지", "일률", "전류", "전압", "저항", "자기장",
+    "파동", "진동수", "굴절", "반사", "간섭", "회절", "열평형", "비열", "엔트로피", "압력",
+    "민주주의", "헌법", "삼권분립", "선거", "시장경제", "수요", "공급", "물가", "환율", "무역",
+    "고조선", "삼국시대", "고려", "조선", "실학", "개항", "산업혁명", "르네상스", "종교개혁", "계몽주의",
+    "함수", "미분", "적분", "수열", "확률", "통계", "벡터", "행렬", "집합", "명제",
+    "알고리즘", "자료구조", "스택", "큐", "트리", "그래프", "정렬", "탐색", "재귀", "해시",
+]
+
+_PROBLEM_COUNT_RE = {
+    q_type: re.compile(rf"{q_type}: \(enabled: True, 문제 수: (\d+)")
+    for q_type in ("multipleChoice", "ox", "fillInTheBlank", "descriptive")
+}
+_FOLLOWUP_COUNT_RE = {
+    "multipleChoice": re.compile(r"객관식: (\d+)개"),
+    "ox": re.compile(r"OX: (\d+)개"),
+    "fillInTheBlank": re.compile(r"빈칸 채우기: (\d+)개"),
+    "descriptive": re.compile(r"서술형: (\d+)개"),
+}
+_NUM_OPTIONS_RE = re.compile(r"선지\s?: (\d+)개")
+_ITEM_ID_RE = re.compile(r"문제 ID: (\d+)")
+_RUBRIC_KEY_RE = re.compile(r'^- "(\w+)" \(', re.M)
+
+
+def _rng(*parts) -> random.Random:
+    return random.Random(make_cache_key("fake_llm", FAKE_LLM_SEED, *parts))
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    words = max(2, int(round(words * FAKE_LLM_TEXT_SCALE)))
+    return " ".join(rng.sample(_WORDS, min(words, len(_WORDS))))
+
+
+# ─────────────── 응답 본문 생성 ───────────────
+def _problem(rng: random.Random, q_type: str, num_options: int) -> dict:
+    question = f"{_sentence(rng, 8)} 에 대한 설명으로 옳은 것은?"
+    explanation = f"{_sentence(rng, 10)}. {_sentence(rng, 10)}."
+    if q_type == "multipleChoice":
+        return {"question": question, "options": [_sentence(rng, 3) for _ in range(num_options)],
+                "answer": str(rng.randint(1, num_options)), "explanation": explanation}
+    if q_type == "ox":
+        return {"question": question, "answer": rng.choice(["O", "X"]), "explanation": explanation}
+    if q_type == "fillInTheBlank":
+        answer = rng.choice(_WORDS)
+        return {"question": f"{_sentence(rng, 6)} 의 핵심 개념은 __ 이다.", "answer": [answer],
+                "explanation": explanation}
+    return {"question": f"{_sentence(rng, 8)} 의 관계를 서술하시오.", "answer": _sentence(rng, 14)}
+
+
+def _problem_reply(rng: random.Random, system: str, patterns: Dict[str, re.Pattern]) -> str:
+    options = _NUM_OPTIONS_RE.search(system)
+    num_options = int(options.group(1)) if options else 4
+    result = {}
+    for q_type, pattern in patterns.items():
+        match = pattern.search(system)
+        count = int(match.group(1)) if match else 0
+        result[q_type] = [_problem(rng, q_type, num_options) for _ in range(count)]
+    return "```json\n" + json.dumps(result, ensure_ascii=False, indent=2) + "\n```"
+
+
+def _field(block: str, name: str) -> str:
+    match = re.search(rf"^{name}: (.*)$", block, re.M)
+    return match.group(1).strip() if match else ""
+
+
+def _grade_reply(rng: random.Random, system: str, user: str) -> str:
+    starts = [m.start() for m in _ITEM_ID_RE.finditer(user)] + [len(user)]
+    rubric_keys = _RUBRIC_KEY_RE.findall(system)
+    entries = []
+    for start, end in zip(starts, starts[1:]):
+        block = user[start:end]
+        item_id = int(_ITEM_ID_RE.match(block).group(1))
+        answer = re.sub(r"\s+", "", _field(block, "정답")).lower()
+        given = re.sub(r"\s+", "", _field(block, "학생 답안")).lower()
+        base = difflib.SequenceMatcher(None, answer, given).ratio() * 100 if answer and given else 0.0
+
+        def score() -> int:
+            return max(0, min(100, int(round(base + rng.uniform(-10, 10)))))
+
+        if rubric_keys:
+            entries.append({"id": item_id, **{key: score() for key in rubric_keys}})
+        else:
+            entries.append({"id": item_id, "score": score()})
+    return json.dumps(entries, ensure_ascii=False)
+
+
+def fake_reply(messages: List[dict]) -> str:
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user = messages[-1].get("content") or "" if messages else ""
+    rng = _rng(messages)
+    if "[부족한 문제 개수]" in system:
+        return _problem_reply(rng, system, _FOLLOWUP_COUNT_RE)
+    if "문제 생성 요청" in system:
+        return _problem_reply(rng, system, _PROBLEM_COUNT_RE)
+    if _ITEM_ID_RE.search(user):
+        return _grade_reply(rng, system, user)
+    # 요약 / 전처리 / ask: 입력의 앞부분을 정리된 결과처럼 돌려줌
+    body = re.sub(r"\s+", " ", user).strip()
+    return f"{_sentence(rng, 6)}\n{body[:2000]}"
+
+
+# ─────────────── 응답 객체 ───────────────
+def _latency(rng: random.Random, base_ms: float, completion_tokens: int) -> float:
+    seconds = (base_ms + completion_tokens * FAKE_LLM_MS_PER_TOKEN) / 1000.0
+    return seconds * math.exp(rng.gauss(0, FAKE_LLM_LATENCY_JITTER)) if FAKE_LLM_LATENCY_JITTER > 0 else seconds
+
+
+def _complete(model: str, messages: List[dict], max_tokens: Optional[int]) -> tuple:
+    counter = get_token_counter(model)
+    text = fake_reply(messages)
+    completion_tokens = counter.count(text)
+    finish_reason = "stop"
+    if max_tokens and completion_tokens > max_tokens:
+        # 토큰 비율만큼 글자를 잘라 길이 초과 응답을 흉내냄
+        text = text[:int(len(text) * max_tokens / completion_tokens)]
+        completion_tokens = counter.count(text)
+        finish_reason = "length"
+    usage = {
+        "prompt_tokens": count_message_tokens(messages, model),
+        "completion_tokens": completion_tokens,
+    }
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+    return text, finish_reason, usage
+
+
+def _completion_id(messages: List[dict]) -> str:
+    return "chatcmpl-fake-" + make_cache_key("fake_llm_id", FAKE_LLM_SEED, messages)[:24]
+
+
+class FakeBackend(LLMBackend):
+    name = "fake"
+
+    async def chat_completion(self, model: str, messages: List[dict], **kwargs) -> ChatCompletion:
+        text, finish_reason, usage = _complete(model, messages, kwargs.get("max_tokens"))
+        await asyncio.sleep(_latency(_rng("latency", messages), FAKE_LLM_LATENCY_MS, usage["completion_tokens"]))
+        return ChatCompletion.model_validate({
+            "id": _completion_id(messages),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                         "finish_reason": finish_reason}],
+            "usage": usage,
+        })
+
+    async def chat_stream(self, model: str, messages: List[dict], **kwargs) -> AsyncIterator[ChatCompletionChunk]:
+        text, finish_reason, usage = _complete(model, messages, kwargs.get("max_tokens"))
+        return self._stream(model, messages, text, finish_reason, usage)
+
+    async def _stream(self, model: str, messages: List[dict], text: str, finish_reason: str,
+                      usage: dict) -> AsyncIterator[ChatCompletionChunk]:
+        rng = _rng("latency", messages)
+        pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+        # 첫 조각까지는 기본 지연, 이후 조각마다 토큰 생성 시간을 나눠서 기다림
+        await asyncio.sleep(_latency(rng, FAKE_LLM_LATENCY_MS, 0))
+        per_piece = _latency(rng, 0, usage["completion_tokens"]) / max(1, len(pieces))
+        base = {"id": _completion_id(messages), "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model}
+        for piece in pieces:
+            yield ChatCompletionChunk.model_validate(
+                {**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+            if per_piece > 0:
+                await asyncio.sleep(per_piece)
+        yield ChatCompletionChunk.model_validate(
+            {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+        yield ChatCompletionChunk.model_validate({**base, "choices": [], "usage": usage})
+
+    async def transcription(self, model: str, file, response_format: str = "text", language: str = "ko"):
+        rng = _rng("transcription", await asyncio.to_thread(file_sha256, file))
+        # file_sha256 이 끝까지 읽으므로 현재 위치가 파일 크기
+        sentences = max(1, file.tell() // FAKE_WHISPER_BYTES_PER_SENTENCE)
+        await asyncio.sleep(_latency(rng, FAKE_WHISPER_LATENCY_MS, 0))
+        text = " ".join(f"{_sentence(rng, 8)} 입니다." for _ in range(sentences))
+        return text if response_format == "text" else Transcription(text=text)
@@ -1,18 +1,26 @@
 # app/gpt_service.py
-import json
+import asyncio
 import os
 import re
-import tiktoken
 import random
 
 from dotenv import load_dotenv
-from openai import OpenAI
 from dto.GptRequestDTO import GPTRequestDTO
 from dto.CommonDTO import GradeItem, GradeResult, BlankItem, BlankResult, QuestionTypes
-from typing import List, Dict, Any
+from service.blank_pregrader import normalize_answer, pregrade_blank_items
+from service.dedup import dedupe_problems
+from service import metrics
+from service.json_repair import JSONRepairError, fix_json_commas, remove_json_block, repair_json
+from service.llm_gateway import chat_text, run_sync
+from service.output_budget import planner_from_env
+from service.response_cache import cache_from_env, make_cache_key, normalize_text
+from service.single_flight import SingleFlight, run_coalesced
+from service.summarizer import map_reduce_summarize
+from service.token_counter import get_token_counter
+from service.usage_meter import usage_scope
+from typing import List, Dict, Any, Optional
 
 load_dotenv()  # .env 파일 불러오기
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 gpt_model = os.getenv("GPT_MODEL")
 gpt_problem_model = os.getenv("GPT_PROBLEM_MODEL")
 
@@ -20,25 +28,76 @@ gpt_request_cost = float(os.getenv("GPT_REQUEST_COST"))
 gpt_response_cost = float(os.getenv("GPT_RESPONSE_COST"))
 exchange_rate = float(os.getenv("EXCHANGE_RATE"))
 
-tokenizer = tiktoken.encoding_for_model(gpt_model)
+token_counter = get_token_counter(gpt_model)
+# 유형별 예상 출력 토큰으로 max_tokens 설정 / 요청 분할 (OUTPUT_BUDGET_* 로 설정, 실제 응답으로 추정치 갱신)
+output_planner = planner_from_env(token_counter)
 
+QUESTION_TYPE_KEYS = ["multipleChoice", "ox", "fillInTheBlank", "descriptive"]
 
-def ask_gpt(prompt: str) -> str:
-    response = client.chat.completions.create(
+
+class RoleEvaluationError(Exception):
+    """역할 채점 호출 실패. 실패 / 취소된 역할을 포함해 그때까지 쓴 토큰 수를 함께 전달합니다."""
+
+    def __init__(self, message: str, request_tokens: int, response_tokens: int):
+        self.request_tokens = request_tokens
+        self.response_tokens = response_tokens
+        super().__init__(message)
+
+
+class MissingScoreError(Exception):
+    """다시 채점해도 일부 문제의 점수를 받지 못한 경우 (ids: 점수가 없는 문제 ID)."""
+
+    def __init__(self, ids: list):
+        self.ids = ids
+        super().__init__(f"평가 결과에 점수가 없는 문제가 있습니다: {ids}")
+
+# 같은 정리본/설정으로 생성한 문제 세트를 재사용하기 위한 캐시
+problem_cache = cache_from_env("make_problem")
+# 캐시가 채워지기 전에 같은 요청이 몰리면 진행 중인 생성 하나를 함께 기다림
+problem_flight = SingleFlight("make_problem")
+# 긴 정리본의 요약 결과 저장소 (난이도/문제 구성이 달라도 같은 정리본이면 재사용, SUMMARY_CACHE_* 로 설정)
+summary_cache = cache_from_env("summary", env_prefix="SUMMARY_CACHE")
+# map-reduce 청크 요약 저장소 (문서 전체 요약과 적중률 / 용량을 따로 집계, 같은 SUMMARY_CACHE_* 설정 사용)
+summary_chunk_cache = cache_from_env("summary_chunk", env_prefix="SUMMARY_CACHE")
+
+# 긴 정리본 map-reduce 요약 설정 (요약 결과 예산 / 청크 크기 / 청크별 최소 목표 분량 / 동시 요약 수)
+summary_budget_tokens = int(os.getenv("SUMMARY_BUDGET_TOKENS", "8000"))
+summary_chunk_tokens = int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+summary_min_target_tokens = int(os.getenv("SUMMARY_MIN_TARGET_TOKENS", "600"))
+summary_concurrency = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+# (문제, 정답, 정규화한 학생 답안, 채점 모드) → 판정 결과 캐시 (VERDICT_CACHE_* 로 설정)
+verdict_cache = cache_from_env("grade_verdict", env_prefix="VERDICT_CACHE")
+
+# 빈칸 채우기 채점에서 분명한 항목(정확히 일치 / 빈 답안)은 LLM 없이 로컬 판정
+blank_fast_path = os.getenv("BLANK_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+# 한 번의 채점 요청에서 동시에 호출할 수 있는 역할(평가자) 수
+role_eval_concurrency = int(os.getenv("ROLE_EVAL_CONCURRENCY", "3"))
+
+# 다중 역할 채점 합의 설정
+# - adaptive: 앞 단계 역할들의 점수만으로 판정이 확정된 문제는 남은 역할에 보내지 않음
+# - 역할별 가중치는 역할 순서대로 쉼표로 구분 (서술형 / 빈칸)
+# - single_call: 한 번의 호출로 모든 평가 기준 점수를 받는 모드 (GRADE_RUBRIC_MODE=single_call, 기본 roles)
+grade_rubric_mode = os.getenv("GRADE_RUBRIC_MODE", "roles")
+grade_adaptive_consensus = os.getenv("GRADE_ADAPTIVE_CONSENSUS", "true").lower() in ("1", "true", "yes")
+grade_adaptive_first_stage = int(os.getenv("GRADE_ADAPTIVE_FIRST_STAGE", "2"))
+grade_confidence_threshold = float(os.getenv("GRADE_CONFIDENCE_THRESHOLD", "50"))
+grade_role_weights = [float(w) for w in os.getenv("GRADE_ROLE_WEIGHTS", "1,1,1").split(",")]
+blank_role_weights = [float(w) for w in os.getenv("BLANK_ROLE_WEIGHTS", "1,1,1").split(",")]
+# 응답이 잘리는 등으로 역할이 점수를 주지 않은 문제만 모아 다시 채점하는 횟수 (그래도 없으면 오류)
+grade_missing_retries = int(os.getenv("GRADE_MISSING_RETRIES", "1"))
+
+
+async def ask_gpt_async(prompt: str) -> str:
+    return await chat_text(
         model=gpt_model,
         messages=[{"role": "user", "content": prompt}],
     )
-    return response.choices[0].message.content.strip()
-
-
-def fix_json_commas(json_string: str) -> str:
-    # ,} 또는 ,] 같은 문법 오류 제거
-    return re.sub(r',\s*([\]}])', r'\1', json_string)
 
 
-def remove_json_block(json_string: str) -> str:
-    # ```json ... ``` 형태의 코드 블록을 제거합니다.
-    return re.sub(r"```json\s*(.*?)\s*```", r"\1", json_string, flags=re.DOTALL)
+def ask_gpt(prompt: str) -> str:
+    return run_sync(ask_gpt_async, prompt)
 
 
 def replace_underscores(text):
@@ -55,9 +114,10 @@ def replace_underscores(text):
     return re.sub(r'_+', '[[BLANK]]', text)
 
 
-def summary_prompt(content: str) -> str:
-    print(GPTRequestDTO.summary_user_template.format(user_input=content))
-    response = client.chat.completions.create(
+async def summary_prompt(content: str, target_tokens: int = 8000) -> str:
+    user_prompt = GPTRequestDTO.summary_user_template.format(user_input=content, target_tokens=target_tokens)
+    print(user_prompt)
+    return await chat_text(
         model=gpt_model,
         messages=[
             {
@@ -66,11 +126,49 @@ def summary_prompt(content: str) -> str:
             },
             {
                 "role": "user",
-                "content": GPTRequestDTO.summary_user_template.format(user_input=content)
+                "content": user_prompt
             }
         ]
     )
-    return response.choices[0].message.content.strip()
+
+
+async def summarize_chunk(chunk: str, target_tokens: int) -> str:
+    """청크 하나의 요약. 같은 청크/목표 분량이면 이전 요약을 재사용합니다."""
+    cache_key = make_cache_key("summary-chunk", gpt_model, target_tokens, normalize_text(chunk))
+    summary = await summary_chunk_cache.aget(cache_key)
+    if summary is not None:
+        return summary
+    summary = await summary_prompt(chunk, target_tokens)
+    await summary_chunk_cache.aset(cache_key, summary)
+    return summary
+
+
+async def summarize_content(content: str) -> tuple[str, bool]:
+    """
+    긴 정리본을 map-reduce 로 요약하고, 결과를 정리본 해시 + 요약 설정 기준으로 메모이즈합니다.
+    (SUMMARY_* 예산 / 청크 설정이 바뀌면 다른 키가 되어 새로 요약함, 동시 요약 수는 결과와 무관해 제외)
+    반환: (요약문, 캐시 적중 여부)
+    """
+    cache_key = make_cache_key(
+        "summary", gpt_model, summary_budget_tokens, summary_chunk_tokens, summary_min_target_tokens,
+        normalize_text(content)
+    )
+    summary = await summary_cache.aget(cache_key)
+    summary_cache.report(summary is not None)
+    if summary is not None:
+        return summary, True
+
+    summary = await map_reduce_summarize(
+        content,
+        summarize_chunk,
+        token_counter,
+        budget=summary_budget_tokens,
+        chunk_tokens=summary_chunk_tokens,
+        min_target_tokens=summary_min_target_tokens,
+        concurrency=summary_concurrency
+    )
+    await summary_cache.aset(cache_key, summary)
+    return summary, False
 
 
 def build_followup_prompt(existing_questions: list[str], missing_counts: dict, difficulty: str,
@@ -149,7 +247,125 @@ def trim_all_question_types(data: dict, question_types: QuestionTypes) -> dict:
     return trimmed
 
 
-def make_problem(content: str, difficulty: str, question_types: QuestionTypes) -> dict:
+def dedupe_and_trim(data: dict, question_types: QuestionTypes) -> dict:
+    """
+    유사 중복 문제를 먼저 제거한 뒤 요청 개수에 맞춰 자릅니다.
+    제거된 문제는 부족한 개수로 잡혀 follow-up 에서 보충됩니다.
+    """
+    deduped, dropped = dedupe_problems(data)
+    if dropped:
+        print(f"Near-duplicates dropped: {dropped}")
+    return trim_all_question_types(deduped, question_types)
+
+
+def problem_template_fields(difficulty: str, question_types: QuestionTypes) -> dict:
+    """system_template_kr 에 대입할 문제 유형 설정 값을 만듭니다. (분할 요청은 slice_question_types 로 만든 설정 사용)"""
+    def setting(q_type: str):
+        item = getattr(question_types, q_type)
+        return item.enable, item.numQuestions
+
+    mc_enabled, mc_num = setting("multipleChoice")
+    ox_enabled, ox_num = setting("ox")
+    fib_enabled, fib_num = setting("fillInTheBlank")
+    desc_enabled, desc_num = setting("descriptive")
+
+    return dict(
+        difficulty=difficulty,
+        multipleChoiceEnabled=mc_enabled,
+        multipleChoiceNumQuestions=mc_num,
+        multipleChoiceNumOptions=question_types.multipleChoice.numOptions,
+        oxEnabled=ox_enabled,
+        oxNumQuestions=ox_num,
+        fibEnabled=fib_enabled,
+        fibNumQuestions=fib_num,
+        descriptiveEnabled=desc_enabled,
+        descriptiveNumQuestions=desc_num
+    )
+
+
+def build_problem_system_template(difficulty: str, question_types: QuestionTypes) -> str:
+    """system_template_kr 에 문제 유형 설정을 대입합니다."""
+    return GPTRequestDTO.system_template_kr.format(
+        **problem_template_fields(difficulty, question_types)
+    )
+
+
+def count_problem_system_template(difficulty: str, question_types: QuestionTypes) -> int:
+    """build_problem_system_template 결과의 토큰 수 (고정 부분은 캐시된 값 사용)."""
+    return token_counter.count_formatted(
+        GPTRequestDTO.system_template_kr,
+        **problem_template_fields(difficulty, question_types)
+    )
+
+
+def requested_counts(question_types: QuestionTypes) -> Dict[str, int]:
+    """활성화된 유형별 요청 문제 수."""
+    return {
+        q_type: getattr(question_types, q_type).numQuestions if getattr(question_types, q_type).enable else 0
+        for q_type in QUESTION_TYPE_KEYS
+    }
+
+
+def slice_question_types(question_types: QuestionTypes, counts: Dict[str, int]) -> QuestionTypes:
+    """counts 에 있는 유형/문제 수만 활성화된 QuestionTypes 복사본 (분할 요청용)."""
+    sliced = question_types.model_copy(deep=True)
+    for q_type in QUESTION_TYPE_KEYS:
+        item = getattr(sliced, q_type)
+        item.numQuestions = counts.get(q_type, 0)
+        item.enable = item.numQuestions > 0
+    return sliced
+
+
+def count_problem_request(content: str, difficulty: str, question_types: QuestionTypes) -> int:
+    """문제 생성 요청(system + user 프롬프트)의 토큰 수를 로컬에서 계산합니다."""
+    return (token_counter.count_formatted(GPTRequestDTO.content_template_kr, summary=content)
+            + count_problem_system_template(difficulty, question_types))
+
+
+async def generate_problem_groups(prompt: str, difficulty: str, question_types: QuestionTypes,
+                                  groups: List[Dict[str, int]]) -> dict:
+    """
+    output_planner 가 나눈 그룹(유형별 문제 수)마다 별도의 생성 요청을 동시에 보내고 결과를 merge_problems 로 합칩니다.
+    전체 소요 시간이 모든 그룹의 합이 아니라 가장 큰 그룹의 생성 시간에 맞춰집니다.
+    JSON 파싱에 실패한 그룹은 빈 리스트로 두고 이후 follow-up 단계에서 보충합니다.
+    """
+    async def generate(counts: Dict[str, int]) -> dict:
+        system_template = build_problem_system_template(difficulty, slice_question_types(question_types, counts))
+        response = await chat_text(
+            model=gpt_model,
+            messages=[
+                {"role": "system", "content": system_template},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=output_planner.max_tokens(counts),
+        )
+        try:
+            parsed_group = repair_json(response)
+        except JSONRepairError as e:
+            print(f"[{counts}] Json parsing error: {e}")
+            parsed_group = {}
+        if not isinstance(parsed_group, dict):
+            parsed_group = {}
+        output_planner.observe(response, parsed_group)
+        return {q_type: parsed_group.get(q_type) or [] for q_type in counts}
+
+    results = await asyncio.gather(*[generate(counts) for counts in groups])
+
+    # gather 는 입력 순서를 유지하므로 병합 결과도 유형 순서대로 결정적
+    merged = {}
+    for partial in results:
+        merged = merge_problems(merged, partial)
+    return merged
+
+
+async def generate_problems_per_type(prompt: str, difficulty: str, question_types: QuestionTypes) -> dict:
+    """활성화된 문제 유형마다 (크면 다시 나눠) 별도의 생성 요청을 동시에 보냅니다."""
+    groups = output_planner.plan(requested_counts(question_types), split_types=True)
+    return await generate_problem_groups(prompt, difficulty, question_types, groups)
+
+
+def apply_enabled_flags(question_types: QuestionTypes) -> int:
+    """비활성화된 유형의 문제 수를 0으로 맞추고, 전체 요청 문제 수를 반환합니다."""
     # question_types 내부 구조를 미리 변수로 꺼냄
     mc = question_types.multipleChoice
     ox = question_types.ox
@@ -165,76 +381,122 @@ def make_problem(content: str, difficulty: str, question_types: QuestionTypes) -
     if not desc.enable:
         desc.numQuestions = 0
 
-    if mc.numQuestions + ox.numQuestions + fib.numQuestions + desc.numQuestions > 30:
+    return mc.numQuestions + ox.numQuestions + fib.numQuestions + desc.numQuestions
+
+
+def problem_cache_key(content: str, difficulty: str, question_types: QuestionTypes) -> str:
+    """정리본 + 난이도 + 문제 유형 설정 + 모델로 만든 문제 세트 캐시 키."""
+    return make_cache_key("make_problem", gpt_model, normalize_text(content), difficulty,
+                          question_types.model_dump())
+
+
+async def make_problem_async(content: str, difficulty: str, question_types: QuestionTypes,
+                             parallel: bool = False) -> dict:
+    if apply_enabled_flags(question_types) > 30:
         return "Total number of questions exceeds 20"
 
-    request_token_sum = 0
-    response_token_sum = 0
+    # 정리본 + 난이도 + 문제 유형 설정 + 모델이 같으면 이전 결과를 그대로 반환
+    cache_key = problem_cache_key(content, difficulty, question_types)
+    cached = await problem_cache.aget(cache_key)
+    problem_cache.report(cached is not None)
+    if cached is not None:
+        return {
+            "result": cached,
+            "request_tokens": 0,
+            "response_tokens": 0,
+            "cache_hit": True,
+        }
 
-    if len(tokenizer.encode(content)) > 8000:
-        # 요청 토큰 길이가 8000을 초과하면 내용을 요약합니다.
-        request_token_sum += len(tokenizer.encode(GPTRequestDTO.summary_system_template))
-        request_token_sum += len(tokenizer.encode(GPTRequestDTO.summary_user_template.format(user_input=content)))
-        content = summary_prompt(content)
-        response_token_sum += len(tokenizer.encode(content))
+    async def generate() -> dict:
+        # 토큰 사용량은 업스트림 응답의 usage 로 집계
+        with usage_scope() as meter:
+            parsed = await _generate_problem_set(content, difficulty, question_types, parallel)
 
-    system_template = GPTRequestDTO.system_template_kr.format(
-        difficulty=difficulty,
-        multipleChoiceEnabled=mc.enable,
-        multipleChoiceNumQuestions=mc.numQuestions,
-        multipleChoiceNumOptions=mc.numOptions,
-        oxEnabled=ox.enable,
-        oxNumQuestions=ox.numQuestions,
-        fibEnabled=fib.enable,
-        fibNumQuestions=fib.numQuestions,
-        descriptiveEnabled=desc.enable,
-        descriptiveNumQuestions=desc.numQuestions
-    )
+        if isinstance(parsed, str):
+            # 오류 메시지
+            return {"result": parsed,
+                    "request_tokens": meter.request_tokens,
+                    "response_tokens": meter.response_tokens}
+
+        await problem_cache.aset(cache_key, parsed)
+
+        return {
+            "result": parsed,
+            "request_tokens": meter.request_tokens,
+            "response_tokens": meter.response_tokens,
+            "cache_hit": False,
+        }
+
+    return await run_coalesced(problem_flight, cache_key, generate)
+
+
+async def _generate_problem_set(content: str, difficulty: str, question_types: QuestionTypes,
+                               parallel: bool) -> Any:
+    """
+    make_problem_async 의 실제 생성 단계 (요약 → 생성 → follow-up).
+    성공하면 문제 dict, 실패하면 오류 메시지 문자열을 반환합니다.
+    """
+    mc = question_types.multipleChoice
+    ox = question_types.ox
+    fib = question_types.fillInTheBlank
+    desc = question_types.descriptive
+
+    if token_counter.exceeds(content, 8000):
+        # 요청 토큰 길이가 8000을 초과하면 내용을 요약합니다. (이전에 요약한 정리본이면 재사용)
+        content, _ = await summarize_content(content)
+
+    system_template = build_problem_system_template(difficulty, question_types)
     # 템플릿에 값 대입
     prompt = GPTRequestDTO.content_template_kr.format(
         summary=content
     )
 
-    # print(f"Request Token length: {len(tokenizer.encode(prompt + system_template))}")
-    request_token_sum += len(tokenizer.encode(prompt + system_template))
-
-    if len(tokenizer.encode(prompt + system_template)) > 10000:
-        return {"result": "Request token length exceeds 10000",
-                "request_tokens": request_token_sum,
-                "response_tokens": response_token_sum}
+    # 요청 크기 검사는 로컬 계산으로 (고정 템플릿 부분은 캐시된 값 사용)
+    request_tokens = count_problem_request(content, difficulty, question_types)
+    # print(f"Request Token length: {request_tokens}")
+
+    if request_tokens > 10000:
+        return "Request token length exceeds 10000"
+
+    counts = requested_counts(question_types)
+    groups = output_planner.plan(counts)
+
+    if parallel:
+        # 유형별 생성 요청을 동시에 보내는 모드
+        parsed = await generate_problems_per_type(prompt, difficulty, question_types)
+    elif len(groups) > 1:
+        # 예상 응답이 상한을 넘으면 작은 요청 여러 개로 나눠 동시에 생성
+        print(f"Output budget split: {groups} (estimates: {output_planner.estimates()})")
+        parsed = await generate_problem_groups(prompt, difficulty, question_types, groups)
+    else:
+        response = await chat_text(
+            model=gpt_model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_template
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            max_tokens=output_planner.max_tokens(counts)
+        )
 
-    response = client.chat.completions.create(
-        model=gpt_model,
-        messages=[
-            {
-                "role": "system",
-                "content": system_template
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        # max_tokens=expected_tokens
-    ).choices[0].message.content.strip()
-
-    # 응답 토큰 길이 추가
-    response_token_sum += len(tokenizer.encode(response))
-
-    # JSON 블록을 제거합니다.
-    json_str = fix_json_commas(remove_json_block(response))
-    # print(f"Response: {json_str}")
-
-    try:
-        parsed = json.loads(json_str)
-    except json.JSONDecodeError as e:
-        # JSON 파싱 실패 시, 오류 메시지를 반환합니다.
-        return {"result": "Json parsing error: " + str(e),
-                "request_tokens": request_token_sum,
-                "response_tokens": response_token_sum}
-
-    parsed = trim_all_question_types(parsed, question_types)
+        # 코드 블록/안내문/잘린 응답 등을 복구해 파싱합니다. (완성된 문제 객체는 모두 살림)
+        try:
+            parsed = repair_json(response)
+        except JSONRepairError as e:
+            # 복구할 수 없으면 오류 메시지를 반환합니다.
+            return "Json parsing error: " + str(e)
+        if not isinstance(parsed, dict):
+            return "Json parsing error: top-level value is not an object"
+        output_planner.observe(response, parsed)
+
+    parsed = dedupe_and_trim(parsed, question_types)
     regenerate_limit = 3
+    followup_rounds = 0
     while regenerate_limit > 0:
         regenerate_limit -= 1
 
@@ -249,107 +511,349 @@ def make_problem(content: str, difficulty: str, question_types: QuestionTypes) -
             question_texts = extract_question_texts(parsed)
             followup_messages = build_followup_prompt(question_texts, missing_counts, difficulty, question_types,
                                                       content)
-            request_token_sum += len(
-                tokenizer.encode(followup_messages[0]["content"] + followup_messages[1]["content"]))
-            followup_response = client.chat.completions.create(
+            followup_rounds += 1
+            followup_response = await chat_text(
                 model=gpt_model,
-                messages=followup_messages
-            ).choices[0].message.content.strip()
-            # 응답 토큰 길이 추가
-            response_token_sum += len(tokenizer.encode(followup_response))
-
-            json_followup = fix_json_commas(remove_json_block(followup_response))
+                messages=followup_messages,
+                max_tokens=output_planner.max_tokens(missing_counts)
+            )
 
-            print(f"json_followup: {json_followup}")
+            print(f"json_followup: {followup_response}")
             try:
-                parsed_followup = json.loads(json_followup)
+                parsed_followup = repair_json(followup_response)
+            except JSONRepairError as e:
+                # 이미 모은 문제는 유지하고 남은 follow-up 기회로 다시 보충
+                print("Follow-up Json parsing error: " + str(e))
+                continue
+            if isinstance(parsed_followup, dict):
                 parsed = merge_problems(parsed, parsed_followup)
-            except json.JSONDecodeError as e:
-                return {"result": "Follow-up Json parsing error: " + str(e),
-                        "request_tokens": request_token_sum,
-                        "response_tokens": response_token_sum}
-            parsed = trim_all_question_types(parsed, question_types)
+            parsed = dedupe_and_trim(parsed, question_types)
         else:
             break
+    metrics.observe("make_problem_followup_rounds", followup_rounds, buckets=metrics.COUNT_BUCKETS)
 
     if "fillInTheBlank" in parsed:
         for item in parsed["fillInTheBlank"]:
             item["question"] = replace_underscores(item["question"])
 
-    return {
-        "result": parsed,
-        "request_tokens": request_token_sum,
-        "response_tokens": response_token_sum,
-    }
+    return parsed
 
 
-def gpt_role_eval(
+def make_problem(content: str, difficulty: str, question_types: QuestionTypes, parallel: bool = False) -> dict:
+    return run_sync(make_problem_async, content, difficulty, question_types, parallel)
+
+
+async def gpt_role_eval(
         role_name: str,
         role_desc: str,
         user_prompt: str,
-        tokenizer,
         request_token_sum: int,
         response_token_sum: int
 ) -> tuple[list[dict], int, int]:
     """
     단일 역할에 대해 GPT API를 호출하고, 결과(JSON)를 반환.
-    호출에 사용된 토큰 수(request_token_sum, response_token_sum)를 갱신해 반환한다.
+    호출에 사용된 토큰 수(응답의 usage 기준)를 request_token_sum, response_token_sum 에 더해 반환한다.
     """
     # 시스템 프롬프트 생성
     system_prompt = GPTRequestDTO.grade_system_template.format(name=role_name, role=role_desc)
 
     # GPT 요청
-    response = client.chat.completions.create(
-        model=gpt_model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=0.0,
-    ).choices[0].message.content.strip()
+    with usage_scope() as meter:
+        response = await chat_text(
+            model=gpt_model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.0,
+        )
 
     # 토큰 계산
-    request_token_sum += len(tokenizer.encode(system_prompt))
-    request_token_sum += len(tokenizer.encode(user_prompt))
-    response_token_sum += len(tokenizer.encode(response))
+    request_token_sum += meter.request_tokens
+    response_token_sum += meter.response_tokens
 
     print(f"[{role_name}] Response:", response)
 
-    # JSON 파싱
-    answer_text = fix_json_commas(response)
-    confidences = json.loads(answer_text)
+    # JSON 파싱 (잘린 응답이면 완성된 항목까지만 사용)
+    confidences = repair_json(response)
+    if not isinstance(confidences, list):
+        raise JSONRepairError(f"[{role_name}] 평가 결과가 리스트가 아닙니다.")
     return confidences, request_token_sum, response_token_sum
 
 
-def run_role_evaluations(
+async def gpt_multi_rubric_eval(
+        roles: list[dict],
+        user_prompt: str,
+        request_token_sum: int,
+        response_token_sum: int
+) -> tuple[list[list[dict]], int, int]:
+    """
+    모든 역할(평가 기준)을 한 번의 호출로 채점합니다.
+    결과는 run_role_evaluations 와 같은 형태(역할 순서대로 [{"id", "score"}] 리스트)로 바꿔 반환하므로
+    집계 로직을 그대로 사용할 수 있습니다.
+    """
+    rubrics = "\n".join(f'- "{role["key"]}" ({role["name"]}): {role["description"]}' for role in roles)
+    rubric_example = ", ".join(f'"{role["key"]}": 정수값' for role in roles)
+    system_prompt = GPTRequestDTO.multi_rubric_system_template.format(rubrics=rubrics, rubric_example=rubric_example)
+
+    with usage_scope() as meter:
+        response = await chat_text(
+            model=gpt_model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.0,
+        )
+
+    request_token_sum += meter.request_tokens
+    response_token_sum += meter.response_tokens
+
+    print("[multi-rubric] Response:", response)
+
+    entries = repair_json(response)
+    if not isinstance(entries, list):
+        raise JSONRepairError("[multi-rubric] 평가 결과가 리스트가 아닙니다.")
+    role_confidences = [
+        [{"id": entry.get("id"), "score": entry[role["key"]]}
+         for entry in entries if isinstance(entry, dict) and entry.get(role["key"]) is not None]
+        for role in roles
+    ]
+    return role_confidences, request_token_sum, response_token_sum
+
+
+async def run_role_evaluations(
         prompt: str,
         roles: list[dict],
-        tokenizer,
         request_token_sum: int,
         response_token_sum: int
 ) -> tuple[list[list[dict]], int, int]:
     """
-    여러 역할에 대해 GPT 호출을 반복 실행.
-    각 호출 결과(리스트 형태 JSON)를 묶어서 반환.
+    여러 역할에 대한 GPT 호출을 동시에 실행 (최대 role_eval_concurrency 개).
+    각 호출 결과(리스트 형태 JSON)를 roles 순서대로 묶어서 반환.
+    한 역할이라도 실패하면 나머지 호출은 즉시 취소하고, 취소된 호출이 끝날 때까지 기다린 뒤
+    가장 앞선 역할의 실패를 RoleEvaluationError 로 발생시킨다. (취소된 역할의 사용량도 토큰 합에 포함)
     """
-    role_confidences = []
-    for role in roles:
+    semaphore = asyncio.Semaphore(max(1, role_eval_concurrency))
+
+    async def eval_role(role: dict) -> tuple[list[dict], int, int]:
+        async with semaphore:
+            try:
+                return await gpt_role_eval(
+                    role_name=role["name"],
+                    role_desc=role["description"],
+                    user_prompt=prompt,
+                    request_token_sum=0,
+                    response_token_sum=0
+                )
+            except Exception as e:
+                print(f"[{role['name']}] Error:", e)
+                raise
+
+    # 역할별 usage_scope 는 끝날 때(취소 포함) 이 미터에 합산되므로 토큰 합은 미터 기준으로 집계
+    with usage_scope() as meter:
+        tasks = [asyncio.ensure_future(eval_role(role)) for role in roles]
         try:
-            result, request_token_sum, response_token_sum = gpt_role_eval(
-                role_name=role["name"],
-                role_desc=role["description"],
-                user_prompt=prompt,
-                tokenizer=tokenizer,
-                request_token_sum=request_token_sum,
-                response_token_sum=response_token_sum
-            )
-            role_confidences.append(result)
-        except Exception as e:
-            print(f"[{role['name']}] Error:", e)
-            raise Exception(f"{role['name']} 평가 중 오류 발생: " + str(e))
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            # 모든 예외를 회수하고 취소된 역할의 사용량이 기록될 때까지 기다림
+            outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+    request_token_sum += meter.request_tokens
+    response_token_sum += meter.response_tokens
+
+    # 실패한 역할이 있으면 가장 앞선 역할의 예외를 전달 (취소된 역할은 CancelledError 라 제외)
+    for role, outcome in zip(roles, outcomes):
+        if isinstance(outcome, Exception):
+            raise RoleEvaluationError(
+                f"{role['name']} 평가 중 오류 발생: {outcome}", request_token_sum, response_token_sum
+            ) from outcome
+
+    # 결과는 완료 순서와 무관하게 roles 순서대로
+    role_confidences = [result for result, _, _ in outcomes]
     return role_confidences, request_token_sum, response_token_sum
 
 
+def _consensus_bounds(scores: List[tuple], remaining_weight: float) -> tuple:
+    """
+    지금까지의 (가중치, 점수) 로 남은 역할이 0점 / 100점을 줄 때의 최종 가중 평균 범위를 계산합니다.
+    """
+    weight = sum(w for w, _ in scores) + remaining_weight
+    if weight <= 0:
+        return 0.0, 100.0
+    total = sum(w * score for w, score in scores)
+    return total / weight, (total + 100 * remaining_weight) / weight
+
+
+async def evaluate_consensus(
+        items: list,
+        build_prompt,
+        roles: list[dict],
+        weights: List[float],
+        threshold: float,
+        adaptive: bool
+) -> tuple[Dict[int, bool], int, int]:
+    """
+    여러 역할의 확신도(0~100) 가중 평균이 threshold 이상이면 정답으로 판정합니다.
+    adaptive 이면 첫 단계(grade_adaptive_first_stage 개 역할) 이후 역할을 하나씩 추가하며,
+    남은 역할이 어떤 점수를 줘도 판정이 바뀌지 않는 문제는 다음 단계 프롬프트에서 뺍니다.
+    (가중치가 같으면 전체 평가와 판정 결과가 같음)
+    역할 응답에 점수가 빠진 문제는 그 역할로 grade_missing_retries 번까지 다시 채점하고,
+    그래도 빠져 있으면 예외를 발생시킵니다. (모든 문제가 판정 결과를 가짐)
+    반환: ({문제 ID: 정답 여부}, 요청 토큰 합, 응답 토큰 합)
+    """
+    weights = [weights[i] if i < len(weights) else 1.0 for i in range(len(roles))]
+    single_call = grade_rubric_mode == "single_call"
+    if single_call:
+        # 한 번의 호출에 모든 기준이 포함되므로 단계를 나눌 이유가 없음
+        stages = [list(range(len(roles)))]
+    elif adaptive:
+        first = max(1, grade_adaptive_first_stage)
+        stages = [list(range(first))] + [[i] for i in range(first, len(roles))]
+    else:
+        stages = [list(range(len(roles)))]
+
+    scores: Dict[int, list] = {item.id: [] for item in items}
+    remaining_weight = sum(weights)
+    request_token_sum = 0
+    response_token_sum = 0
+    pending = list(items)
+    calls = 0
+
+    async def score_stage(stage: List[int], targets: list) -> Dict[int, list]:
+        """stage 역할들로 targets 를 채점해 scores 에 더하고, 역할별로 점수가 빠진 문제를 반환합니다."""
+        nonlocal request_token_sum, response_token_sum, calls
+        stage_roles = [roles[i] for i in stage]
+        if single_call:
+            role_confidences, request_token_sum, response_token_sum = await gpt_multi_rubric_eval(
+                stage_roles, build_prompt(targets), request_token_sum, response_token_sum
+            )
+            calls += 1
+        else:
+            role_confidences, request_token_sum, response_token_sum = await run_role_evaluations(
+                build_prompt(targets), stage_roles, request_token_sum, response_token_sum
+            )
+            calls += len(stage_roles)
+        target_ids = {item.id for item in targets}
+        missing = {}
+        for role_idx, confidences in zip(stage, role_confidences):
+            scored = set()
+            for item in confidences:
+                id_val = item.get("id")
+                conf_val = item.get("score")
+                if id_val is None or conf_val is None:
+                    raise Exception(f"잘못된 평가 결과 형식: {item}")
+                if isinstance(id_val, str) and id_val.strip().isdigit():
+                    id_val = int(id_val)
+                if id_val in target_ids and id_val not in scored:
+                    scores[id_val].append((weights[role_idx], float(conf_val)))
+                    scored.add(id_val)
+            left = [item for item in targets if item.id not in scored]
+            if left:
+                missing[role_idx] = left
+        return missing
+
+    for stage in stages:
+        if not pending:
+            break
+        missing = await score_stage(stage, pending)
+        for _ in range(max(0, grade_missing_retries)):
+            if not missing:
+                break
+            for role_idx, left in missing.items():
+                print(f"[{roles[role_idx]['name']}] missing scores, re-grading ids={[item.id for item in left]}")
+            retry_missing = {}
+            for role_idx, left in missing.items():
+                retry_missing.update(await score_stage([role_idx], left))
+            missing = retry_missing
+        if missing:
+            raise MissingScoreError(sorted({item.id for left in missing.values() for item in left}, key=str))
+        remaining_weight -= sum(weights[i] for i in stage)
+
+        if adaptive:
+            undecided = []
+            for item in pending:
+                low, high = _consensus_bounds(scores[item.id], remaining_weight)
+                if not scores[item.id] or (low < threshold <= high):
+                    undecided.append(item)
+            pending = undecided
+
+    print(f"[consensus] items={len(items)} calls={calls} "
+          f"undecided_after_all={len(pending) if adaptive and not single_call else 0}")
+
+    verdicts = {}
+    for id_val, id_scores in scores.items():
+        low, _ = _consensus_bounds(id_scores, 0)
+        verdicts[id_val] = low >= threshold
+    return verdicts, request_token_sum, response_token_sum
+
+
+def normalize_student_input(mode: str, student_input) -> Any:
+    """판정 캐시 키에 쓰는 학생 답안 정규화 (빈칸은 빈칸별, 서술형은 공백/대소문자 통일)."""
+    if mode == "blank":
+        return [normalize_answer(value) for value in student_input]
+    return " ".join(normalize_text(student_input).casefold().split())
+
+
+def verdict_cache_key(mode: str, item, weights: List[float], threshold: float) -> str:
+    answer = item.answer if isinstance(item.answer, list) else [item.answer]
+    return make_cache_key(
+        "verdict", mode, grade_rubric_mode, gpt_model, weights, threshold,
+        normalize_text(item.question), [normalize_text(a) for a in answer],
+        normalize_student_input(mode, item.input)
+    )
+
+
+async def grade_unique_answers(
+        items: list,
+        mode: str,
+        build_prompt,
+        roles: list[dict],
+        weights: List[float],
+        threshold: float,
+        adaptive: bool
+) -> tuple[list[tuple[Any, bool]], int, int]:
+    """
+    같은 (문제, 정답, 정규화한 답안, 모드) 조합은 한 번만 채점하고 판정을 모든 항목에 나눠 줍니다.
+    이전 요청에서 판정한 조합은 verdict_cache 에서 바로 가져옵니다.
+    반환: ([(항목, 정답 여부)] 요청 순서대로, 요청 토큰 합, 응답 토큰 합)
+    """
+    keys = [verdict_cache_key(mode, item, weights, threshold) for item in items]
+    verdict_by_key: Dict[str, bool] = {}
+    unique: Dict[str, Any] = {}
+    for item, key in zip(items, keys):
+        if key in verdict_by_key or key in unique:
+            continue
+        cached = await verdict_cache.aget(key)
+        if cached is not None:
+            verdict_by_key[key] = cached
+        else:
+            unique[key] = item
+    print(f"[verdict_cache] {mode} items={len(items)} cached={len(verdict_by_key)} to_grade={len(unique)}")
+
+    request_token_sum = 0
+    response_token_sum = 0
+    if unique:
+        # 대표 항목에 0..n-1 ID 를 다시 매겨 채점 (요청 안 ID 중복과 무관하게 매핑)
+        representatives = [item.model_copy(update={"id": local_id}) for local_id, item in enumerate(unique.values())]
+        try:
+            verdicts, request_token_sum, response_token_sum = await evaluate_consensus(
+                representatives, build_prompt, roles, weights, threshold, adaptive
+            )
+        except MissingScoreError as e:
+            originals = list(unique.values())
+            raise MissingScoreError([originals[local_id].id for local_id in e.ids]) from None
+        for local_id, key in enumerate(unique):
+            verdict_by_key[key] = verdicts[local_id]
+            await verdict_cache.aset(key, verdicts[local_id])
+
+    results = [(item, verdict_by_key[key]) for item, key in zip(items, keys)]
+    return results, request_token_sum, response_token_sum
+
+
 def create_grade_prompt(items: List[GradeItem]) -> str:
     """
     입력된 GradeItem 리스트를 기반으로 채점 프롬프트 문자열을 생성합니다.
@@ -368,50 +872,36 @@ def create_grade_prompt(items: List[GradeItem]) -> str:
     return GPTRequestDTO.grade_user_template.format(items=all_items_text)
 
 
-def grade_items(items: List[GradeItem]) -> dict[str, Any]:
+async def grade_items_async(items: List[GradeItem], confidence_threshold: Optional[float] = None,
+                            adaptive: Optional[bool] = None) -> dict[str, Any]:
     """
-    서술형 답안을 여러 역할로 평가 후, 평균 확신도가 50 이상이면 정답(true)으로 판정.
+    서술형 답안을 여러 역할로 평가 후, 가중 평균 확신도가 threshold(기본 50) 이상이면 정답(true)으로 판정.
     """
-    prompt = create_grade_prompt(items)
-
     roles = [
         {
+            "key": "overall",
             "name": "전반적 평가자",
             "description": "전체적인 답안의 완성도, 정확성 및 정답과의 일치 정도를 평가하십시오. 답안이 정답에 부합한다고 판단되면 높은 확신(confidence)을, 그렇지 않으면 낮은 확신을 숫자로 반환하십시오."
         },
         {
+            "key": "keyword",
             "name": "핵심 키워드 평가자",
             "description": "정답에 포함되어야 할 핵심 키워드나 유사 표현, (영어/한국어 등의)언어가 다른 유사 표현의 포함 여부를 평가하고, 포함되었다고 판단되면 높은 확신, 그렇지 않으면 낮은 확신을 숫자로 반환하십시오."
         },
         {
+            "key": "logic",
             "name": "논리성 평가자",
             "description": "답안의 논리적 전개, 일관성 및 근거의 명확성을 평가하고, 논리적으로 정답과 부합하면 높은 확신, 아니면 낮은 확신을 숫자로 반환하십시오."
         }
     ]
 
-    request_token_sum = 0
-    response_token_sum = 0
-
-    # 중복 제거: run_role_evaluations 사용
-    role_confidences, request_token_sum, response_token_sum = run_role_evaluations(
-        prompt, roles, tokenizer, request_token_sum, response_token_sum
+    verdicts, request_token_sum, response_token_sum = await grade_unique_answers(
+        items, "descriptive", create_grade_prompt, roles, grade_role_weights,
+        grade_confidence_threshold if confidence_threshold is None else confidence_threshold,
+        grade_adaptive_consensus if adaptive is None else adaptive
     )
 
-    # 결과 집계
-    combined_confidences = {}
-    for confidences in role_confidences:
-        for item in confidences:
-            id_val = item.get("id")
-            conf_val = item.get("score")
-            if id_val is None or conf_val is None:
-                raise Exception(f"잘못된 평가 결과 형식: {item}")
-            combined_confidences.setdefault(id_val, []).append(conf_val)
-
-    final_results = []
-    for id_val, conf_list in combined_confidences.items():
-        avg_conf = sum(conf_list) / len(conf_list)
-        final_decision = avg_conf >= 50
-        final_results.append(GradeResult(id=id_val, correct=final_decision))
+    final_results = [GradeResult(id=item.id, correct=correct) for item, correct in verdicts]
 
     return {
         "result": final_results,
@@ -420,6 +910,11 @@ def grade_items(items: List[GradeItem]) -> dict[str, Any]:
     }
 
 
+def grade_items(items: List[GradeItem], confidence_threshold: Optional[float] = None,
+                adaptive: Optional[bool] = None) -> dict[str, Any]:
+    return run_sync(grade_items_async, items, confidence_threshold, adaptive)
+
+
 def create_blank_prompt(items: List[BlankItem]) -> str:
     """
     입력된 BlankItem 리스트를 기반으로 빈칸 채우기 문제 채점 프롬프트 문자열을 생성합니다.
@@ -441,53 +936,56 @@ def create_blank_prompt(items: List[BlankItem]) -> str:
     return GPTRequestDTO.blank_user_template.format(items=all_items_text)
 
 
-def grade_blank_items(items: List[BlankItem], confidence_threshold: int = 50) -> dict[str, Any]:
+async def grade_blank_items_async(items: List[BlankItem], confidence_threshold: Optional[float] = None,
+                                  adaptive: Optional[bool] = None) -> dict[str, Any]:
     """
-    빈칸 채우기 문제를 여러 역할로 평가 후, 평균이 threshold 이상이면 정답(true).
+    빈칸 채우기 문제를 여러 역할로 평가 후, 가중 평균이 threshold(기본 50) 이상이면 정답(true).
+    정규화 후 정답과 일치하거나 아무것도 쓰지 않은 답안은 로컬에서 바로 판정하고 나머지만 LLM 으로 보냅니다.
     """
-    prompt = create_blank_prompt(items)
+    # 결과는 요청 항목 순서대로 돌려줌
+    position = {}
+    for idx, item in enumerate(items):
+        position.setdefault(item.id, idx)
+
+    decided: List[BlankResult] = []
+    if blank_fast_path:
+        decided, items = pregrade_blank_items(items)
+        if not items:
+            return {"result": decided, "request_tokens": 0, "response_tokens": 0}
 
     roles = [
         {
+            "key": "overall",
             "name": "전반적 평가자",
             "description": "문제 전체의 맥락과 정답과의 일치 여부를 평가하십시오."
         },
         {
+            "key": "keyword",
             "name": "핵심 단어 평가자",
             "description": "정답에 포함되어야 할 핵심 키워드나 유사 표현, (영어/한국어 등의)언어가 다른 유사 표현의 포함 여부를 평가하고, 포함되었다고 판단되면 높은 확신, 그렇지 않으면 낮은 확신을 숫자로 반환하십시오."
         },
         {
+            "key": "logic",
             "name": "논리성 평가자",
             "description": "학생의 답안이 문제의 의도와 논리적으로 부합하는지 평가하십시오"
         }
     ]
 
-    request_token_sum = 0
-    response_token_sum = 0
-
-    # 마찬가지로 중복 제거
-    role_confidences, request_token_sum, response_token_sum = run_role_evaluations(
-        prompt, roles, tokenizer, request_token_sum, response_token_sum
+    verdicts, request_token_sum, response_token_sum = await grade_unique_answers(
+        items, "blank", create_blank_prompt, roles, blank_role_weights,
+        grade_confidence_threshold if confidence_threshold is None else confidence_threshold,
+        grade_adaptive_consensus if adaptive is None else adaptive
     )
 
-    # 결과 집계
-    combined_confidences = {}
-    for confidences in role_confidences:
-        for item in confidences:
-            id_val = item.get("id")
-            conf_val = item.get("score")
-            if id_val is None or conf_val is None:
-                raise Exception(f"잘못된 평가 결과 형식: {item}")
-            combined_confidences.setdefault(id_val, []).append(conf_val)
-
-    final_results = []
-    for id_val, conf_list in combined_confidences.items():
-        avg_conf = sum(conf_list) / len(conf_list)
-        final_decision = avg_conf >= confidence_threshold
-        final_results.append(BlankResult(id=id_val, correct=final_decision))
+    final_results = [BlankResult(id=item.id, correct=correct) for item, correct in verdicts]
 
     return {
-        "result": final_results,
+        "result": sorted(decided + final_results, key=lambda r: position.get(r.id, len(position))),
         "request_tokens": request_token_sum,
         "response_tokens": response_token_sum
     }
+
+
+def grade_blank_items(items: List[BlankItem], confidence_threshold: Optional[float] = None,
+                      adaptive: Optional[bool] = None) -> dict[str, Any]:
+    return run_sync(grade_blank_items_async, items, confidence_threshold, adaptive)
@@ -0,0 +1,250 @@
+# service/grade_job_service.py
+"""
+대량 채점 작업 (JSONL 업로드 → 작업 ID → 진행률 조회 / 결과 JSONL 스트리밍).
+
+- 업로드된 GradeItem / BlankItem 레코드를 create_grade_prompt / create_blank_prompt 기준 토큰 수로
+  묶음(batch) 단위로 나눠, 한 번의 채점 호출(역할별 평가 포함)에서 여러 답안을 처리합니다.
+- 묶음은 워커 풀(GRADE_JOB_WORKERS, 모든 작업이 공유)에서 동시에 처리됩니다.
+- 묶음 안에서는 문제 ID 를 0..n-1 로 다시 매겨 보내므로, 업로드 안에 같은 ID 가 여러 번 나와도 섞이지 않습니다.
+- 작업 상태는 프로세스 메모리에만 보관합니다. (서버 재시작 시 사라짐, 워커 프로세스가 여러 개면 작업을 만든 프로세스에서만 조회 가능)
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from dto.CommonDTO import BlankItem, GradeItem
+from service.gpt_service import (
+    RoleEvaluationError, token_counter, create_grade_prompt, create_blank_prompt, grade_items_async,
+    grade_blank_items_async
+)
+from service.rate_limiter import priority_lane
+
+load_dotenv()
+
+# 묶음 하나의 채점 프롬프트 최대 토큰 수 / 최대 답안 수
+GRADE_JOB_BATCH_TOKENS = int(os.getenv("GRADE_JOB_BATCH_TOKENS", "3000"))
+GRADE_JOB_BATCH_ITEMS = int(os.getenv("GRADE_JOB_BATCH_ITEMS", "20"))
+# 모든 작업이 공유하는 동시 채점 묶음 수
+GRADE_JOB_WORKERS = int(os.getenv("GRADE_JOB_WORKERS", "4"))
+# 실패한 묶음 재시도 횟수
+GRADE_JOB_RETRIES = int(os.getenv("GRADE_JOB_RETRIES", "1"))
+# 끝난 작업을 메모리에 보관할 시간 / 최대 작업 수
+GRADE_JOB_TTL_SECONDS = float(os.getenv("GRADE_JOB_TTL_SECONDS", "3600"))
+GRADE_JOB_MAX_JOBS = int(os.getenv("GRADE_JOB_MAX_JOBS", "100"))
+
+JOB_KINDS = {
+    "descriptive": (GradeItem, create_grade_prompt, grade_items_async),
+    "blank": (BlankItem, create_blank_prompt, grade_blank_items_async),
+}
+
+_worker_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _semaphore() -> asyncio.Semaphore:
+    # 이벤트 루프 안에서 처음 사용할 때 생성
+    global _worker_semaphore
+    if _worker_semaphore is None:
+        _worker_semaphore = asyncio.Semaphore(max(1, GRADE_JOB_WORKERS))
+    return _worker_semaphore
+
+
+class GradeJob:
+    def __init__(self, kind: str, items: list, batches: List[List[int]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.items = items
+        self.batches = batches
+        self.status = "queued"
+        self.results: List[dict] = []
+        self.failed = 0
+        self.request_tokens = 0
+        self.response_tokens = 0
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def add_results(self, results: List[dict]) -> None:
+        self.results.extend(results)
+        self.failed += sum(1 for r in results if "error" in r)
+        self._notify()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._notify()
+
+    def _notify(self) -> None:
+        # 기다리던 스트림을 모두 깨우고 다음 변경을 위한 새 이벤트로 교체
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": len(self.items),
+            "completed": len(self.results),
+            "failed": self.failed,
+            "batches": len(self.batches),
+            "request_tokens": self.request_tokens,
+            "response_tokens": self.response_tokens,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+    async def stream_results(self) -> AsyncIterator[str]:
+        """완료된 결과를 JSONL 줄로 내보내고, 작업이 끝날 때까지 새 결과를 기다립니다."""
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.results):
+                yield json.dumps(self.results[sent], ensure_ascii=False) + "\n"
+                sent += 1
+            if self.finished:
+                return
+            await changed.wait()
+
+
+_jobs: "OrderedDict[str, GradeJob]" = OrderedDict()
+
+
+def _prune_jobs() -> None:
+    now = time.time()
+    for job_id in list(_jobs):
+        job = _jobs[job_id]
+        if job.finished and now - job.finished_at > GRADE_JOB_TTL_SECONDS:
+            del _jobs[job_id]
+    # 개수 제한을 넘으면 오래된 끝난 작업부터 제거 (진행 중인 작업은 유지)
+    for job_id in list(_jobs):
+        if len(_jobs) < GRADE_JOB_MAX_JOBS:
+            break
+        if _jobs[job_id].finished:
+            del _jobs[job_id]
+
+
+def get_job(job_id: str) -> Optional[GradeJob]:
+    return _jobs.get(job_id)
+
+
+def parse_jsonl(raw: bytes, kind: str) -> list:
+    """JSONL 업로드를 GradeItem / BlankItem 리스트로 변환합니다. 잘못된 줄이 있으면 ValueError."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"지원하지 않는 채점 종류입니다: {kind}")
+    item_cls = JOB_KINDS[kind][0]
+    items = []
+    for line_no, line in enumerate(raw.decode("utf-8-sig").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(item_cls(**json.loads(line)))
+        except (json.JSONDecodeError, TypeError, ValidationError) as e:
+            raise ValueError(f"{line_no}번째 줄을 읽을 수 없습니다: {e}")
+    if not items:
+        raise ValueError("채점할 항목이 없습니다.")
+    return items
+
+
+def pack_batches(items: list, build_prompt: Callable[[list], str],
+                 max_tokens: int = GRADE_JOB_BATCH_TOKENS, max_items: int = GRADE_JOB_BATCH_ITEMS) -> List[List[int]]:
+    """
+    프롬프트 토큰 수가 max_tokens 이하, 항목 수가 max_items 이하가 되도록 항목 인덱스를 순서대로 묶습니다.
+    항목 하나가 한도를 넘어도 단독 묶음으로 보냅니다.
+    """
+    base = token_counter.count(build_prompt([]))
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = base
+    for idx, item in enumerate(items):
+        # 항목 구분 줄바꿈까지 포함한 대략적인 항목 토큰 수
+        cost = token_counter.count(build_prompt([item])) - base + 2
+        if current and (current_tokens + cost > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], base
+        current.append(idx)
+        current_tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _grade_batch(job: GradeJob, indices: List[int],
+                       grade_fn: Callable[[list], Awaitable[dict]]) -> List[dict]:
+    """묶음 하나를 채점하고 결과를 업로드 순서(index) 기준으로 돌려줍니다."""
+    # 묶음 안에서만 쓰는 ID 로 다시 매김
+    batch_items = [job.items[idx].model_copy(update={"id": local_id}) for local_id, idx in enumerate(indices)]
+    last_error = None
+    for _ in range(GRADE_JOB_RETRIES + 1):
+        try:
+            async with _semaphore():
+                result = await grade_fn(batch_items)
+        except Exception as e:
+            last_error = str(e)
+            print(f"[GradeJob {job.id}] batch error: {e}")
+            if isinstance(e, RoleEvaluationError):
+                # 실패한 시도에서 쓴 토큰도 작업 사용량에 포함
+                job.request_tokens += e.request_tokens
+                job.response_tokens += e.response_tokens
+            continue
+        job.request_tokens += result["request_tokens"]
+        job.response_tokens += result["response_tokens"]
+        verdicts = {r.id: r.correct for r in result["result"]}
+        rows = []
+        for local_id, idx in enumerate(indices):
+            row = {"index": idx, "id": job.items[idx].id}
+            if local_id in verdicts:
+                row["correct"] = verdicts[local_id]
+            else:
+                row["error"] = "채점 결과가 누락되었습니다."
+            rows.append(row)
+        return rows
+    return [{"index": idx, "id": job.items[idx].id, "error": last_error} for idx in indices]
+
+
+async def _run_job(job: GradeJob, on_finish: Callable[[GradeJob], Awaitable[None]]) -> None:
+    _, _, grade_fn = JOB_KINDS[job.kind]
+    job.status = "running"
+
+    async def run_batch(indices: List[int]) -> None:
+        job.add_results(await _grade_batch(job, indices, grade_fn))
+
+    try:
+        # 대량 채점은 대화형 요청에 업스트림 순서를 양보
+        with priority_lane("bulk"):
+            await asyncio.gather(*[run_batch(indices) for indices in job.batches])
+        job.finish("done")
+    except Exception as e:
+        job.finish("failed", str(e))
+    finally:
+        try:
+            await on_finish(job)
+        except Exception as e:
+            print(f"[GradeJob {job.id}] usage logging error: {e}")
+
+
+def start_job(kind: str, items: list, on_finish: Callable[[GradeJob], Awaitable[None]]) -> GradeJob:
+    """
+    채점 작업을 만들고 백그라운드에서 실행합니다. (이벤트 루프 안에서 호출)
+    on_finish 는 작업이 끝난 뒤 한 번 호출되며, 작업 전체 토큰 사용량 기록에 사용합니다.
+    """
+    _, build_prompt, _ = JOB_KINDS[kind]
+    _prune_jobs()
+    job = GradeJob(kind, items, pack_batches(items, build_prompt))
+    _jobs[job.id] = job
+    job._task = asyncio.ensure_future(_run_job(job, on_finish))
+    return job
@@ -0,0 +1,92 @@
+# service/http_client.py
+"""
+OpenAI 트래픽용 공유 HTTP 클라이언트 팩토리.
+
+텍스트(chat)와 오디오(Whisper) 호출이 같은 커넥션 풀을 쓰도록 게이트웨이는 이 팩토리로 만든
+httpx 클라이언트 하나를 AsyncOpenAI 에 넘깁니다.
+
+- 풀 크기 / keep-alive: OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE_CONNECTIONS, OPENAI_KEEPALIVE_EXPIRY
+- HTTP/2: OPENAI_HTTP2 (auto 이면 h2 패키지가 설치된 경우에만 사용)
+- 시작 시 미리 연결: warm_up() 이 OPENAI_WARMUP_CONNECTIONS 개의 연결을 열어 둡니다.
+- 지표: 요청마다 새 연결을 열었는지(http_requests_total{connection=new|reused})와 연결 수립 시간을 기록합니다.
+"""
+import asyncio
+import importlib.util
+import os
+import time
+
+import httpx
+from dotenv import load_dotenv
+from openai import DefaultAsyncHttpxClient
+
+from service import metrics
+
+load_dotenv()
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "auto").lower()
+OPENAI_WARMUP_CONNECTIONS = int(os.getenv("OPENAI_WARMUP_CONNECTIONS", "2"))
+
+
+def http2_enabled() -> bool:
+    if OPENAI_HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return OPENAI_HTTP2 in ("1", "true", "yes")
+
+
+class MeteredTransport(httpx.AsyncHTTPTransport):
+    """httpcore trace 이벤트로 요청이 새 연결을 열었는지, 기존 연결을 재사용했는지 기록합니다."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        state = {"new": False, "connect_started": None}
+        parent_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict) -> None:
+            if event_name == "connection.connect_tcp.started":
+                state["connect_started"] = time.monotonic()
+            elif event_name == "connection.connect_tcp.complete":
+                state["new"] = True
+                metrics.observe("http_connect_seconds", time.monotonic() - state["connect_started"],
+                                host=request.url.host)
+            if parent_trace is not None:
+                await parent_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            metrics.inc("http_requests_total", host=request.url.host,
+                        connection="new" if state["new"] else "reused")
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """OpenAI SDK 기본값(타임아웃, 리다이렉트)에 풀 설정과 계측 transport 를 더한 클라이언트."""
+    transport = MeteredTransport(
+        http2=http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return DefaultAsyncHttpxClient(transport=transport)
+
+
+async def warm_up(client: httpx.AsyncClient, base_url: str, connections: int = OPENAI_WARMUP_CONNECTIONS) -> None:
+    """
+    base_url 로 HEAD 요청을 동시에 보내 연결(TCP + TLS)을 미리 열어 둡니다.
+    응답 상태와 상관없이 연결만 목적이며, 실패해도 서버 시작을 막지 않습니다.
+    """
+    if connections <= 0:
+        return
+    # HTTP/2 는 연결 하나로 요청을 다중화하므로 하나만 열면 충분
+    count = 1 if http2_enabled() else connections
+    started = time.monotonic()
+    results = await asyncio.gather(*[client.head(base_url) for _ in range(count)], return_exceptions=True)
+    failed = [r for r in results if isinstance(r, Exception)]
+    print(f"[http_client] warmed up {count - len(failed)}/{count} connection(s) to {base_url} "
+          f"in {time.monotonic() - started:.2f}s (http2={http2_enabled()})", flush=True)
+    if failed:
+        print(f"[http_client] warm-up error: {failed[0]!r}", flush=True)
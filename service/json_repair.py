@@ -0,0 +1,183 @@
+# service/json_repair.py
+"""
+GPT 가 만든 깨진 JSON 을 최대한 살려내는 복구 엔진.
+
+처리하는 경우:
+- ```json 코드 블록 / 중간에 섞인 ``` 표시
+- JSON 앞뒤의 안내문 (첫 '{' 또는 '[' 이전, 최상위 값이 닫힌 이후)
+- 따옴표 대신 쓰인 스마트 따옴표(“ ”)
+- ,} / ,] 같은 후행 쉼표, 객체 사이에 빠진 쉼표 (}{ → },{)
+- 응답이 중간에 잘린 경우: 마지막으로 완성된 값까지만 남기고 열린 괄호를 닫음
+  (끝나지 않은 문자열이나 미완성 문제 객체는 버리고, 완성된 문제 객체는 모두 유지)
+  절단 지점은 목록 배열(최상위 배열, 또는 최상위 객체의 값인 배열)의 원소 경계에서만 잡습니다.
+  그래서 options 처럼 문제 객체 안쪽의 배열이나 객체가 닫힌 지점에서 잘라 answer 가 빠진 문제나
+  선지 일부만 남은 문제가 "완성된 문제"로 살아남지 않습니다.
+"""
+import json
+import re
+from typing import Any, List, Tuple
+
+# 잘린 응답에서 되돌아가며 시도할 최대 절단 지점 수
+MAX_CUT_ATTEMPTS = 32
+
+_SMART_QUOTES = "“”„‟"
+
+
+class JSONRepairError(ValueError):
+    pass
+
+
+def fix_json_commas(json_string: str) -> str:
+    # ,} 또는 ,] 같은 문법 오류 제거
+    return re.sub(r',\s*([\]}])', r'\1', json_string)
+
+
+def remove_json_block(json_string: str) -> str:
+    # ```json ... ``` 형태의 코드 블록을 제거합니다.
+    return re.sub(r"```json\s*(.*?)\s*```", r"\1", json_string, flags=re.DOTALL)
+
+
+def _loads(text: str) -> Any:
+    return json.loads(text, strict=False)
+
+
+def repair_json(text: str) -> Any:
+    """
+    text 를 JSON 으로 파싱합니다. 그대로 파싱되지 않으면 단계적으로 복구를 시도하고,
+    아무것도 살릴 수 없으면 JSONRepairError 를 발생시킵니다.
+    """
+    if text is None:
+        raise JSONRepairError("empty response")
+
+    # 1) 기존 방식 그대로 파싱되면 그대로 사용
+    try:
+        return _loads(fix_json_commas(remove_json_block(text)))
+    except json.JSONDecodeError:
+        pass
+
+    # 2) 코드 블록 표시 제거 → 스캔하며 정규화 → (잘렸다면) 마지막 완성 지점에서 닫기
+    cleaned = re.sub(r"```(?:json|JSON)?", "", text)
+    normalized, cut_points, complete = _scan(cleaned)
+    if not normalized:
+        raise JSONRepairError("no JSON value found")
+
+    if complete:
+        try:
+            return _loads(fix_json_commas(normalized))
+        except json.JSONDecodeError as e:
+            last_error = e
+    else:
+        last_error = None
+
+    # 3) 잘린 응답: 가장 늦은 완성 지점부터 거꾸로 시도
+    for end, open_stack in reversed(cut_points[-MAX_CUT_ATTEMPTS:]):
+        candidate = normalized[:end].rstrip().rstrip(",") + "".join(
+            "}" if opener == "{" else "]" for opener in reversed(open_stack)
+        )
+        try:
+            return _loads(fix_json_commas(candidate))
+        except json.JSONDecodeError as e:
+            last_error = e
+
+    raise JSONRepairError(f"unrecoverable JSON: {last_error}")
+
+
+def _scan(text: str) -> Tuple[str, List[Tuple[int, Tuple[str, ...]]], bool]:
+    """
+    첫 '{' / '[' 부터 최상위 값이 닫힐 때까지 훑으면서
+    - 스마트 따옴표를 일반 따옴표로 바꾸고
+    - 빠진 쉼표를 채우고
+    - 값이 하나 완성될 때마다 (출력 위치, 아직 열린 괄호들) 을 절단 지점으로 기록합니다.
+    반환: (정규화된 텍스트, 절단 지점 목록, 최상위 값이 닫혔는지)
+    """
+    start = -1
+    for idx, ch in enumerate(text):
+        if ch in "{[":
+            start = idx
+            break
+    if start < 0:
+        return "", [], False
+
+    out: List[str] = []
+    stack: List[str] = []
+    cut_points: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = False
+    smart_string = False
+    escape = False
+    last_significant = ""
+
+    for pos in range(start, len(text)):
+        ch = text[pos]
+        if in_string:
+            if escape:
+                escape = False
+                out.append(ch)
+            elif ch == "\\":
+                escape = True
+                out.append(ch)
+            elif ch == '"' or (smart_string and ch in _SMART_QUOTES and _closes_string(text, pos)):
+                # 스마트 따옴표 문자열은 뒤에 구분자(: , } ])가 올 때만 닫힘 (본문 속 인용 부호 보호)
+                in_string = False
+                out.append('"')
+                last_significant = '"'
+            elif smart_string and ch in _SMART_QUOTES:
+                out.append('\\"')
+            else:
+                out.append(ch)
+            continue
+
+        if ch == '"' or ch in _SMART_QUOTES:
+            if last_significant in ('"', "}", "]") and stack and stack[-1] == "[":
+                out.append(",")
+            in_string = True
+            smart_string = ch != '"'
+            out.append('"')
+            continue
+
+        if ch in "{[":
+            # 배열 안에서 값 사이 쉼표가 빠진 경우 (예: }{ ) 채움
+            if last_significant in ('"', "}", "]") and stack and stack[-1] == "[":
+                out.append(",")
+            stack.append(ch)
+            out.append(ch)
+            last_significant = ch
+            continue
+
+        if ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            out.append(ch)
+            last_significant = ch
+            if not stack:
+                return "".join(out), cut_points, True
+            if _is_collection_level(stack):
+                cut_points.append((len(out), tuple(stack)))
+            continue
+
+        if (ch == "," and stack and stack[-1] == "[" and _is_collection_level(stack)
+                and last_significant not in (",", "[")):
+            # 목록 배열의 원소(숫자/문자열 등)가 하나 끝난 지점
+            cut_points.append((len(out), tuple(stack)))
+
+        out.append(ch)
+        if not ch.isspace():
+            last_significant = ch
+
+    return "".join(out), cut_points, False
+
+
+def _is_collection_level(stack: List[str]) -> bool:
+    """
+    방금 닫힌 값이 목록 배열의 원소이거나 최상위 객체의 값인지 확인합니다.
+    (stack 은 닫힌 뒤 아직 열린 괄호들: ['{'] / ['['] / ['{', '['] / ['[', '['])
+    """
+    return len(stack) == 1 or (len(stack) == 2 and stack[-1] == "[")
+
+
+def _closes_string(text: str, pos: int) -> bool:
+    """pos 의 따옴표 뒤에 (공백을 건너뛰고) 구분자가 오면 문자열의 끝으로 봅니다."""
+    for ch in text[pos + 1:pos + 64]:
+        if not ch.isspace():
+            return ch in ":,}]"
+    return True
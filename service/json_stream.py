@@ -0,0 +1,91 @@
+# service/json_stream.py
+"""
+스트리밍으로 들어오는 문제 생성 JSON 을 점진적으로 파싱합니다.
+
+GPT 응답 형태:
+    ```json
+    {"multipleChoice": [{...}, {...}], "ox": [{...}], ...}
+    ```
+최상위 키 아래 배열에 들어 있는 객체({...})가 닫히는 즉시 (키, 객체) 로 꺼내 줍니다.
+전체 JSON 이 아직 완성되지 않았어도 완성된 문제부터 바로 사용할 수 있습니다.
+"""
+import json
+from typing import List, Optional, Tuple
+
+from service.json_repair import fix_json_commas
+
+
+class IncrementalJSONParser:
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0               # 다음에 검사할 문자 위치
+        self._started = False       # 최상위 '{' 를 만났는지
+        self._stack: List[str] = []  # 열린 괄호 스택
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_string: Optional[str] = None  # 깊이 1에서 마지막으로 닫힌 문자열 (키 후보)
+        self._current_key: Optional[str] = None
+        self._object_start = -1
+        self.finished = False       # 최상위 객체가 닫혔는지
+
+    def feed(self, text: str) -> List[Tuple[str, dict]]:
+        """텍스트 조각을 추가하고, 이번에 새로 완성된 (키, 객체) 목록을 반환합니다."""
+        self.buffer += text
+        completed = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf) and not self.finished:
+            ch = buf[i]
+            if not self._started:
+                # 코드 블록 표시나 앞쪽 안내문은 건너뜀
+                if ch == "{":
+                    self._started = True
+                    self._stack.append("{")
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = buf[self._string_start + 1:i]
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ":" and len(self._stack) == 1:
+                self._current_key = self._last_string
+            elif ch in "{[":
+                self._stack.append(ch)
+                # 최상위 키 → 배열 → 객체 (깊이 3) 시작
+                if ch == "{" and self._stack[:2] == ["{", "["] and len(self._stack) == 3:
+                    self._object_start = i
+            elif ch in "}]":
+                if self._stack:
+                    opened = self._stack.pop()
+                    if (opened == "{" and len(self._stack) == 2 and self._object_start >= 0
+                            and self._current_key is not None):
+                        item = self._load(buf[self._object_start:i + 1])
+                        if item is not None:
+                            completed.append((self._current_key, item))
+                        self._object_start = -1
+                if not self._stack:
+                    self.finished = True
+            i += 1
+        self._pos = i
+        return completed
+
+    @staticmethod
+    def _load(raw: str) -> Optional[dict]:
+        try:
+            item = json.loads(fix_json_commas(raw))
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
@@ -0,0 +1,247 @@
+# service/llm_backend.py
+"""
+게이트웨이 뒤의 LLM 백엔드 (LLM_BACKEND 로 선택).
+
+- openai (기본): 실제 OpenAI API
+- fake: 프로세스 내부 가짜 응답 (service/fake_llm.py, 비용/네트워크 없이 부하 테스트·벤치마크)
+- record: 실제 OpenAI 를 호출하면서 응답을 LLM_RECORD_DIR 에 저장
+- replay: LLM_RECORD_DIR 에 저장된 응답만 돌려줌 (없으면 ReplayMissError)
+
+속도 제한, 재시도, 헤징, 사용량 기록은 게이트웨이(llm_gateway)에서 처리하므로 백엔드는 호출 자체만 담당합니다.
+녹화 파일은 요청 키의 해시를 이름으로 하고 응답 본문 원문(HTTP body, 스트림은 SSE 본문 전체)을 담습니다. 요청 키는
+- chat / stream: model, messages 와 호출 옵션 전부 (max_tokens, temperature, response_format 등)
+  단, 게이트웨이가 모든 스트림에 붙이는 stream_options 는 응답 본문을 바꾸지 않으므로 뺍니다.
+  (max_tokens 는 잘림 / finish_reason 을 정하므로 키에 포함)
+- transcription: model, 오디오 바이트의 sha256, response_format, language
+녹화와 재생 모두 같은 본문 원문을 같은 방식으로 파싱하므로 녹화 당시와 같은 응답(본문, usage 포함)을 받습니다.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from openai.types.audio import Transcription
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from service.response_cache import make_cache_key
+
+load_dotenv()
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+LLM_RECORD_DIR = os.getenv("LLM_RECORD_DIR", "llm_recordings")
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class LLMBackend:
+    """백엔드 인터페이스. 인자와 반환 형식은 OpenAI SDK 호출과 같습니다."""
+    name = "base"
+
+    async def chat_completion(self, model: str, messages: List[dict], **kwargs) -> ChatCompletion:
+        raise NotImplementedError
+
+    async def chat_stream(self, model: str, messages: List[dict], **kwargs) -> AsyncIterator[ChatCompletionChunk]:
+        """스트림 객체(ChatCompletionChunk 의 async iterator)를 반환합니다."""
+        raise NotImplementedError
+
+    async def transcription(self, model: str, file, response_format: str = "text", language: str = "ko") -> Any:
+        """response_format 이 text 이면 str, 그 밖에는 Transcription."""
+        raise NotImplementedError
+
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, client_factory: Callable[[], AsyncOpenAI]):
+        self.client_factory = client_factory
+
+    async def chat_completion(self, model: str, messages: List[dict], **kwargs) -> ChatCompletion:
+        return await self.client_factory().chat.completions.create(model=model, messages=messages, **kwargs)
+
+    async def chat_stream(self, model: str, messages: List[dict], **kwargs) -> AsyncIterator[ChatCompletionChunk]:
+        return await self.client_factory().chat.completions.create(
+            model=model, messages=messages, stream=True, **kwargs
+        )
+
+    async def transcription(self, model: str, file, response_format: str = "text", language: str = "ko") -> Any:
+        return await self.client_factory().audio.transcriptions.create(
+            model=model, file=file, response_format=response_format, language=language
+        )
+
+    # ─────────────── 녹화용: 응답 본문 원문 ───────────────
+    async def chat_completion_body(self, model: str, messages: List[dict], **kwargs) -> bytes:
+        raw = await self.client_factory().chat.completions.with_raw_response.create(
+            model=model, messages=messages, **kwargs
+        )
+        return raw.content
+
+    async def chat_stream_body(self, model: str, messages: List[dict], **kwargs) -> AsyncIterator[bytes]:
+        """SSE 본문 바이트 조각의 async iterator (응답 헤더까지 받은 뒤 반환)."""
+        raw = await self.client_factory().chat.completions.with_raw_response.create(
+            model=model, messages=messages, stream=True, **kwargs
+        )
+        return _iter_body(raw.http_response)
+
+    async def transcription_body(self, model: str, file, response_format: str = "text", language: str = "ko") -> bytes:
+        raw = await self.client_factory().audio.transcriptions.with_raw_response.create(
+            model=model, file=file, response_format=response_format, language=language
+        )
+        return raw.content
+
+
+async def _iter_body(response: httpx.Response) -> AsyncIterator[bytes]:
+    try:
+        async for block in response.aiter_bytes():
+            yield block
+    finally:
+        await response.aclose()
+
+
+async def _single_block(body: bytes) -> AsyncIterator[bytes]:
+    yield body
+
+
+# ─────────────── 본문 파싱 (녹화 / 재생 공용) ───────────────
+_SSE_EVENT_END = re.compile(rb"\r?\n\r?\n")
+
+
+def _sse_data(event: bytes) -> Optional[str]:
+    lines = [line[5:] for line in event.decode("utf-8").splitlines() if line.startswith("data:")]
+    if not lines:
+        return None
+    return "\n".join(line[1:] if line.startswith(" ") else line for line in lines)
+
+
+async def _parse_stream(blocks: AsyncIterator[bytes]) -> AsyncIterator[ChatCompletionChunk]:
+    """SSE 본문을 이벤트 단위로 나눠 ChatCompletionChunk 로 파싱합니다. ([DONE] 은 건너뛰고 본문 끝까지 읽음)"""
+    async def events() -> AsyncIterator[bytes]:
+        buffer = b""
+        async for block in blocks:
+            buffer += block
+            *complete, buffer = _SSE_EVENT_END.split(buffer)
+            for event in complete:
+                yield event
+        # 마지막 빈 줄 없이 끝난 이벤트
+        if buffer.strip():
+            yield buffer
+
+    async for event in events():
+        data = _sse_data(event)
+        if data is None or data == "[DONE]":
+            continue
+        payload = json.loads(data)
+        if payload.get("error"):
+            raise ValueError(f"스트림 오류 이벤트: {payload['error']}")
+        yield ChatCompletionChunk.model_validate(payload)
+
+
+def _parse_transcription(body: bytes, response_format: str) -> Any:
+    # text / srt / vtt 는 SDK 도 본문 문자열을 그대로 반환
+    if response_format in ("text", "srt", "vtt"):
+        return body.decode("utf-8")
+    return Transcription.model_validate_json(body)
+
+
+def file_sha256(file) -> str:
+    """파일 객체 전체의 sha256 (처음부터 블록 단위로 읽음, 블로킹이므로 스레드에서 호출)."""
+    file.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(1 << 20), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+class RecordReplayBackend(LLMBackend):
+    """replay=False 이면 inner 를 호출하고 응답 본문을 저장, replay=True 이면 저장된 본문만 사용합니다."""
+
+    # chat 요청 키에서 빼는 옵션 (응답 본문에 영향이 없는 것만)
+    KEY_EXCLUDED_OPTIONS = ("stream_options",)
+
+    def __init__(self, inner: OpenAIBackend, directory: str, replay: bool):
+        self.inner = inner
+        self.directory = directory
+        self.replay = replay
+        self.name = "replay" if replay else "record"
+        os.makedirs(directory, exist_ok=True)
+
+    # ─────────────── 저장소 ───────────────
+    def _path(self, kind: str, params: dict) -> str:
+        return os.path.join(self.directory, f"{kind}-{make_cache_key(kind, params)}.body")
+
+    def _chat_path(self, kind: str, model: str, messages: List[dict], kwargs: dict) -> str:
+        options = {name: value for name, value in kwargs.items() if name not in self.KEY_EXCLUDED_OPTIONS}
+        return self._path(kind, {"model": model, "messages": messages, **options})
+
+    def _load(self, path: str) -> bytes:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise ReplayMissError(f"녹화된 응답이 없습니다: {os.path.basename(path)}")
+
+    def _save(self, path: str, body: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    # ─────────────── 호출 ───────────────
+    async def chat_completion(self, model: str, messages: List[dict], **kwargs) -> ChatCompletion:
+        path = self._chat_path("chat", model, messages, kwargs)
+        if self.replay:
+            body = await asyncio.to_thread(self._load, path)
+        else:
+            body = await self.inner.chat_completion_body(model, messages, **kwargs)
+            await asyncio.to_thread(self._save, path, body)
+        return ChatCompletion.model_validate_json(body)
+
+    async def chat_stream(self, model: str, messages: List[dict], **kwargs) -> AsyncIterator[ChatCompletionChunk]:
+        path = self._chat_path("stream", model, messages, kwargs)
+        if self.replay:
+            body = await asyncio.to_thread(self._load, path)
+            return _parse_stream(_single_block(body))
+        return self._record_stream(path, await self.inner.chat_stream_body(model, messages, **kwargs))
+
+    async def _record_stream(self, path: str, blocks: AsyncIterator[bytes]) -> AsyncIterator[ChatCompletionChunk]:
+        body = bytearray()
+
+        async def tee() -> AsyncIterator[bytes]:
+            async for block in blocks:
+                body.extend(block)
+                yield block
+
+        async for chunk in _parse_stream(tee()):
+            yield chunk
+        # 끝까지 받은 스트림만 저장
+        await asyncio.to_thread(self._save, path, bytes(body))
+
+    async def transcription(self, model: str, file, response_format: str = "text", language: str = "ko") -> Any:
+        audio_hash = await asyncio.to_thread(file_sha256, file)
+        path = self._path("transcription", {"model": model, "audio": audio_hash,
+                                            "response_format": response_format, "language": language})
+        if self.replay:
+            body = await asyncio.to_thread(self._load, path)
+        else:
+            file.seek(0)
+            body = await self.inner.transcription_body(model, file, response_format, language)
+            await asyncio.to_thread(self._save, path, body)
+        return _parse_transcription(body, response_format)
+
+
+def backend_from_env(client_factory: Callable[[], AsyncOpenAI]) -> LLMBackend:
+    """LLM_BACKEND 환경 변수로 백엔드를 생성합니다."""
+    if LLM_BACKEND == "fake":
+        from service.fake_llm import FakeBackend
+        return FakeBackend()
+    if LLM_BACKEND in ("record", "replay"):
+        return RecordReplayBackend(OpenAIBackend(client_factory), LLM_RECORD_DIR, replay=LLM_BACKEND == "replay")
+    if LLM_BACKEND != "openai":
+        raise ValueError(f"지원하지 않는 LLM_BACKEND 입니다: {LLM_BACKEND}")
+    return OpenAIBackend(client_factory)
@@ -0,0 +1,229 @@
+# service/llm_gateway.py
+"""
+OpenAI 업스트림 호출을 한곳으로 모으는 비동기 게이트웨이.
+
+- async 엔드포인트는 chat_completion / chat_text / transcribe 를 직접 await 합니다.
+- 실제 호출은 LLM_BACKEND 로 고른 백엔드(service.llm_backend)가 담당합니다.
+- def 엔드포인트(스레드풀에서 실행)는 run_sync 로 같은 이벤트 루프에 코루틴을 위임합니다.
+  덕분에 업스트림 응답을 기다리는 동안 uvicorn 워커가 멈추지 않습니다.
+"""
+import asyncio
+import functools
+import math
+import os
+import time
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
+
+import anyio
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from service import metrics
+from service.http_client import create_http_client, warm_up
+from service.llm_backend import backend_from_env
+from service.rate_limiter import chat_governor, whisper_governor
+from service.request_metrics import current_route
+from service.resilience import record_latency, resilient_call, with_timeout
+from service.usage_meter import (
+    count_message_tokens, record_cancelled_chat_usage, record_chat_usage, record_transcription_usage
+)
+
+load_dotenv()  # .env 파일 불러오기
+gpt_model = os.getenv("GPT_MODEL")
+# max_tokens 없이 호출할 때 TPM 버킷에서 미리 차감할 응답 토큰 수
+RATE_LIMIT_DEFAULT_COMPLETION_TOKENS = int(os.getenv("RATE_LIMIT_DEFAULT_COMPLETION_TOKENS", "1000"))
+# 호출 하나의 제한 시간 (초, 0 이면 제한 없음). 스트림은 첫 응답까지의 시간
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "120"))
+WHISPER_TIMEOUT_SECONDS = float(os.getenv("WHISPER_TIMEOUT_SECONDS", "300"))
+
+T = TypeVar("T")
+
+# httpx 커넥션 풀은 생성된 이벤트 루프에 묶이므로 루프마다 클라이언트를 하나씩 둡니다.
+# (uvicorn 워커에서는 루프가 하나뿐이라 사실상 단일 클라이언트, chat / Whisper 가 같은 풀을 공유)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncOpenAI:
+    """현재 실행 중인 이벤트 루프에 대응하는 AsyncOpenAI 클라이언트를 반환합니다."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # 재시도는 service.resilience 에서만 (SDK 기본 재시도와 겹치지 않도록)
+        http_client = create_http_client()
+        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, http_client=http_client)
+        _clients[loop] = client
+        _http_clients[loop] = http_client
+    return client
+
+
+# 실제 호출을 담당하는 백엔드 (LLM_BACKEND: openai / fake / record / replay)
+backend = backend_from_env(get_async_client)
+
+
+async def warm_up_client() -> None:
+    """앱 시작 시 호출: 현재 루프의 클라이언트를 만들고 업스트림 연결을 미리 열어 둡니다."""
+    if backend.name in ("fake", "replay"):
+        return  # OpenAI 에 연결하지 않는 백엔드
+    client = get_async_client()
+    await warm_up(_http_clients[asyncio.get_running_loop()], str(client.base_url))
+
+
+async def close_client() -> None:
+    """앱 종료 시 호출: 현재 루프의 클라이언트와 커넥션 풀을 닫습니다."""
+    loop = asyncio.get_running_loop()
+    _http_clients.pop(loop, None)
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.close()
+
+
+def estimate_chat_tokens(messages: List[dict], model: str, max_tokens: Optional[int] = None) -> int:
+    """속도 제한용 요청 토큰 추정치 (프롬프트 + 최대 응답 토큰)."""
+    return count_message_tokens(messages, model) + (max_tokens or RATE_LIMIT_DEFAULT_COMPLETION_TOKENS)
+
+
+def _total_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None) if response is not None else None
+    return getattr(usage, "total_tokens", None)
+
+
+def _record_token_metrics(op: str, model: str, response) -> None:
+    """응답 usage 의 토큰 수를 upstream_tokens_total 에 더합니다. (usage 가 없는 응답은 건너뜀)"""
+    usage = getattr(response, "usage", None) if response is not None else None
+    if usage is None:
+        return
+    # chat 은 prompt/completion, 토큰 단위 전사 모델은 input/output
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+    route = current_route()
+    metrics.inc("upstream_tokens_total", prompt, op=op, model=model, route=route, kind="prompt")
+    metrics.inc("upstream_tokens_total", completion, op=op, model=model, route=route, kind="completion")
+
+
+async def chat_completion(messages: List[dict], model: Optional[str] = None, **kwargs) -> Any:
+    """
+    chat.completions.create 를 비동기로 호출하고 응답 객체를 그대로 반환합니다.
+    호출 전에 chat_governor 의 RPM/TPM 허가를 받고, 응답의 usage 는 현재 요청의 UsageMeter 에 기록됩니다.
+    """
+    model = model or gpt_model
+    estimate = estimate_chat_tokens(messages, model, kwargs.get("max_tokens"))
+
+    async def attempt():
+        async with chat_governor.limit(estimate) as permit:
+            metrics.inc("upstream_calls_total", api="chat", backend=backend.name)
+            started = time.monotonic()
+            try:
+                with metrics.timer("upstream_latency_seconds", op="chat", model=model, route=current_route()):
+                    response = await with_timeout("chat", backend.chat_completion(model, messages, **kwargs),
+                                                  UPSTREAM_TIMEOUT_SECONDS)
+            except asyncio.CancelledError:
+                # 헤징에서 져서(또는 호출자가 끊겨) 취소된 요청도 업스트림에는 이미 나갔으므로
+                # 프롬프트 토큰을 추정치로 남김 (TPM 버킷은 미리 차감한 추정치를 그대로 둠)
+                prompt = record_cancelled_chat_usage(messages, model)
+                metrics.inc("upstream_tokens_total", prompt, op="chat_cancelled", model=model,
+                            route=current_route(), kind="prompt")
+                raise
+            record_latency(hedge_key, time.monotonic() - started)
+            permit.used_tokens = _total_tokens(response)
+            _record_token_metrics("chat", model, response)
+        record_chat_usage(response, messages, model)
+        return response
+
+    # 요청 크기가 비슷한 호출끼리 지연 시간을 비교 (토큰 수의 2의 거듭제곱 단위)
+    hedge_key = f"chat:{model}:{int(math.log2(max(1, estimate)))}"
+    return await resilient_call("chat", attempt, hedge_key=hedge_key)
+
+
+async def chat_text(messages: List[dict], model: Optional[str] = None, **kwargs) -> str:
+    """chat_completion 결과에서 첫 번째 메시지 본문만 꺼내 반환합니다."""
+    response = await chat_completion(messages, model=model, **kwargs)
+    return response.choices[0].message.content.strip()
+
+
+async def chat_stream(messages: List[dict], model: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+    """
+    stream=True 로 chat completion 을 호출하고 본문 조각(delta)을 순서대로 내보냅니다.
+    마지막 청크의 usage 는 스트림이 끝날 때 현재 UsageMeter 에 기록됩니다.
+    """
+    model = model or gpt_model
+    # 스트림이 끝날 때까지 허가를 유지 (동시 실행 수에 포함)
+    async with chat_governor.limit(estimate_chat_tokens(messages, model, kwargs.get("max_tokens"))) as permit:
+        # 스트림 시작 전 오류만 재시도 (본문을 내보내기 시작한 뒤에는 다시 보낼 수 없음)
+        async def open_stream():
+            metrics.inc("upstream_calls_total", api="chat_stream", backend=backend.name)
+            # 스트림은 첫 응답(스트림 열림)까지의 시간
+            with metrics.timer("upstream_latency_seconds", op="chat_stream", model=model, route=current_route()):
+                return await with_timeout(
+                    "chat_stream",
+                    backend.chat_stream(model, messages, stream_options={"include_usage": True}, **kwargs),
+                    UPSTREAM_TIMEOUT_SECONDS
+                )
+
+        stream = await resilient_call("chat_stream", open_stream)
+        parts: List[str] = []
+        usage_chunk = None
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            permit.used_tokens = _total_tokens(usage_chunk)
+            _record_token_metrics("chat_stream", model, usage_chunk)
+            record_chat_usage(usage_chunk, messages, model, completion_text="".join(parts))
+
+
+async def transcribe(file, model: str = "whisper-1", response_format: str = "text", language: str = "ko") -> str:
+    """Whisper 전사 API 를 비동기로 호출하고 텍스트를 반환합니다. (whisper_governor 의 RPM 한도 적용)"""
+    async def attempt():
+        async with whisper_governor.limit():
+            metrics.inc("upstream_calls_total", api="whisper", backend=backend.name)
+            # 재시도 때 파일을 처음부터 다시 보냄
+            file.seek(0)
+            with metrics.timer("upstream_latency_seconds", op="whisper", model=model, route=current_route()):
+                return await with_timeout("whisper", backend.transcription(model, file, response_format, language),
+                                          WHISPER_TIMEOUT_SECONDS)
+
+    # 전사는 비용이 커서 헤징하지 않고 재시도만 함
+    resp = await resilient_call("whisper", attempt)
+    if isinstance(resp, str):
+        text = resp
+    else:
+        text = getattr(resp, "text", None)
+        if text is None:
+            text = resp["text"]
+    record_transcription_usage(resp, text, model)
+    _record_token_metrics("whisper", model, resp)
+    return text
+
+
+def _noop() -> None:
+    return None
+
+
+def _in_worker_thread() -> bool:
+    """AnyIO 워커 스레드(FastAPI 의 def 엔드포인트)에서 호출되었는지 확인합니다."""
+    try:
+        anyio.from_thread.run_sync(_noop)
+        return True
+    except RuntimeError:
+        return False
+
+
+def run_sync(async_fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+    """
+    동기 코드에서 게이트웨이 코루틴을 실행하는 래퍼.
+    - 스레드풀에서 호출되면 메인 이벤트 루프에 위임해 클라이언트/커넥션을 공유합니다.
+    - 이벤트 루프가 없는 곳(스크립트 등)에서는 asyncio.run 으로 실행합니다.
+    """
+    if _in_worker_thread():
+        return anyio.from_thread.run(functools.partial(async_fn, *args, **kwargs))
+    return asyncio.run(async_fn(*args, **kwargs))
@@ -0,0 +1,138 @@
+# service/metrics.py
+"""
+프로세스 내부 지표 수집 (prometheus_client 기반 카운터 / 게이지 / 히스토그램).
+
+    inc("upstream_calls_total", api="chat")
+    observe("upstream_wait_seconds", 0.12, bucket="chat", lane="interactive")
+    with timer("ffmpeg_seconds", stage="silencedetect"):
+        ...
+    exposition()  # GET /metrics (Prometheus 텍스트 형식)
+    snapshot()    # GET /metrics/json
+
+지표는 이름으로 처음 쓰일 때 만들어지며, 같은 이름은 항상 같은 레이블 이름으로 기록해야 합니다.
+히스토그램 버킷은 처음 observe 할 때 buckets 로 정합니다. (기본값은 LATENCY_BUCKETS, 단위 초)
+기본 레지스트리를 쓰므로 프로세스 지표(process_resident_memory_bytes 등)도 함께 노출됩니다.
+uvicorn 워커를 여러 개 띄우면 값은 워커(프로세스)마다 따로 집계됩니다.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+
+# 초 단위 (빠른 로컬 처리 ~ 긴 LLM / Whisper 호출)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+# 바이트 단위 (Whisper 업로드 한도 25 MiB 까지)
+SIZE_BUCKETS = tuple(2 ** n * 1024 for n in range(6, 16))
+# 개수 (청크 수, follow-up 횟수 등)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 10, 16, 32)
+
+_lock = threading.Lock()
+_metrics: Dict[str, object] = {}
+
+
+def _get(kind: type, name: str, label_names: Tuple[str, ...], **options):
+    metric = _metrics.get(name)
+    if metric is None:
+        with _lock:
+            metric = _metrics.get(name)
+            if metric is None:
+                metric = _metrics[name] = kind(name, name.replace("_", " "), label_names, **options)
+    return metric
+
+
+def _labeled(metric, labels: dict):
+    return metric.labels(**{k: str(v) for k, v in labels.items()}) if labels else metric
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    _labeled(_get(Counter, name, tuple(sorted(labels))), labels).inc(amount)
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    _labeled(_get(Gauge, name, tuple(sorted(labels))), labels).set(value)
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> None:
+    _labeled(_get(Histogram, name, tuple(sorted(labels)), buckets=buckets), labels).observe(value)
+
+
+def track_in_progress(name: str, **labels):
+    """블록 안에 있는 동안 게이지를 1 올려 두는 컨텍스트 매니저 (처리 중인 요청 수 등)."""
+    return _labeled(_get(Gauge, name, tuple(sorted(labels))), labels).track_inprogress()
+
+
+@contextmanager
+def timer(name: str, buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> Iterator[None]:
+    """블록 실행 시간(초)을 히스토그램에 기록합니다. 예외로 끝나도 기록합니다."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, buckets=buckets, **labels)
+
+
+def exposition() -> Tuple[bytes, str]:
+    """Prometheus 텍스트 형식 본문과 Content-Type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+# ─────────────── JSON 요약 (/metrics/json) ───────────────
+def _format(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}"
+
+
+def _quantile(buckets: List[Tuple[float, float]], count: float, q: float) -> Optional[float]:
+    """누적 버킷으로 분위수 근사 (버킷 안에서는 선형 보간, histogram_quantile 과 같은 방식)."""
+    if not count:
+        return None
+    rank = q * count
+    lower, below = 0.0, 0.0
+    for upper, cumulative in buckets:
+        if cumulative >= rank:
+            if math.isinf(upper):
+                return lower
+            in_bucket = cumulative - below
+            return lower + (upper - lower) * ((rank - below) / in_bucket if in_bucket else 0.0)
+        lower, below = upper, cumulative
+    return lower
+
+
+def snapshot() -> dict:
+    counters, gauges, histograms = {}, {}, {}
+    with _lock:
+        metrics = list(_metrics.values())
+    for metric in metrics:
+        for family in metric.collect():
+            series: Dict[str, dict] = {}
+            for sample in family.samples:
+                labels = {k: v for k, v in sample.labels.items() if k != "le"}
+                key = _format(family.name if family.type == "histogram" else sample.name, labels)
+                if family.type == "counter" and sample.name.endswith("_total"):
+                    counters[key] = sample.value
+                elif family.type == "gauge":
+                    gauges[key] = sample.value
+                elif family.type == "histogram":
+                    entry = series.setdefault(key, {"buckets": []})
+                    if sample.name.endswith("_bucket"):
+                        entry["buckets"].append((float(sample.labels["le"]), sample.value))
+                    elif sample.name.endswith("_count"):
+                        entry["count"] = sample.value
+                    elif sample.name.endswith("_sum"):
+                        entry["sum"] = sample.value
+            for key, entry in series.items():
+                count, total = entry.get("count", 0), entry.get("sum", 0.0)
+                data = {"count": count, "sum": round(total, 6), "avg": round(total / count, 6) if count else 0.0}
+                for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+                    value = _quantile(entry["buckets"], count, q)
+                    data[label] = round(value, 6) if value is not None else 0.0
+                histograms[key] = data
+    return {
+        "counters": dict(sorted(counters.items())),
+        "gauges": dict(sorted(gauges.items())),
+        "histograms": dict(sorted(histograms.items())),
+    }
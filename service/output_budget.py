@@ -0,0 +1,155 @@
+# service/output_budget.py
+"""
+문제 생성 응답 크기(출력 토큰) 예측과 요청 분할.
+
+GPTRequestDTO.expected_token_count 의 유형별 추정치(문제 1개당 토큰 수 + 고정 base)로
+응답 크기를 예측해서
+- max_tokens 를 예측치 + 여유분(margin)으로 설정하고
+- 예측치가 상한(ceiling)을 넘으면 요청을 여러 개의 작은 그룹으로 나눠 동시에 보낼 수 있게 합니다.
+실제 응답을 받을 때마다 유형별 문제 1개의 토큰 수를 관측해 추정치를 지수 이동 평균(EMA)으로 갱신합니다.
+
+초기 추정치는 대략적인 값이라 응답이 JSON 중간에서 잘리지 않도록 보수적으로 동작합니다.
+- 관측이 min_observations 번 쌓이기 전의 유형이 포함되면 max_tokens 는 상한(max_tokens_cap)을 그대로 씁니다.
+- ceiling 기본값은 0(분할하지 않음)입니다. 분할이 필요하면 OUTPUT_BUDGET_CEILING 으로 켭니다.
+"""
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+from dto.GptRequestDTO import GPTRequestDTO
+from service.token_counter import TokenCounter
+
+load_dotenv()
+
+
+class OutputBudgetPlanner:
+    def __init__(self, counter: TokenCounter, estimates: Dict[str, int], margin: float,
+                 ceiling: int, max_tokens_cap: int, alpha: float, min_observations: int = 0):
+        self.counter = counter
+        self.base = estimates.get("base", 0)
+        self._per_item = {k: float(v) for k, v in estimates.items() if k != "base"}
+        self.margin = margin
+        self.ceiling = ceiling
+        self.max_tokens_cap = max_tokens_cap
+        self.alpha = alpha
+        self.min_observations = min_observations
+        self._observations = {k: 0 for k in self._per_item}
+        self._lock = threading.Lock()
+
+    # ─────────────── 예측 ───────────────
+    def per_item(self, q_type: str) -> float:
+        with self._lock:
+            return self._per_item.get(q_type, 0.0)
+
+    def estimates(self) -> Dict[str, int]:
+        """현재 추정치 (base 포함, 확인/로그용)."""
+        with self._lock:
+            return {"base": self.base, **{k: round(v) for k, v in self._per_item.items()}}
+
+    def predict(self, counts: Dict[str, int]) -> int:
+        """유형별 문제 수로 응답 토큰 수를 예측합니다."""
+        with self._lock:
+            items = sum(self._per_item.get(q_type, 0.0) * n for q_type, n in counts.items() if n > 0)
+        return int(math.ceil(self.base + items))
+
+    def warmed_up(self, counts: Dict[str, int]) -> bool:
+        """요청에 포함된 모든 유형의 관측이 min_observations 번 이상 쌓였는지."""
+        with self._lock:
+            return all(self._observations.get(q_type, 0) >= self.min_observations
+                       for q_type, n in counts.items() if n > 0)
+
+    def max_tokens(self, counts: Dict[str, int]) -> int:
+        """예측치에 여유분을 더한 max_tokens (모델 최대 출력 이하). 관측이 부족하면 상한 그대로."""
+        if not self.warmed_up(counts):
+            return self.max_tokens_cap
+        return min(self.max_tokens_cap, int(math.ceil(self.predict(counts) * (1 + self.margin))))
+
+    # ─────────────── 분할 ───────────────
+    def plan(self, counts: Dict[str, int], split_types: bool = False) -> List[Dict[str, int]]:
+        """
+        요청을 예측 크기가 ceiling 이하인 그룹들로 나눕니다. (분할이 필요 없으면 그룹 1개)
+        그룹 크기는 가능한 한 균등하게 맞춰 가장 긴 호출의 시간이 짧아지도록 합니다.
+        split_types=True 이면 유형마다 별도 그룹으로 시작합니다. (유형별 병렬 생성 모드)
+        """
+        active = [(q_type, n) for q_type, n in counts.items() if n > 0]
+        if not active:
+            return []
+        if split_types:
+            groups = []
+            for q_type, n in active:
+                groups.extend(self.plan({q_type: n}))
+            return groups
+        if self.ceiling <= 0 or self.predict(counts) <= self.ceiling:
+            return [dict(active)]
+
+        # 그룹마다 base 가 붙으므로 문제에 쓸 수 있는 토큰은 ceiling - base
+        room = max(1.0, self.ceiling - self.base)
+        item_tokens = sum(max(1.0, self.per_item(q_type)) * n for q_type, n in active)
+        num_groups = int(math.ceil(item_tokens / room))
+        # 나머지 문제 몇 개만 담긴 그룹이 생기지 않도록 문제 1개 분량만큼 여유를 둠
+        largest = max(max(1.0, self.per_item(q_type)) for q_type, _ in active)
+        target = min(room, item_tokens / num_groups + largest)
+
+        groups: List[Dict[str, int]] = []
+        current: Dict[str, int] = {}
+        current_tokens = 0.0
+        for q_type, n in active:
+            cost = max(1.0, self.per_item(q_type))
+            while n > 0:
+                fit = int((target - current_tokens) // cost)
+                if fit <= 0:
+                    if current:
+                        groups.append(current)
+                        current, current_tokens = {}, 0.0
+                        continue
+                    fit = 1  # 문제 1개가 목표보다 커도 최소 1개는 담음
+                take = min(fit, n)
+                current[q_type] = current.get(q_type, 0) + take
+                current_tokens += take * cost
+                n -= take
+        if current:
+            groups.append(current)
+        return groups
+
+    # ─────────────── 학습 ───────────────
+    def observe(self, response_text: str, parsed: Any) -> None:
+        """
+        응답 전체 토큰 수에서 base 를 뺀 만큼을 유형별 문제 내용 길이 비율로 나눠
+        문제 1개당 토큰 수를 관측하고 EMA 로 추정치를 갱신합니다.
+        """
+        if not response_text or not isinstance(parsed, dict):
+            return
+        weights = {}
+        for q_type, items in parsed.items():
+            if q_type in self._per_item and isinstance(items, list) and items:
+                weights[q_type] = (self.counter.count(json.dumps(items, ensure_ascii=False)), len(items))
+        if not weights:
+            return
+        item_tokens = self.counter.count(response_text) - self.base
+        weight_sum = sum(w for w, _ in weights.values())
+        if item_tokens <= 0 or weight_sum <= 0:
+            return
+        with self._lock:
+            for q_type, (weight, n) in weights.items():
+                observed = item_tokens * (weight / weight_sum) / n
+                self._per_item[q_type] = (1 - self.alpha) * self._per_item[q_type] + self.alpha * observed
+                self._observations[q_type] += 1
+
+
+def planner_from_env(counter: TokenCounter) -> OutputBudgetPlanner:
+    """OUTPUT_BUDGET_* 환경 변수로 설정된 planner 를 생성합니다."""
+    return OutputBudgetPlanner(
+        counter=counter,
+        estimates=GPTRequestDTO.expected_token_count,
+        margin=float(os.getenv("OUTPUT_BUDGET_MARGIN", "0.3")),
+        # 0 이면 분할하지 않음 (예측 출력 토큰이 이 값을 넘는 요청만 나눔)
+        ceiling=int(os.getenv("OUTPUT_BUDGET_CEILING", "0")),
+        max_tokens_cap=int(os.getenv("OUTPUT_BUDGET_MAX_TOKENS", "16000")),
+        alpha=float(os.getenv("OUTPUT_BUDGET_EMA_ALPHA", "0.2")),
+        # 유형별 관측이 이만큼 쌓이기 전에는 max_tokens 를 상한으로 둠
+        min_observations=int(os.getenv("OUTPUT_BUDGET_MIN_OBSERVATIONS", "3")),
+    )
@@ -0,0 +1,162 @@
+# service/problem_stream_service.py
+"""
+make_problem 의 스트리밍 버전.
+
+stream=True 로 받은 응답을 IncrementalJSONParser 로 파싱하면서, 문제 객체 하나가 닫히는 즉시
+"question" 이벤트로 내보냅니다. 부족한 문제는 follow-up 요청(최대 3회)으로 보충하며 같은 스트림에 이어 붙입니다.
+
+이벤트 형식:
+    {"event": "question", "data": {"type": "ox", "question": {...}}}
+    {"event": "done",     "data": {"counts": {...}, "request_tokens": n, "response_tokens": n, "cache_hit": bool}}
+    {"event": "error",    "data": {"detail": "...", "request_tokens": n, "response_tokens": n}}
+
+클라이언트 연결이 끊겨 생성을 취소하면 on_abort 에 그때까지의 사용량을 넘깁니다.
+(스트림 도중 취소되면 usage 청크를 받지 못하므로 게이트웨이가 받은 본문으로 추정한 값)
+"""
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from dto.CommonDTO import QuestionTypes
+from dto.GptRequestDTO import GPTRequestDTO
+from service.gpt_service import (
+    QUESTION_TYPE_KEYS, gpt_model, token_counter, problem_cache, output_planner,
+    apply_enabled_flags, problem_cache_key, summarize_content, count_problem_request,
+    build_problem_system_template, build_followup_prompt, extract_question_texts, replace_underscores
+)
+from service.dedup import NearDuplicateIndex
+from service.json_stream import IncrementalJSONParser
+from service.llm_gateway import chat_stream
+from service.usage_meter import usage_scope
+
+REGENERATE_LIMIT = 3
+
+# 취소된 생성 태스크가 사용량 기록을 마칠 때까지 참조를 유지
+_aborting_producers: set = set()
+
+
+def _counts(problems: Dict[str, list]) -> Dict[str, int]:
+    return {q_type: len(problems.get(q_type) or []) for q_type in QUESTION_TYPE_KEYS}
+
+
+async def _stream_problem_set(
+        content: str,
+        difficulty: str,
+        question_types: QuestionTypes,
+        emit: Callable[[str, dict], Awaitable[None]]
+) -> Dict[str, list]:
+    """
+    요약 → 생성 → follow-up 을 스트리밍으로 수행합니다.
+    유형별 요청 개수를 넘는 문제는 내보내지 않고 버립니다.
+    """
+    targets = {q_type: getattr(question_types, q_type).numQuestions for q_type in QUESTION_TYPE_KEYS}
+    collected: Dict[str, list] = {q_type: [] for q_type in QUESTION_TYPE_KEYS}
+    # 이미 내보낸 문제와 유사한 문제는 버리고 부족분으로 follow-up 에서 보충
+    indexes = {q_type: NearDuplicateIndex() for q_type in QUESTION_TYPE_KEYS}
+
+    if token_counter.exceeds(content, 8000):
+        content, _ = await summarize_content(content)
+
+    if count_problem_request(content, difficulty, question_types) > 10000:
+        raise ValueError("Request token length exceeds 10000")
+
+    async def stream_round(messages: List[dict], counts: Dict[str, int]) -> None:
+        parser = IncrementalJSONParser()
+        async for delta in chat_stream(model=gpt_model, messages=messages,
+                                       max_tokens=output_planner.max_tokens(counts)):
+            for q_type, item in parser.feed(delta):
+                if q_type not in collected or len(collected[q_type]) >= targets[q_type]:
+                    continue
+                if not indexes[q_type].add_problem(item):
+                    print(f"[{q_type}] Near-duplicate dropped: {item.get('question')}")
+                    continue
+                if q_type == "fillInTheBlank" and isinstance(item.get("question"), str):
+                    item["question"] = replace_underscores(item["question"])
+                collected[q_type].append(item)
+                await emit(q_type, item)
+
+    await stream_round([
+        {"role": "system", "content": build_problem_system_template(difficulty, question_types)},
+        {"role": "user", "content": GPTRequestDTO.content_template_kr.format(summary=content)}
+    ], targets)
+
+    for _ in range(REGENERATE_LIMIT):
+        missing_counts = {
+            q_type: max(0, targets[q_type] - len(collected[q_type])) for q_type in QUESTION_TYPE_KEYS
+        }
+        print(f"Missing_counts: {missing_counts}")
+        if not any(count > 0 for count in missing_counts.values()):
+            break
+        await stream_round(build_followup_prompt(
+            extract_question_texts(collected), missing_counts, difficulty, question_types, content
+        ), missing_counts)
+
+    return collected
+
+
+async def make_problem_stream(
+        content: str,
+        difficulty: str,
+        question_types: QuestionTypes,
+        on_abort: Optional[Callable[[dict], Awaitable[None]]] = None
+) -> AsyncIterator[dict]:
+    """
+    문제가 완성되는 대로 이벤트를 내보내는 비동기 제너레이터.
+    on_abort: 소비자가 끝까지 읽지 않고 닫았을 때 {"request_tokens", "response_tokens"} 로 호출됩니다.
+    """
+    if apply_enabled_flags(question_types) > 30:
+        yield {"event": "error", "data": {"detail": "Total number of questions exceeds 20",
+                                          "request_tokens": 0, "response_tokens": 0}}
+        return
+
+    cache_key = problem_cache_key(content, difficulty, question_types)
+    cached = await problem_cache.aget(cache_key)
+    problem_cache.report(cached is not None)
+    if cached is not None:
+        for q_type in QUESTION_TYPE_KEYS:
+            for item in cached.get(q_type) or []:
+                yield {"event": "question", "data": {"type": q_type, "question": item}}
+        yield {"event": "done", "data": {"counts": _counts(cached), "request_tokens": 0,
+                                         "response_tokens": 0, "cache_hit": True}}
+        return
+
+    # 생성은 별도 태스크에서 수행하고 큐로 이벤트를 전달 (usage_scope 가 yield 를 가로지르지 않도록)
+    queue: "asyncio.Queue[Optional[dict]]" = asyncio.Queue()
+
+    async def emit(q_type: str, item: dict) -> None:
+        await queue.put({"event": "question", "data": {"type": q_type, "question": item}})
+
+    async def produce() -> None:
+        with usage_scope() as meter:
+            try:
+                problems = await _stream_problem_set(content, difficulty, question_types, emit)
+            except asyncio.CancelledError:
+                # 게이트웨이 스트림의 finally 가 받은 분량만큼 미터에 기록한 뒤 여기로 옴
+                if on_abort is not None:
+                    await on_abort({"request_tokens": meter.request_tokens,
+                                    "response_tokens": meter.response_tokens})
+                raise
+            except Exception as e:
+                await queue.put({"event": "error", "data": {"detail": str(e),
+                                                            "request_tokens": meter.request_tokens,
+                                                            "response_tokens": meter.response_tokens}})
+                return
+        await problem_cache.aset(cache_key, problems)
+        await queue.put({"event": "done", "data": {"counts": _counts(problems),
+                                                   "request_tokens": meter.request_tokens,
+                                                   "response_tokens": meter.response_tokens,
+                                                   "cache_hit": False}})
+
+    producer = asyncio.ensure_future(produce())
+    producer.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        # 클라이언트 연결이 끊기면 업스트림 스트림도 중단 (사용량 기록은 태스크 안에서 마저 수행)
+        if not producer.done():
+            _aborting_producers.add(producer)
+            producer.add_done_callback(_aborting_producers.discard)
+            producer.cancel()
@@ -0,0 +1,221 @@
+# service/rate_limiter.py
+"""
+업스트림(OpenAI) 호출 속도 제한과 동시 실행 제한.
+
+모든 요청이 마음대로 chat.completions.create 를 부르면 RPM/TPM 한도를 넘어 429 가 연달아 발생합니다.
+게이트웨이의 모든 호출은 UpstreamGovernor 에서 허가(permit)를 받은 뒤에 나갑니다.
+
+- 토큰 버킷 두 개: 분당 요청 수(RPM), 분당 토큰 수(TPM). 버킷 크기는 1분치 한도입니다.
+- TPM 은 요청 전에 로컬 토크나이저로 추정(프롬프트 + max_tokens)해서 차감하고,
+  응답의 실제 usage 를 받으면 차이만큼 돌려주거나 더 차감합니다.
+  허가를 받고 호출 전에 취소된 경우에는 차감한 RPM / TPM 을 그대로 돌려줍니다.
+- Whisper 는 한도가 따로라서 별도 governor(whisper_governor)를 씁니다.
+- 대기 순서는 우선순위 레인 → 도착 순서. /grade 같은 대화형 요청(interactive)이
+  문서 전처리나 대량 채점(bulk)보다 먼저 나갑니다. 레인은 priority_lane() 으로 지정합니다.
+- 대기 시간은 upstream_wait_seconds 지표로 남습니다.
+
+한도 값이 0 이면 해당 제한을 쓰지 않습니다.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from service import metrics
+
+load_dotenv()
+
+# 숫자가 작을수록 먼저 나감
+LANES = {"interactive": 0, "default": 1, "bulk": 2}
+
+_current_lane: ContextVar[str] = ContextVar("upstream_lane", default="default")
+
+
+@contextmanager
+def priority_lane(lane: str) -> Iterator[None]:
+    """이 스코프 안에서 나가는 업스트림 호출의 우선순위 레인을 지정합니다."""
+    if lane not in LANES:
+        raise ValueError(f"알 수 없는 레인입니다: {lane}")
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def current_lane() -> str:
+    return _current_lane.get()
+
+
+class TokenBucket:
+    """분당 한도(per_minute)만큼 쌓이고 초당 per_minute / 60 씩 다시 채워지는 버킷."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount 만큼 꺼낼 수 있을 때까지 남은 초. (버킷보다 큰 요청은 가득 찰 때까지)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> float:
+        """꺼낸 양(버킷 크기로 잘림)을 반환합니다."""
+        taken = min(amount, self.capacity)
+        self.level -= taken
+        return taken
+
+    def adjust(self, amount: float) -> None:
+        """양수면 돌려주고, 음수면 추가로 차감합니다. (추정치와 실제 사용량의 차이 보정)
+        잔량은 -capacity ~ capacity 로 제한해 한 번의 큰 보정이 1분 넘게 모두를 막지 않게 합니다."""
+        self.level = max(-self.capacity, min(self.capacity, self.level + amount))
+
+
+class Permit:
+    def __init__(self, tokens: int, lane: str):
+        self.tokens = tokens
+        self.lane = lane
+        # TPM 버킷에서 실제로 꺼낸 양 (release 보정 / 취소 시 환불 기준)
+        self.taken_tokens = 0.0
+        # 응답을 받은 뒤 실제 사용 토큰 수를 넣으면 release 시 TPM 버킷을 보정
+        self.used_tokens: Optional[int] = None
+
+
+class UpstreamGovernor:
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0, max_concurrency: int = 0):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_concurrency = max_concurrency
+        self._active = 0
+        self._waiters: List[Tuple[int, int, Permit, asyncio.Future]] = []  # (레인 우선순위, 순번, 허가, future)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None or self.max_concurrency > 0
+
+    # ─────────────── 허가 / 반납 ───────────────
+    async def acquire(self, tokens: int = 0, lane: Optional[str] = None) -> Permit:
+        lane = lane or current_lane()
+        permit = Permit(tokens, lane)
+        if not self.enabled:
+            return permit
+        started = time.monotonic()
+        if not self._waiters and self._ready(tokens, started) == 0.0:
+            self._take(permit)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (LANES[lane], next(self._seq), permit, future))
+            metrics.set_gauge("upstream_queue_depth", len(self._waiters), bucket=self.name)
+            self._dispatch()
+            try:
+                await future
+            except asyncio.CancelledError:
+                # 허가를 받은 직후에 취소되었으면 호출이 나가지 않았으므로 자리와 미리 차감한 버킷을 모두 돌려줌
+                if future.done() and not future.cancelled():
+                    self._active -= 1
+                    if self.requests is not None:
+                        self.requests.adjust(1)
+                    if self.tokens is not None:
+                        self.tokens.adjust(permit.taken_tokens)
+                    self._dispatch()
+                raise
+        metrics.observe("upstream_wait_seconds", time.monotonic() - started, bucket=self.name, lane=lane)
+        return permit
+
+    def release(self, permit: Permit) -> None:
+        if not self.enabled:
+            return
+        self._active -= 1
+        if self.tokens is not None and permit.used_tokens is not None:
+            # 추정치가 버킷 크기로 잘렸을 수 있으므로 실제로 꺼낸 양을 기준으로 보정
+            self.tokens.adjust(permit.taken_tokens - max(0, permit.used_tokens))
+        self._dispatch()
+
+    @asynccontextmanager
+    async def limit(self, tokens: int = 0) -> AsyncIterator[Permit]:
+        """async with governor.limit(추정 토큰) as permit: ... (permit.used_tokens 에 실제 사용량 기록)"""
+        permit = await self.acquire(tokens)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    # ─────────────── 내부 ───────────────
+    def _ready(self, tokens: int, now: float) -> Optional[float]:
+        """바로 나갈 수 있으면 0, 버킷을 기다려야 하면 남은 초, 동시 실행 한도에 걸렸으면 None."""
+        if self.max_concurrency > 0 and self._active >= self.max_concurrency:
+            return None
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def _take(self, permit: Permit) -> None:
+        self._active += 1
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None:
+            permit.taken_tokens = self.tokens.consume(permit.tokens)
+
+    def _dispatch(self) -> None:
+        """우선순위가 가장 높은 대기자부터 허가합니다. 맨 앞이 못 나가면 뒤도 기다립니다."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            _, _, permit, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._ready(permit.tokens, time.monotonic())
+            if wait is None:
+                break  # 실행 중인 호출이 release 할 때 다시 확인
+            if wait > 0:
+                self._timer = future.get_loop().call_later(wait, self._dispatch)
+                break
+            heapq.heappop(self._waiters)
+            self._take(permit)
+            future.set_result(None)
+        metrics.set_gauge("upstream_queue_depth", len(self._waiters), bucket=self.name)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "requests_available": round(self.requests.level, 2) if self.requests else None,
+            "tokens_available": round(self.tokens.level, 2) if self.tokens else None,
+        }
+
+
+chat_governor = UpstreamGovernor(
+    "chat",
+    rpm=int(os.getenv("RATE_LIMIT_RPM", "0")),
+    tpm=int(os.getenv("RATE_LIMIT_TPM", "0")),
+    max_concurrency=int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "0")),
+)
+whisper_governor = UpstreamGovernor(
+    "whisper",
+    rpm=int(os.getenv("WHISPER_RATE_LIMIT_RPM", "0")),
+    max_concurrency=int(os.getenv("WHISPER_MAX_CONCURRENCY", "0")),
+)
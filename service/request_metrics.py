@@ -0,0 +1,62 @@
+# service/request_metrics.py
+"""
+라우트별 요청 지표 ASGI 미들웨어.
+
+- http_request_duration_seconds{method, route, status}: 응답 본문을 다 보낼 때까지의 시간 (스트리밍 포함)
+- http_requests_in_progress{route}: 처리 중인 요청 수
+- route 는 실제 경로가 아니라 라우트 템플릿(/grade/jobs/{job_id})이라 레이블 수가 늘어나지 않습니다.
+  어느 라우트에도 맞지 않는 요청은 "unmatched" 로 묶습니다.
+
+처리 중인 라우트는 contextvar 에 남겨 두므로 게이트웨이의 업스트림 지표도 route 레이블을 붙일 수 있습니다.
+(요청 밖에서 실행되는 백그라운드 작업은 "background")
+"""
+import time
+from contextvars import ContextVar
+
+from starlette.routing import Match
+
+from service import metrics
+
+_current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+
+def current_route() -> str:
+    return _current_route.get()
+
+
+def _route_template(scope) -> str:
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_template(scope)
+        status = {"code": 500}  # 응답을 시작하지 못하고 예외로 끝나면 500
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = _current_route.set(route)
+        in_progress = metrics.track_in_progress("http_requests_in_progress", route=route)
+        started = time.perf_counter()
+        try:
+            with in_progress:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - started,
+                            method=scope["method"], route=route, status=status["code"])
+            _current_route.reset(token)
@@ -0,0 +1,176 @@
+# service/resilience.py
+"""
+업스트림 호출 재시도 / 타임아웃 / 헤징.
+
+- 재시도: 429, 5xx, 연결 오류, 타임아웃이면 지수 백오프 + 지터(full jitter)로 다시 호출합니다.
+  429 응답에 Retry-After 가 있으면 그 시간 이상 기다립니다. 그 밖의 오류(400 등)는 바로 올려보냅니다.
+- 타임아웃: with_timeout 으로 호출 하나하나에 제한 시간을 둡니다. (대기열 대기 시간은 포함하지 않음)
+- 헤징(선택): 같은 종류 호출의 최근 p95 지연 시간이 지나도 응답이 없으면 같은 요청을 한 번 더 보내고
+  먼저 온 응답을 씁니다. 늦은 쪽은 취소하고 upstream_hedges_cancelled_total 로 셉니다. 헤징 횟수는 전체 호출 수의 UPSTREAM_HEDGE_BUDGET 비율 이하로 제한합니다.
+
+공식 SDK 의 자체 재시도는 끄고(max_retries=0) 여기서만 재시도합니다.
+"""
+import asyncio
+import math
+import os
+import random
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import openai
+from dotenv import load_dotenv
+
+from service import metrics
+
+load_dotenv()
+
+T = TypeVar("T")
+
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+# Retry-After 가 너무 길면 이 값까지만 기다림
+UPSTREAM_RETRY_AFTER_MAX = float(os.getenv("UPSTREAM_RETRY_AFTER_MAX", "60"))
+
+UPSTREAM_HEDGE_ENABLED = os.getenv("UPSTREAM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+UPSTREAM_HEDGE_QUANTILE = float(os.getenv("UPSTREAM_HEDGE_QUANTILE", "0.95"))
+# 전체 호출 대비 헤징(추가 요청) 비율 상한
+UPSTREAM_HEDGE_BUDGET = float(os.getenv("UPSTREAM_HEDGE_BUDGET", "0.05"))
+# 지연 시간 표본이 이 개수 이상 모여야 헤징 시작
+UPSTREAM_HEDGE_MIN_SAMPLES = int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20"))
+LATENCY_SAMPLES = 200
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,  # APITimeoutError 포함
+    asyncio.TimeoutError,
+)
+
+
+class UpstreamTimeoutError(asyncio.TimeoutError):
+    def __init__(self, op: str, timeout: float):
+        super().__init__(f"업스트림 응답 시간 초과 ({op}, {timeout:g}s)")
+
+
+async def with_timeout(op: str, awaitable: Awaitable[T], timeout: Optional[float]) -> T:
+    """timeout 초 안에 끝나지 않으면 UpstreamTimeoutError. (timeout 이 없거나 0 이하이면 제한 없음)"""
+    if not timeout or timeout <= 0:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        metrics.inc("upstream_timeouts_total", op=op)
+        raise UpstreamTimeoutError(op, timeout)
+
+
+# ─────────────── 지연 시간 / 헤징 예산 ───────────────
+_latency_lock = threading.Lock()
+_latencies: Dict[str, Deque[float]] = {}
+_calls = 0
+_hedges = 0
+
+
+def record_latency(key: str, seconds: float) -> None:
+    """성공한 호출의 지연 시간을 기록합니다. (key: 호출 종류, 헤징 기준 시간 계산용)"""
+    with _latency_lock:
+        _latencies.setdefault(key, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+
+
+def hedge_delay(key: str) -> Optional[float]:
+    """key 의 최근 지연 시간 분위수. 표본이 부족하면 None (헤징하지 않음)."""
+    with _latency_lock:
+        samples = sorted(_latencies.get(key, ()))
+    if len(samples) < UPSTREAM_HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, math.ceil(UPSTREAM_HEDGE_QUANTILE * len(samples)) - 1)]
+
+
+def _count_call() -> None:
+    global _calls
+    with _latency_lock:
+        _calls += 1
+
+
+def _take_hedge_budget() -> bool:
+    global _hedges
+    with _latency_lock:
+        if _hedges + 1 > UPSTREAM_HEDGE_BUDGET * _calls:
+            return False
+        _hedges += 1
+        return True
+
+
+async def _hedged(op: str, key: str, attempt: Callable[[], Awaitable[T]]) -> T:
+    primary = asyncio.ensure_future(attempt())
+    delay = hedge_delay(key)
+    if delay is None:
+        return await primary
+    pending = {primary}
+    hedged = False
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+        if not _take_hedge_budget():
+            metrics.inc("upstream_hedges_skipped_total", op=op)
+            return await primary
+        metrics.inc("upstream_hedges_total", op=op)
+        pending.add(asyncio.ensure_future(attempt()))
+        hedged = True
+        first_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        metrics.inc("upstream_hedges_won_total", op=op)
+                    return task.result()
+                first_error = first_error or task.exception()
+        raise first_error
+    finally:
+        # 늦은 요청(또는 호출자가 취소된 경우 전부) 취소
+        for task in pending:
+            task.cancel()
+            if hedged:
+                metrics.inc("upstream_hedges_cancelled_total", op=op)
+        # 취소된 요청이 사용량 추정치를 호출자의 UsageMeter 에 남길 때까지 기다림
+        if pending:
+            await asyncio.wait(pending)
+
+
+# ─────────────── 재시도 ───────────────
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(value), UPSTREAM_RETRY_AFTER_MAX) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """attempt(0부터) 번째 재시도 전 대기 시간: 0 ~ min(최대, base * 2^attempt) 사이 무작위."""
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * (2 ** attempt)))
+
+
+async def resilient_call(op: str, attempt: Callable[[], Awaitable[T]], hedge_key: Optional[str] = None) -> T:
+    """
+    attempt() 를 재시도 정책에 따라 실행합니다. attempt 는 호출마다 새 요청을 보내는 함수여야 합니다.
+    hedge_key 를 주면(헤징이 켜진 경우) 같은 key 의 최근 p95 지연 시간을 넘길 때 요청을 하나 더 보냅니다.
+    """
+    _count_call()
+    for n in range(max(1, UPSTREAM_MAX_ATTEMPTS)):
+        try:
+            if hedge_key and UPSTREAM_HEDGE_ENABLED:
+                return await _hedged(op, hedge_key, attempt)
+            return await attempt()
+        except RETRYABLE_ERRORS as e:
+            if n + 1 >= UPSTREAM_MAX_ATTEMPTS:
+                metrics.inc("upstream_failures_total", op=op)
+                raise
+            delay = max(backoff_delay(n), _retry_after(e) or 0.0)
+            metrics.inc("upstream_retries_total", op=op)
+            print(f"[resilience] {op} attempt {n + 1} failed ({type(e).__name__}: {e}), retry in {delay:.2f}s")
+            await asyncio.sleep(delay)
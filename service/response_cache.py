@@ -0,0 +1,285 @@
+# service/response_cache.py
+"""
+입력 내용의 해시를 키로 GPT 응답을 재사용하는 캐시.
+
+- 1차: 프로세스 메모리 LRU (항목 수 / 바이트 수 제한 + TTL)
+- 2차: RESPONSE_CACHE_DIR 가 설정된 경우 디스크 JSON 파일 (바이트 수 제한 + TTL)
+값은 JSON 으로 직렬화해 저장하므로, 꺼낼 때마다 새 객체가 만들어져 호출자가 수정해도 캐시는 안전합니다.
+
+async 코드에서는 aget / aset 을 씁니다. 디스크 읽기/쓰기를 asyncio.to_thread 로 넘겨 이벤트 루프를 막지 않습니다.
+(메모리 적중은 스레드 전환 없이 바로 반환)
+디스크 용량은 파일 목록(키 -> 크기, 사용 순서)을 메모리에 두고 쓰기마다 증분으로 계산합니다.
+다른 프로세스가 같은 디렉터리에 쓴 파일과 읽히지 않은 만료 파일은 RESPONSE_CACHE_DISK_RESCAN_SECONDS 마다
+디렉터리를 다시 훑어 반영합니다.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("response_cache")
+logger.setLevel(logging.INFO)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s"))
+    logger.addHandler(handler)
+
+
+def normalize_text(text: str) -> str:
+    """유니코드 NFC 정규화, 줄바꿈 통일, 줄 끝 공백 제거로 사소한 차이를 없앱니다."""
+    text = unicodedata.normalize("NFC", text or "")
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """키 구성 요소들을 JSON 으로 직렬화한 뒤 sha256 해시를 반환합니다."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+            self,
+            name: str,
+            max_entries: int = 512,
+            max_bytes: int = 64 * 1024 * 1024,
+            ttl_seconds: float = 24 * 3600,
+            disk_dir: Optional[str] = None,
+            disk_max_bytes: int = 512 * 1024 * 1024,
+            disk_rescan_seconds: float = 600
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = os.path.join(disk_dir, name) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_rescan_seconds = disk_rescan_seconds
+
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()  # key -> (만료 시각, JSON)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # 디스크 파일 목록: key -> 파일 크기 (앞쪽일수록 오래 사용되지 않음)
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_scanned_at = 0.0
+        self._disk_lock = threading.Lock()
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_rescan()
+
+    # ─────────────── 조회 / 저장 ───────────────
+    def get(self, key: str) -> Optional[Any]:
+        """캐시된 값을 반환합니다. 없거나 만료되었으면 None. (디스크 I/O 를 호출 스레드에서 수행)"""
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is None:
+            payload = self._disk_get(key, now)
+            self._record_disk_result(key, now, payload)
+        return json.loads(payload) if payload is not None else None
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get 의 async 버전. 메모리에 없을 때만 디스크 조회를 워커 스레드에서 실행합니다."""
+        now = time.time()
+        payload = self._memory_get(key, now)
+        if payload is None:
+            if self.disk_dir:
+                payload = await asyncio.to_thread(self._disk_get, key, now)
+            self._record_disk_result(key, now, payload)
+        return json.loads(payload) if payload is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at, payload = self._memory_set(key, value)
+        self._disk_set(key, expires_at, payload)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """set 의 async 버전. 디스크 쓰기(와 정리)는 워커 스레드에서 실행합니다."""
+        expires_at, payload = self._memory_set(key, value)
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_set, key, expires_at, payload)
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload
+                self._remove(key)
+        return None
+
+    def _record_disk_result(self, key: str, now: float, payload: Optional[str]) -> None:
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return
+            self.hits += 1
+            # 디스크 적중 항목은 메모리로 승격
+            self._put(key, now + self.ttl_seconds, payload)
+
+    def _memory_set(self, key: str, value: Any) -> tuple:
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._put(key, expires_at, payload)
+        return expires_at, payload
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def report(self, hit: bool) -> None:
+        """단일 조회 결과와 누적 적중률을 로그로 남깁니다."""
+        stats = self.stats()
+        logger.info(
+            f"[{self.name}] cache {'hit' if hit else 'miss'} "
+            f"(hits={stats['hits']}, misses={stats['misses']}, ratio={stats['hit_ratio']})"
+        )
+
+    # ─────────────── 메모리 LRU ───────────────
+    def _put(self, key: str, expires_at: float, payload: str) -> None:
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (expires_at, payload)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1].encode("utf-8"))
+
+    # ─────────────── 디스크 계층 ───────────────
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("expires_at", 0) <= now:
+            self._disk_forget(key)
+            self._disk_delete(path)
+            return None
+        os.utime(path, None)  # 재시작 후 다시 훑을 때의 LRU 순서를 위해 접근 시각 갱신
+        with self._disk_lock:
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+        return record["payload"]
+
+    def _disk_set(self, key: str, expires_at: float, payload: str) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = json.dumps({"expires_at": expires_at, "payload": payload}, ensure_ascii=False).encode("utf-8")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[{self.name}] disk cache write failed: {e}")
+            self._disk_delete(tmp_path)
+            return
+
+        if time.time() - self._disk_scanned_at >= self.disk_rescan_seconds:
+            self._disk_rescan()
+            return
+        with self._disk_lock:
+            self._disk_bytes += len(data) - self._disk_index.pop(key, 0)
+            self._disk_index[key] = len(data)
+            evicted = self._disk_evict_locked()
+        for old_key in evicted:
+            self._disk_delete(self._disk_path(old_key))
+
+    def _disk_evict_locked(self) -> list:
+        """총 용량이 한도를 넘으면 오래 사용되지 않은 키부터 목록에서 빼고 반환합니다. (_disk_lock 안에서 호출)"""
+        evicted = []
+        while self._disk_bytes > self.disk_max_bytes and self._disk_index:
+            old_key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(old_key)
+        return evicted
+
+    def _disk_forget(self, key: str) -> None:
+        with self._disk_lock:
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+
+    def _disk_rescan(self) -> None:
+        """디렉터리를 훑어 파일 목록을 다시 만들고, 만료된 파일과 한도를 넘는 오래된 파일을 삭제합니다."""
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if stat.st_mtime + self.ttl_seconds < now:
+                self._disk_delete(entry.path)
+                continue
+            files.append((stat.st_mtime, entry.name[:-len(".json")], stat.st_size))
+
+        files.sort()
+        with self._disk_lock:
+            self._disk_index = OrderedDict((key, size) for _, key, size in files)
+            self._disk_bytes = sum(size for _, _, size in files)
+            self._disk_scanned_at = now
+            evicted = self._disk_evict_locked()
+        for old_key in evicted:
+            self._disk_delete(self._disk_path(old_key))
+
+    @staticmethod
+    def _disk_delete(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cache_from_env(name: str, env_prefix: str = "RESPONSE_CACHE") -> ResponseCache:
+    """{env_prefix}_* 환경 변수(기본 RESPONSE_CACHE_*)로 설정된 캐시를 생성합니다."""
+    return ResponseCache(
+        name=name,
+        max_entries=int(os.getenv(f"{env_prefix}_MAX_ENTRIES", "512")),
+        max_bytes=int(os.getenv(f"{env_prefix}_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv(f"{env_prefix}_TTL_SECONDS", str(24 * 3600))),
+        disk_dir=os.getenv(f"{env_prefix}_DIR") or None,
+        disk_max_bytes=int(os.getenv(f"{env_prefix}_DISK_MAX_BYTES", str(512 * 1024 * 1024))),
+        disk_rescan_seconds=float(os.getenv(f"{env_prefix}_DISK_RESCAN_SECONDS", "600")),
+    )
@@ -0,0 +1,72 @@
+# service/single_flight.py
+"""
+같은 입력으로 동시에 들어온 요청 합치기 (single-flight).
+
+공유 링크로 여러 학생이 같은 내용을 몇 초 안에 요청하면, 캐시가 채워지기 전이라 요청마다 업스트림 호출이 나갑니다.
+같은 키(입력 내용 해시)의 계산이 이미 진행 중이면 새로 호출하지 않고 그 결과를 함께 기다립니다.
+
+- 계산은 별도 태스크로 실행되므로 먼저 온 요청(leader)의 연결이 끊겨도 기다리던 요청은 결과를 받습니다.
+- 결과 dict 의 토큰 수는 leader 에게만 남기고, 합류한 요청(follower)은 0 으로 돌려줍니다.
+  (log_and_save_tokens 에 같은 사용량이 여러 번 과금되지 않도록)
+- 진행 중인 계산만 공유합니다. 끝난 결과의 재사용은 ResponseCache 가 담당합니다.
+"""
+import asyncio
+import copy
+import os
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        key 의 계산이 진행 중이면 그 결과를, 아니면 fn() 을 실행한 결과를 반환합니다.
+        반환: (결과, 다른 요청의 결과를 공유했는지)
+        """
+        if not SINGLE_FLIGHT_ENABLED:
+            return await fn(), False
+        loop = asyncio.get_running_loop()
+        future = self._inflight.get(key)
+        # 다른 이벤트 루프(asyncio.run 으로 실행한 스크립트 등)의 계산은 기다릴 수 없음
+        if future is not None and future.get_loop() is loop:
+            self.followers += 1
+            print(f"[single_flight:{self.name}] joined in-flight request "
+                  f"(leaders={self.leaders}, followers={self.followers})")
+            result = await asyncio.shield(future)
+            # 호출자가 결과를 수정해도 다른 요청에 영향이 없도록 복사본을 돌려줌
+            return copy.deepcopy(result), True
+
+        self.leaders += 1
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return await asyncio.shield(future), False
+
+    def _forget(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # 기다리는 요청이 없을 때 생긴 예외가 "never retrieved" 경고로 남지 않도록 확인 처리
+        if not future.cancelled():
+            future.exception()
+
+
+async def run_coalesced(flight: SingleFlight, key: str, fn: Callable[[], Awaitable[dict]]) -> dict:
+    """
+    {"result", "request_tokens", "response_tokens", ...} 를 반환하는 계산을 합쳐서 실행합니다.
+    합류한 요청은 토큰 수 0, coalesced=True 로 표시된 결과를 받습니다.
+    """
+    result, shared = await flight.run(key, fn)
+    if shared and isinstance(result, dict):
+        result = {**result, "request_tokens": 0, "response_tokens": 0, "coalesced": True}
+    return result
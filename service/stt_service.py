@@ -3,17 +3,23 @@ import os
 import io
 import re
 import math
+import asyncio
+import hashlib
 import logging
 import subprocess
 import tempfile
 from typing import List, Tuple
 
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from service import metrics
+from service.llm_gateway import transcribe, run_sync
+from service.rate_limiter import priority_lane
+from service.response_cache import make_cache_key
+from service.single_flight import SingleFlight
 
 # ─────────────────── 기본 세팅 ────────────────────
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 logger = logging.getLogger("gpt_service")
 logger.setLevel(logging.INFO)
@@ -26,6 +32,10 @@ SILENCE_THRESH  = -40                       # dBFS
 SILENCE_LEN_S   = 0.5                       # 최소 무음 지속 시간(초)
 SEGMENT_TIME_S  = 180                       # fallback: 3 분 단위 고정 분할
 
+# 같은 파일이 동시에 올라오면 진행 중인 전사 하나를 공유
+# (Whisper 사용량은 먼저 시작한 요청의 UsageMeter 에만 기록됨)
+transcribe_flight = SingleFlight("transcribe")
+
 # ───────────────── silence 구간 탐지 ─────────────────
 _silence_start_re = re.compile(r"silence_start: (?P<ts>\d+\.?\d*)")
 _silence_end_re   = re.compile(r"silence_end: (?P<ts>\d+\.?\d*)")
@@ -39,7 +49,8 @@ def _detect_nonsilent_ranges(src: str, duration: float) -> List[Tuple[float, flo
         "-af", f"silencedetect=n={SILENCE_THRESH}dB:d={SILENCE_LEN_S}",
         "-f", "null", "-"
     ]
-    res = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+    with metrics.timer("ffmpeg_seconds", stage="silencedetect"):
+        res = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
     starts, ends = [], []
     for ln in res.stderr.splitlines():
         m1 = _silence_start_re.search(ln)
@@ -67,11 +78,12 @@ def _split_and_pack_ffmpeg(audio_bytes: bytes) -> List[io.BytesIO]:
         src_path = tmp.name
 
     # 전체 길이
-    dur = float(subprocess.check_output([
-        "ffprobe", "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1", src_path
-    ]).decode().strip())
+    with metrics.timer("ffmpeg_seconds", stage="ffprobe_duration"):
+        dur = float(subprocess.check_output([
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1", src_path
+        ]).decode().strip())
     logger.info(f"Audio length: {dur:.1f}s")
 
     # 무음 제거 구간 목록
@@ -85,11 +97,12 @@ def _split_and_pack_ffmpeg(audio_bytes: bytes) -> List[io.BytesIO]:
 
     for idx, (st, ed) in enumerate(segs, 1):
         # copy 모드 추출
-        seg_bytes = subprocess.check_output([
-            "ffmpeg", "-hide_banner", "-loglevel", "error",
-            "-ss", str(st), "-to", str(ed),
-            "-i", src_path, "-c", "copy", "-f", "mp3", "pipe:1"
-        ])
+        with metrics.timer("ffmpeg_seconds", stage="segment_extract"):
+            seg_bytes = subprocess.check_output([
+                "ffmpeg", "-hide_banner", "-loglevel", "error",
+                "-ss", str(st), "-to", str(ed),
+                "-i", src_path, "-c", "copy", "-f", "mp3", "pipe:1"
+            ])
 
         # 세그먼트 자체가 한도를 넘는 경우 시간 기준으로 다시 나눔
         if len(seg_bytes) > MAX_CHUNK_BYTES:
@@ -118,35 +131,61 @@ def _split_and_pack_ffmpeg(audio_bytes: bytes) -> List[io.BytesIO]:
 
     os.remove(src_path)
     logger.info(f"Total chunks produced: {len(chunks)}")
+    metrics.observe("audio_segments", len(segs), buckets=metrics.COUNT_BUCKETS)
+    metrics.observe("audio_chunks", len(chunks), buckets=metrics.COUNT_BUCKETS)
+    for chunk in chunks:
+        metrics.observe("audio_chunk_bytes", chunk.getbuffer().nbytes, buckets=metrics.SIZE_BUCKETS)
     return chunks
 
 
 # ───────────────── Whisper 호출 ──────────────────
-def transcribe_audio_filelike(
+async def transcribe_audio_filelike_async(
         audio_bytes: bytes,
         model: str = "whisper-1",
         response_format: str = "text",
         language: str = "ko"
 ) -> str:
     """무음 제거 → 25 MiB 청크 → Whisper 순차 호출 → 텍스트 병합"""
+    # 업로드(최대 수백 MB) 해시는 이벤트 루프를 막지 않도록 스레드에서 계산
+    audio_hash = await asyncio.to_thread(lambda: hashlib.sha256(audio_bytes).hexdigest())
+    key = make_cache_key("transcribe", model, response_format, language, audio_hash)
+    text, _ = await transcribe_flight.run(
+        key, lambda: _transcribe_chunks(audio_bytes, model, response_format, language)
+    )
+    return text
+
+
+async def _transcribe_chunks(audio_bytes: bytes, model: str, response_format: str, language: str) -> str:
     logger.info("★ Transcription start")
-    chunks = _split_and_pack_ffmpeg(audio_bytes)
+    # ffmpeg 분할은 블로킹 작업이므로 스레드에서 실행
+    with metrics.timer("audio_stage_seconds", stage="split"):
+        chunks = await asyncio.to_thread(_split_and_pack_ffmpeg, audio_bytes)
 
     texts: List[str] = []
-    for i, chunk in enumerate(chunks, 1):
-        chunk.name = f"chunk_{i}.mp3"      # 확장자 전달 필수
-        size = chunk.getbuffer().nbytes
-        logger.info(f"→ Sending chunk {i}/{len(chunks)} ({size} bytes)")
-
-        resp = client.audio.transcriptions.create(
-            model=model,
-            file=chunk,
-            response_format=response_format,
-            language=language
-        )
-        text = resp if isinstance(resp, str) else getattr(resp, "text", resp["text"])
-        logger.info(f"← Chunk {i} done ({len(text)} chars)")
-        texts.append(text)
+    with metrics.timer("audio_stage_seconds", stage="whisper"):
+        for i, chunk in enumerate(chunks, 1):
+            chunk.name = f"chunk_{i}.mp3"      # 확장자 전달 필수
+            size = chunk.getbuffer().nbytes
+            logger.info(f"→ Sending chunk {i}/{len(chunks)} ({size} bytes)")
+
+            with priority_lane("bulk"):
+                text = await transcribe(
+                    chunk,
+                    model=model,
+                    response_format=response_format,
+                    language=language
+                )
+            logger.info(f"← Chunk {i} done ({len(text)} chars)")
+            texts.append(text)
 
     logger.info("★ Transcription finished")
     return "\n".join(texts)
+
+
+def transcribe_audio_filelike(
+        audio_bytes: bytes,
+        model: str = "whisper-1",
+        response_format: str = "text",
+        language: str = "ko"
+) -> str:
+    return run_sync(transcribe_audio_filelike_async, audio_bytes, model, response_format, language)
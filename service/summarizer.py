@@ -0,0 +1,140 @@
+# service/summarizer.py
+"""
+긴 정리본을 위한 map-reduce 계층 요약.
+
+1) 정리본을 문단/제목 경계에서 토큰 수 기준 청크로 나눕니다.
+2) 각 청크를 동시에 요약합니다. (map)
+3) 요약들을 이어 붙인 결과가 예산(budget)보다 크면 같은 방식으로 다시 청크 → 요약을 반복합니다. (reduce)
+한 단계마다 전체 분량이 청크 수 배만큼 줄어들기 때문에, 소요 시간은 문서 길이가 아니라
+log(문서 길이) 단계 수에 비례합니다.
+
+요약 호출 자체(프롬프트, 캐시)는 호출하는 쪽에서 summarize(text, target_tokens) 로 넘겨 줍니다.
+"""
+import asyncio
+import re
+from typing import Awaitable, Callable, List
+
+from service.token_counter import TokenCounter
+
+# 문단 앞에 오면 새 단락으로 취급할 제목 패턴 (마크다운 #, 1. / 1.2) 번호, 로마 숫자, 제n장/절)
+_HEADING_RE = re.compile(r"^\s*(#{1,6}\s|\d+(\.\d+)*[.)]\s|[IVX]+\.\s|제\s*\d+\s*[장절편])")
+
+# 한 단계에서 요약이 더 이상 줄어들지 않을 때를 대비한 최대 단계 수
+MAX_LEVELS = 6
+
+Summarize = Callable[[str, int], Awaitable[str]]
+
+
+def split_blocks(text: str) -> List[str]:
+    """빈 줄과 제목 줄을 경계로 단락 목록을 만듭니다."""
+    blocks: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        if current and _HEADING_RE.match(line):
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _split_oversized(block: str, counter: TokenCounter, max_tokens: int) -> List[str]:
+    """한 단락이 청크보다 크면 줄 단위로, 그래도 크면 글자 수 기준으로 자릅니다."""
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in block.splitlines():
+        line_tokens = counter.count(line)
+        if line_tokens > max_tokens:
+            # UTF-8 한 글자는 최대 4바이트이고 토큰은 최소 1바이트이므로 max_tokens // 4 글자는 항상 한도 이하
+            step = max(1, max_tokens // 4)
+            sub_lines = [line[i:i + step] for i in range(0, len(line), step)]
+        else:
+            sub_lines = [line]
+        for sub in sub_lines:
+            sub_tokens = line_tokens if len(sub_lines) == 1 else counter.count(sub)
+            if current and current_tokens + sub_tokens > max_tokens:
+                pieces.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(sub)
+            current_tokens += sub_tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def split_into_chunks(text: str, counter: TokenCounter, max_tokens: int) -> List[str]:
+    """
+    단락을 순서대로 max_tokens 이하 청크에 채웁니다.
+    청크가 절반 이상 찼을 때 제목 단락이 나오면 새 청크를 시작해 주제가 가능한 한 섞이지 않게 합니다.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+
+    for block in split_blocks(text):
+        block_tokens = counter.count(block)
+        if block_tokens > max_tokens:
+            flush()
+            chunks.extend(_split_oversized(block, counter, max_tokens))
+            continue
+        starts_section = bool(_HEADING_RE.match(block))
+        if current and (current_tokens + block_tokens > max_tokens
+                        or (starts_section and current_tokens >= max_tokens // 2)):
+            flush()
+        current.append(block)
+        current_tokens += block_tokens
+    flush()
+    return chunks
+
+
+async def map_reduce_summarize(
+        content: str,
+        summarize: Summarize,
+        counter: TokenCounter,
+        budget: int,
+        chunk_tokens: int,
+        min_target_tokens: int,
+        concurrency: int
+) -> str:
+    """
+    content 를 budget 토큰 이하가 될 때까지 계층적으로 요약합니다.
+    청크가 하나뿐이면 기존처럼 한 번만 요약합니다.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(chunk: str, target: int) -> str:
+        async with semaphore:
+            return await summarize(chunk, target)
+
+    text = content
+    text_tokens = counter.count(text)
+    level = 0
+    while text_tokens > budget and level < MAX_LEVELS:
+        chunks = split_into_chunks(text, counter, chunk_tokens)
+        # 요약들을 합쳤을 때 예산에 들어오도록 청크별 목표 분량을 나눔 (너무 작으면 다음 단계에서 한 번 더 줄임)
+        target = max(min_target_tokens, budget // len(chunks))
+        print(f"[summary] level {level}: {text_tokens} tokens → {len(chunks)} chunks (target {target})")
+
+        summaries = await asyncio.gather(*[run(chunk, target) for chunk in chunks])
+        reduced = "\n\n".join(summary.strip() for summary in summaries if summary and summary.strip())
+        reduced_tokens = counter.count(reduced)
+
+        level += 1
+        if reduced_tokens >= text_tokens:
+            # 모델이 분량을 줄이지 못하면 더 반복해도 의미가 없음
+            break
+        text, text_tokens = reduced, reduced_tokens
+    return text
@@ -0,0 +1,110 @@
+# service/token_counter.py
+"""
+토큰 수 계산 전용 컴포넌트.
+
+- 정적 템플릿(GPTRequestDTO 등)의 토큰 수는 한 번만 계산해 캐시합니다.
+- format 으로 채워지는 템플릿은 "고정 부분(캐시) + 대입 값" 으로 나눠 값 부분만 계산합니다.
+- 긴 텍스트는 줄 단위 청크로 나눠 계산하므로 수 MB 텍스트도 토큰 리스트 전체를 메모리에 올리지 않습니다.
+- exceeds() 는 한도를 넘는 순간 계산을 멈춥니다.
+청크 경계/대입 경계에서 BPE 병합이 끊길 수 있어 결과는 실제 값보다 몇 토큰 많을 수 있습니다 (상한 근사).
+"""
+import functools
+import string
+from typing import Dict, Iterator, Optional
+
+import tiktoken
+
+# 한 번에 encode 할 최대 문자 수
+CHUNK_CHARS = 4096
+# tiktoken 이 모르는 모델(whisper-1 등)에 사용할 기본 인코딩
+DEFAULT_ENCODING = "o200k_base"
+
+_formatter = string.Formatter()
+
+
+class TokenCounter:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        # 인스턴스마다 별도 캐시를 두기 위해 메서드를 감싼다
+        self._template_cache = functools.lru_cache(maxsize=256)(self._count_template)
+
+    # ─────────────── 기본 계산 ───────────────
+    def count(self, text: str) -> int:
+        """텍스트 전체의 토큰 수를 청크 단위로 계산합니다."""
+        if not text:
+            return 0
+        if len(text) <= CHUNK_CHARS:
+            return len(self.encoding.encode(text))
+        return sum(len(self.encoding.encode(chunk)) for chunk in _iter_chunks(text))
+
+    def exceeds(self, text: str, limit: int) -> bool:
+        """토큰 수가 limit 을 넘는지 확인합니다. 넘는 것이 확정되면 나머지는 계산하지 않습니다."""
+        if not text:
+            return limit < 0
+        # 토큰 하나는 최소 1바이트이므로 바이트 수가 한도 이하이면 계산할 필요가 없음
+        if len(text.encode("utf-8")) <= limit:
+            return False
+        total = 0
+        for chunk in _iter_chunks(text):
+            total += len(self.encoding.encode(chunk))
+            if total > limit:
+                return True
+        return False
+
+    # ─────────────── 템플릿 ───────────────
+    def count_template(self, template: str) -> int:
+        """정적 템플릿 문자열의 토큰 수 (캐시됨)."""
+        return self._template_cache(template)
+
+    def count_formatted(self, template: str, counts: Optional[Dict[str, int]] = None, **values) -> int:
+        """
+        template.format(**values) 의 토큰 수를 근사 계산합니다.
+        고정 문자열 부분은 템플릿별로 캐시하고, 대입되는 값만 새로 계산합니다.
+        counts 에 필드별 토큰 수를 넘기면 해당 값은 다시 계산하지 않습니다.
+        """
+        counts = counts or {}
+        total = self._template_cache(_literal_text(template))
+        for field_name in _field_names(template):
+            if field_name in counts:
+                total += counts[field_name]
+            else:
+                total += self.count(str(values.get(field_name, "")))
+        return total
+
+    def _count_template(self, template: str) -> int:
+        return self.count(template)
+
+
+@functools.lru_cache(maxsize=256)
+def _literal_text(template: str) -> str:
+    """format 필드를 제외한 고정 문자열 부분 ('{{' 등 이스케이프 처리 포함)."""
+    return "".join(literal for literal, _, _, _ in _formatter.parse(template))
+
+
+@functools.lru_cache(maxsize=256)
+def _field_names(template: str) -> tuple:
+    return tuple(field for _, field, _, _ in _formatter.parse(template) if field)
+
+
+def _iter_chunks(text: str) -> Iterator[str]:
+    """가능하면 줄바꿈 경계에서 CHUNK_CHARS 이하 크기로 자릅니다."""
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + CHUNK_CHARS, length)
+        if end < length:
+            newline = text.rfind("\n", start, end)
+            if newline > start:
+                end = newline + 1
+        yield text[start:end]
+        start = end
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_counter(model: str) -> TokenCounter:
+    """모델별 TokenCounter 싱글톤을 반환합니다."""
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+    return TokenCounter(encoding)
@@ -0,0 +1,127 @@
+# service/usage_meter.py
+"""
+요청 단위 토큰 사용량 집계.
+
+게이트웨이가 업스트림 응답의 usage(prompt_tokens / completion_tokens)를 현재 요청의 UsageMeter 에
+누적합니다. usage 를 보고하지 않는 백엔드(예: text 형식 Whisper 응답)에 대해서만 로컬 토큰 계산으로
+대체하며, 그런 호출 수는 estimated_calls 로 따로 셉니다.
+응답 전에 취소된 호출(헤징에서 진 요청 등)도 업스트림에서는 과금되므로 프롬프트 토큰을 추정치로 기록합니다.
+
+    with usage_scope() as meter:
+        ... await chat_text(...) ...
+    meter.request_tokens, meter.response_tokens
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from service.token_counter import get_token_counter
+
+# chat 포맷에서 메시지마다 붙는 오버헤드 토큰 수와 응답 프라이밍 토큰 수 (OpenAI cookbook 기준)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class UsageMeter:
+    def __init__(self):
+        self.request_tokens = 0
+        self.response_tokens = 0
+        self.calls = 0
+        self.estimated_calls = 0
+
+    def add(self, request_tokens: int, response_tokens: int, estimated: bool = False) -> None:
+        self.request_tokens += request_tokens
+        self.response_tokens += response_tokens
+        self.calls += 1
+        if estimated:
+            self.estimated_calls += 1
+
+    def merge(self, other: "UsageMeter") -> None:
+        self.request_tokens += other.request_tokens
+        self.response_tokens += other.response_tokens
+        self.calls += other.calls
+        self.estimated_calls += other.estimated_calls
+
+
+_current_meter: ContextVar[Optional[UsageMeter]] = ContextVar("usage_meter", default=None)
+
+
+@contextmanager
+def usage_scope() -> Iterator[UsageMeter]:
+    """
+    새 UsageMeter 를 현재 컨텍스트에 설정합니다.
+    스코프가 중첩되면 안쪽 사용량은 종료 시 바깥 미터에도 합산됩니다.
+    asyncio.gather 로 만든 태스크도 컨텍스트를 복사하므로 같은 미터에 누적됩니다.
+    """
+    parent = _current_meter.get()
+    meter = UsageMeter()
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
+        if parent is not None:
+            parent.merge(meter)
+
+
+def current_meter() -> Optional[UsageMeter]:
+    return _current_meter.get()
+
+
+def count_message_tokens(messages: List[dict], model: str) -> int:
+    """usage 가 없을 때 쓰는 chat 요청 토큰 수 근사치 (메시지 오버헤드 포함)."""
+    token_counter = get_token_counter(model)
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        total += token_counter.count(message.get("role", ""))
+        total += token_counter.count(message.get("content") or "")
+    return total
+
+
+def record_chat_usage(response, messages: List[dict], model: str, completion_text: Optional[str] = None) -> None:
+    """chat completion 응답의 usage 를 현재 미터에 기록합니다."""
+    meter = _current_meter.get()
+    if meter is None:
+        return
+    usage = getattr(response, "usage", None) if response is not None else None
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        meter.add(usage.prompt_tokens, usage.completion_tokens or 0)
+        return
+
+    # 백엔드가 usage 를 보고하지 않은 경우에만 로컬 계산
+    if completion_text is None and response is not None:
+        completion_text = response.choices[0].message.content or ""
+    meter.add(
+        count_message_tokens(messages, model),
+        get_token_counter(model).count(completion_text or ""),
+        estimated=True
+    )
+
+
+def record_cancelled_chat_usage(messages: List[dict], model: str) -> int:
+    """
+    응답을 받기 전에 취소된 chat 호출의 사용량을 추정치로 기록하고 추정한 프롬프트 토큰 수를 반환합니다.
+    생성된 응답 토큰 수는 알 수 없으므로 0 으로 둡니다.
+    """
+    prompt_tokens = count_message_tokens(messages, model)
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.add(prompt_tokens, 0, estimated=True)
+    return prompt_tokens
+
+
+def record_transcription_usage(response, text: str, model: str) -> None:
+    """
+    전사 응답의 usage 를 기록합니다.
+    토큰 단위 usage 를 주는 모델은 그대로 사용하고, Whisper(text 형식)처럼 보고하지 않으면
+    전사 결과 텍스트를 응답 토큰으로 계산합니다.
+    """
+    meter = _current_meter.get()
+    if meter is None:
+        return
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "input_tokens", None) is not None:
+        meter.add(usage.input_tokens, usage.output_tokens or 0)
+        return
+    meter.add(0, get_token_counter(model).count(text), estimated=True)
@@ -0,0 +1,39 @@
+from dto.CommonDTO import BlankItem
+from service.blank_pregrader import blank_matches, pregrade_blank_item
+
+
+def _item(answer, inputs):
+    return BlankItem(id=1, question="__", answer=answer, input=inputs)
+
+
+def test_exact_match_after_normalization_is_correct():
+    assert blank_matches("TCP", " tcp. ") is True
+    assert pregrade_blank_item(_item(["엽록체"], ["엽록체"])) is True
+
+
+def test_safe_particle_strip_is_correct():
+    assert blank_matches("시험", "시험은") is True
+    assert blank_matches("엽록체", "엽록체에서") is True
+
+
+def test_single_syllable_key_prefix_is_not_auto_graded():
+    # "속도" 는 "속" + 조사 "도" 가 아님
+    assert blank_matches("속", "속도") is None
+    assert blank_matches("정", "정의") is None
+    assert blank_matches("온", "온도") is None
+    assert pregrade_blank_item(_item(["속"], ["속도"])) is None
+
+
+def test_key_ending_in_particle_syllable_is_undecided():
+    assert blank_matches("정의", "정의의") is None
+
+
+def test_partial_or_malformed_inputs_fall_through_to_llm():
+    assert pregrade_blank_item(_item(["TCP", "UDP"], ["TCP"])) is None
+    assert pregrade_blank_item(_item(["TCP", "UDP"], ["TCP", ""])) is None
+    assert pregrade_blank_item(_item(["TCP"], ["TCP", "UDP"])) is None
+
+
+def test_no_answer_at_all_is_wrong():
+    assert pregrade_blank_item(_item(["TCP"], [""])) is False
+    assert pregrade_blank_item(_item(["TCP", "UDP"], [])) is False
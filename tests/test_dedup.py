@@ -0,0 +1,49 @@
+from service.dedup import NearDuplicateIndex, dedupe_problems
+
+
+def test_templated_ox_stems_with_different_answers_are_kept():
+    data = {"ox": [
+        {"question": "TCP는 연결 지향형 프로토콜이다.", "answer": "O"},
+        {"question": "UDP는 연결 지향형 프로토콜이다.", "answer": "X"},
+    ]}
+    deduped, dropped = dedupe_problems(data)
+    assert len(deduped["ox"]) == 2
+    assert dropped == {}
+
+
+def test_templated_multiple_choice_stems_are_kept():
+    options = ["신뢰성 보장", "순서 보장", "비연결형", "흐름 제어"]
+    data = {"multipleChoice": [
+        {"question": "다음 중 TCP 프로토콜의 특징으로 옳지 않은 것은?", "options": options, "answer": "비연결형"},
+        {"question": "다음 중 UDP 프로토콜의 특징으로 옳지 않은 것은?", "options": options, "answer": "신뢰성 보장"},
+    ]}
+    deduped, _ = dedupe_problems(data)
+    assert len(deduped["multipleChoice"]) == 2
+
+
+def test_near_miss_stems_with_same_answer_are_kept():
+    index = NearDuplicateIndex()
+    assert index.add("TCP는 연결 지향형 프로토콜이다.", "o")
+    assert index.add("UDP는 연결 지향형 프로토콜이다.", "o")
+
+
+def test_identical_stem_with_different_answer_is_kept():
+    index = NearDuplicateIndex()
+    assert index.add_problem({"question": "광합성이 일어나는 세포 소기관은?", "answer": "엽록체"})
+    assert index.add_problem({"question": "광합성이 일어나는 세포 소기관은?", "answer": "미토콘드리아"})
+
+
+def test_rephrased_duplicate_with_same_answer_is_dropped():
+    data = {"descriptive": [
+        {"question": "광합성이 일어나는 세포 소기관은 무엇인가?", "answer": "엽록체"},
+        {"question": "광합성이 일어나는 세포 소기관은 무엇인가요?", "answer": "엽록체 "},
+    ]}
+    deduped, dropped = dedupe_problems(data)
+    assert len(deduped["descriptive"]) == 1
+    assert dropped == {"descriptive": 1}
+
+
+def test_option_order_does_not_affect_duplicate_check():
+    index = NearDuplicateIndex()
+    assert index.add_problem({"question": "HTTP 기본 포트는?", "options": ["80", "443"], "answer": "80"})
+    assert not index.add_problem({"question": "HTTP 기본 포트는?", "options": ["443", "80"], "answer": "80"})
@@ -0,0 +1,23 @@
+from service.json_repair import repair_json
+
+COMPLETE_Q1 = '{"multipleChoice":[{"question":"Q1","options":["a","b"],"answer":"a"},'
+
+
+def test_truncated_after_nested_options_drops_item_without_answer():
+    text = COMPLETE_Q1 + '{"question":"Q2","options":["a","b"],"answer":"'
+    assert repair_json(text) == {"multipleChoice": [{"question": "Q1", "options": ["a", "b"], "answer": "a"}]}
+
+
+def test_truncated_inside_options_drops_partial_item():
+    text = COMPLETE_Q1 + '{"question":"Q2","options":["a","b'
+    assert repair_json(text) == {"multipleChoice": [{"question": "Q1", "options": ["a", "b"], "answer": "a"}]}
+
+
+def test_truncated_keeps_completed_question_arrays():
+    text = '{"ox":[{"question":"O1","answer":"O"}],"multipleChoice":[{"question":"Q1","opt'
+    assert repair_json(text) == {"ox": [{"question": "O1", "answer": "O"}]}
+
+
+def test_truncated_top_level_list_keeps_complete_entries():
+    text = '[{"id":1,"score":{"a":3}},{"id":2,"score":{"a":'
+    assert repair_json(text) == [{"id": 1, "score": {"a": 3}}]